@@ -8,6 +8,9 @@ def _derive_key(base_secret: str, purpose: str) -> str:
 
 class Settings(BaseSettings):
     database_url: str = os.getenv("DATABASE_URL", "")
+    redis_url: str = os.getenv("REDIS_URL", "")
+    osrm_base_url: str = os.getenv("OSRM_BASE_URL", "https://router.project-osrm.org")
+    log_level: str = os.getenv("LOG_LEVEL", "info")  # minimum level written to the database logs
     _base_secret: str = os.getenv("SESSION_SECRET", "default-dev-secret-change-in-production")
     
     @property
@@ -30,7 +33,8 @@ class Settings(BaseSettings):
     refresh_token_expire_days: int = 30  # 30 days (1 month) for refresh token
     
     min_password_length: int = 6
-    max_login_attempts: int = 5
+    max_login_attempts: int = 5  # failures per (account, client IP)
+    max_account_login_attempts: int = 20  # failures per account from all clients
     lockout_duration_minutes: int = 15
     
     cors_origins: list = ["*"]
@@ -3,6 +3,7 @@ from models.user import User, UserRole
 from services.auth_service import AuthService
 from sqlalchemy import text
 import os
+import sys
 
 def run_migrations(db):
     """Run database migrations for new columns"""
@@ -19,12 +20,111 @@ def run_migrations(db):
                 END IF;
             END $$;
         """))
+        
         db.commit()
         print("Migrations completed successfully!")
     except Exception as e:
         print(f"Migration warning: {e}")
         db.rollback()
 
+# Indexes on existing tables, built with CREATE INDEX CONCURRENTLY so inserts keep flowing
+# during the build: (name, definition, single-column index it supersedes or None)
+INDEX_MIGRATIONS = [
+    # Latest-location lookups; driver_id is a prefix of the new index
+    ("ix_truck_loc_driver_ts", "ON truck_locations (driver_id, timestamp DESC)", "ix_truck_locations_driver_id"),
+    # Unread notifications only
+    ("ix_notif_unread", "ON notifications (user_id) WHERE is_read = false", None),
+    # Per-branch feed indexes; the composite one supersedes the single-column user_id index
+    ("ix_notif_user_created", "ON notifications (user_id, created_at DESC)", "ix_notifications_user_id"),
+    ("ix_notif_role_broadcast_created", "ON notifications (role, created_at DESC) WHERE user_id IS NULL", None),
+    ("ix_transactions_customer_payment_date", "ON transactions (customer_id, is_payment, date DESC)", None),
+]
+
+def _index_valid(conn, name):
+    """True/False for an existing index's pg_index.indisvalid, None if it does not exist"""
+    return conn.execute(text("""
+        SELECT i.indisvalid FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = :name
+    """), {"name": name}).scalar()
+
+def run_index_migrations():
+    """
+    Build missing indexes concurrently, one statement at a time outside a transaction.
+    An index left invalid by an interrupted build is dropped and rebuilt; a superseded
+    index is only dropped once its replacement is valid. Raises on any failure.
+    """
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        for name, definition, supersedes in INDEX_MIGRATIONS:
+            valid = _index_valid(conn, name)
+            if valid is False:
+                print(f"Rebuilding invalid index {name}")
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            if not valid:
+                conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} {definition}"))
+                if not _index_valid(conn, name):
+                    raise RuntimeError(f"Index {name} was not built or is invalid")
+                print(f"Created index {name}")
+            if supersedes:
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {supersedes}"))
+
+# Rows per UPDATE when backfilling truck_locations.lat_cos, so no single statement
+# holds row locks on a large part of the hottest write table
+LAT_COS_BATCH_SIZE = 5000
+
+def _column_exists(conn, table, column):
+    return conn.execute(text("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = :table AND column_name = :column
+    """), {"table": table, "column": column}).first() is not None
+
+def run_lat_cos_migration():
+    """
+    Add truck_locations.lat_cos and backfill it in batches, each committed on its own.
+    The column stays nullable: rows written by the previous app version while the deploy
+    is in progress have no value, and readers compute cos(latitude) for those.
+    """
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        # Nullable without a default: a catalog-only change, no table rewrite
+        conn.execute(text("SET lock_timeout = '5s'"))
+        conn.execute(text("ALTER TABLE truck_locations ADD COLUMN IF NOT EXISTS lat_cos DOUBLE PRECISION"))
+        conn.execute(text("RESET lock_timeout"))
+        
+        total = 0
+        while True:
+            updated = conn.execute(text("""
+                UPDATE truck_locations SET lat_cos = cos(radians(latitude))
+                WHERE id IN (
+                    SELECT id FROM truck_locations WHERE lat_cos IS NULL LIMIT :batch
+                )
+            """), {"batch": LAT_COS_BATCH_SIZE}).rowcount
+            if not updated:
+                break
+            total += updated
+        print(f"Backfilled lat_cos for {total} truck locations")
+
+def check_schema():
+    """Raise if a column the models map is missing (the deploy-time migration has not run)"""
+    with engine.connect() as conn:
+        # A fresh database gets the full table from create_all()
+        table_exists = conn.execute(text("SELECT to_regclass('truck_locations') IS NOT NULL")).scalar()
+        if table_exists and not _column_exists(conn, "truck_locations", "lat_cos"):
+            raise RuntimeError("truck_locations.lat_cos is missing - run 'python init_db.py migrate' before starting the app")
+
+def migrate():
+    """Deploy-time schema migrations; run once before the new app version starts"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        run_migrations(db)
+    finally:
+        db.close()
+    run_lat_cos_migration()
+    run_index_migrations()
+    print("Index migrations completed successfully!")
+
 def init_database():
     Base.metadata.create_all(bind=engine)
     print("Database tables created successfully!")
@@ -33,6 +133,8 @@ def init_database():
     try:
         # Run migrations first
         run_migrations(db)
+        run_lat_cos_migration()
+        run_index_migrations()
         
         existing_admin = db.query(User).filter(User.role == UserRole.ADMIN).first()
         if not existing_admin:
@@ -53,4 +155,7 @@ def init_database():
         db.close()
 
 if __name__ == "__main__":
-    init_database()
+    if sys.argv[1:] == ["migrate"]:
+        migrate()
+    else:
+        init_database()
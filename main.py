@@ -9,7 +9,17 @@ from routers import receipt_settings, stock, notification_settings, price_settin
 from middleware.security import SecurityMiddleware
 from models.user import User, UserRole
 from services.auth_service import AuthService
+from init_db import check_schema
+from utils.distance import get_osrm_client, close_osrm_client, osrm_batcher, osrm_breaker
+from services.push_notification_service import get_push_client, close_push_client
+from services.location_writer import start_location_writer, stop_location_writer
+from utils.ws_hotpath import warm_up as warm_up_ws_hotpath
+from utils.logger import get_log_queue_stats
+from services.notification_broadcast import set_broadcast_loop, start_notification_relay, stop_notification_relay
+from utils.auth_dependency import start_token_invalidation_relay, stop_token_invalidation_relay
+from config import settings
 import os
+import asyncio
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -86,6 +96,9 @@ async def startup_event():
         logger.error("DATABASE_URL not configured - database features disabled")
         return
     
+    # Fail the worker's boot rather than serve 500s from every tracking query
+    check_schema()
+    
     try:
         Base.metadata.create_all(bind=engine)
         logger.info("Database tables created/verified")
@@ -113,6 +126,51 @@ async def startup_event():
     except Exception as e:
         logger.error(f"Startup error: {e}")
 
+@app.on_event("startup")
+async def init_http_clients():
+    """Create shared outbound HTTP clients inside the running event loop"""
+    get_osrm_client()
+    get_push_client()
+    osrm_batcher.start()
+
+@app.on_event("startup")
+async def init_background_writers():
+    """Start the batched GPS location writer and compile its hot path"""
+    warm_up_ws_hotpath()
+    start_location_writer()
+
+@app.on_event("startup")
+async def init_notification_broadcast():
+    """Let sync request handlers schedule WebSocket broadcasts on this loop and relay them across workers"""
+    set_broadcast_loop(asyncio.get_running_loop())
+    start_notification_relay(settings.redis_url)
+
+@app.on_event("startup")
+async def init_token_invalidation():
+    """Relay token cache invalidations (account deleted or changed) across workers"""
+    start_token_invalidation_relay(settings.redis_url)
+
+@app.on_event("shutdown")
+async def close_notification_broadcast():
+    await stop_notification_relay()
+
+@app.on_event("shutdown")
+async def close_token_invalidation():
+    await stop_token_invalidation_relay()
+
+@app.on_event("shutdown")
+async def close_background_writers():
+    """Flush buffered GPS locations before exit"""
+    await stop_location_writer()
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    """Close shared outbound HTTP and Redis clients"""
+    await osrm_batcher.stop()
+    await close_osrm_client()
+    await close_push_client()
+    await tracking.shared_route_cache.close()
+
 @app.get("/")
 def root():
     return {
@@ -128,5 +186,7 @@ def health_check():
     db_status = "connected" if verify_db_connection() else "not connected"
     return {
         "status": "healthy",
-        "database": db_status
+        "database": db_status,
+        "osrm_circuit": osrm_breaker.stats(),
+        "log_queue": get_log_queue_stats()
     }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Enum, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Enum, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -33,7 +33,7 @@ class Notification(Base):
     __tablename__ = "notifications"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)  # NULL for broadcast
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # NULL for broadcast
     role = Column(Enum(UserRole), nullable=False, index=True)
     order_id = Column(Integer, ForeignKey("orders.id"), nullable=True)
     type = Column(Enum(NotificationType), nullable=False)
@@ -44,6 +44,14 @@ class Notification(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    # Unread lookups per user (counts, mark-all-as-read) only touch the small unread subset.
+    # A user's feed is read as two index-ordered branches: their own rows and their role's broadcasts.
+    __table_args__ = (
+        Index("ix_notif_unread", user_id, postgresql_where=(is_read == False)),
+        Index("ix_notif_user_created", user_id, created_at.desc()),
+        Index("ix_notif_role_broadcast_created", role, created_at.desc(), postgresql_where=(user_id == None)),
+    )
+    
     # Relationships
     user = relationship("User", backref="notifications")
     order = relationship("Order", backref="notifications")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -15,6 +15,11 @@ class Transaction(Base):
     date = Column(DateTime, default=datetime.utcnow)
     is_payment = Column(Boolean, default=False)  # True if payment, False if order
     
+    # Serves per-customer statement totals and date-ordered listings
+    __table_args__ = (
+        Index("ix_transactions_customer_payment_date", customer_id, is_payment, date.desc()),
+    )
+    
     # Relationships
     customer = relationship("Customer", back_populates="transactions")
     order = relationship("Order", back_populates="transactions")
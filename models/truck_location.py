@@ -1,19 +1,30 @@
-from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
+import math
+
+def _lat_cos_default(context):
+    """cos(latitude) for the row being inserted, so readers never recompute it"""
+    return math.cos(math.radians(context.get_current_parameters()["latitude"]))
 
 class TruckLocation(Base):
     __tablename__ = "truck_locations"
     
     id = Column(Integer, primary_key=True, index=True)
-    driver_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    driver_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
+    lat_cos = Column(Float, nullable=True, default=_lat_cos_default)  # cos(radians(latitude)) for equirectangular distance; NULL on rows from before the backfill
     accuracy = Column(Float, nullable=True)  # GPS accuracy in meters
     speed = Column(Float, nullable=True)  # Speed in km/h
     heading = Column(Float, nullable=True)  # Heading in degrees (0-360)
     timestamp = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     
+    # Latest-location lookups (driver_id = ? ORDER BY timestamp DESC LIMIT 1) become an index seek
+    __table_args__ = (
+        Index("ix_truck_loc_driver_ts", driver_id, timestamp.desc()),
+    )
+    
     # Relationships
     driver = relationship("User", back_populates="truck_locations")
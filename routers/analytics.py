@@ -10,7 +10,7 @@ from datetime import datetime, timedelta, date
 from database import get_db
 from models.truck_location import TruckLocation
 from models.user import User
-from utils.auth_dependency import get_current_admin
+from utils.auth_dependency import AuthUser, get_current_admin
 from utils.distance import haversine_distance
 
 router = APIRouter(prefix="/api/analytics", tags=["Analytics"])
@@ -23,7 +23,7 @@ class SimpleKmResponse(BaseModel):
 @router.get("/km", response_model=SimpleKmResponse)
 def get_km_summary(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """Get simple KM analytics summary"""
     from models.user import UserRole
@@ -73,7 +73,7 @@ def calculate_distance_traveled(locations: List[TruckLocation]) -> float:
 def get_daily_km_traveled(
     target_date: Optional[date] = Query(None, description="Target date (defaults to today)"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """Get km traveled by all drivers for a specific day"""
     if target_date is None:
@@ -123,7 +123,7 @@ def get_daily_km_traveled(
 def get_weekly_km_traveled(
     target_date: Optional[date] = Query(None, description="Any date in the target week (defaults to current week)"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """Get km traveled by all drivers for a specific week"""
     if target_date is None:
@@ -178,7 +178,7 @@ def get_monthly_km_traveled(
     year: Optional[int] = Query(None, description="Year (defaults to current year)"),
     month: Optional[int] = Query(None, ge=1, le=12, description="Month 1-12 (defaults to current month)"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """Get km traveled by all drivers for a specific month"""
     if year is None:
@@ -236,7 +236,7 @@ def get_monthly_km_traveled(
 def get_yearly_km_traveled(
     year: Optional[int] = Query(None, description="Year (defaults to current year)"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """Get km traveled by all drivers for a specific year"""
     if year is None:
@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, validator, Field
 from typing import List, Optional
 from datetime import datetime
 from database import get_db
-from services.auth_service import AuthService
+from services.auth_service import AuthService, LoginLockedError
+from services.sms_service import SMSService
 from models.user import UserRole, User, Language
-from utils.auth_dependency import get_current_user
+from utils.auth_dependency import get_current_user_full, invalidate_user_tokens
 import re
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
@@ -129,8 +130,19 @@ class UserResponse(BaseModel):
         from_attributes = True
 
 @router.post("/login", response_model=TokenResponse)
-def login(request: LoginRequest, db: Session = Depends(get_db)):
-    user = AuthService.authenticate_user(db, request.mobile, request.password)
+def login(request: LoginRequest, http_request: Request, db: Session = Depends(get_db)):
+    # request.client is the proxy-appended X-Forwarded-For hop (uvicorn proxy headers, see
+    # --forwarded-allow-ips in the Dockerfile); the leftmost entry is set by the client
+    client_ip = http_request.client.host if http_request.client else "unknown"
+    
+    try:
+        user = AuthService.authenticate_user(db, request.mobile, request.password, client_ip)
+    except LoginLockedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts. Please try again later.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -260,6 +272,7 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
     
     db.delete(user)
     db.commit()
+    invalidate_user_tokens(user_id)
     return {"message": "User deleted successfully"}
 
 
@@ -346,6 +359,8 @@ def update_user(user_id: int, request: UserUpdateRequest, db: Session = Depends(
     
     db.commit()
     db.refresh(user)
+    SMSService.invalidate_recipient(user.id)
+    invalidate_user_tokens(user.id)
     
     return UserResponse(
         id=user.id,
@@ -367,7 +382,7 @@ class FCMTokenRequest(BaseModel):
 def register_fcm_token(
     request: FCMTokenRequest, 
     db: Session = Depends(get_db), 
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_full)
 ):
     """
     Register or update FCM token for push notifications.
@@ -386,7 +401,7 @@ def register_fcm_token(
 @router.delete("/fcm-token")
 def remove_fcm_token(
     db: Session = Depends(get_db), 
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_full)
 ):
     """
     Remove FCM token when user logs out.
@@ -9,7 +9,7 @@ from models.user import User, UserRole
 from models.order import Order, OrderStatus
 from models.transaction import Transaction
 from utils.security import get_password_hash
-from utils.auth_dependency import get_current_admin, get_current_user
+from utils.auth_dependency import AuthUser, get_current_admin, get_current_user, invalidate_user_tokens
 
 router = APIRouter(prefix="/api/customers", tags=["Customers"])
 
@@ -90,13 +90,13 @@ def build_customer_response(customer: Customer, db: Session) -> CustomerResponse
     )
 
 @router.get("/", response_model=List[CustomerResponse])
-def get_customers(db: Session = Depends(get_db), current_user: User = Depends(get_current_admin)):
+def get_customers(db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_admin)):
     """Get all customers - admin only"""
     customers = db.query(Customer).join(User).all()
     return [build_customer_response(c, db) for c in customers]
 
 @router.get("/{customer_id}", response_model=CustomerResponse)
-def get_customer(customer_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_customer(customer_id: int, db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_user)):
     customer = db.query(Customer).filter(Customer.id == customer_id).first()
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
@@ -104,7 +104,7 @@ def get_customer(customer_id: int, db: Session = Depends(get_db), current_user:
     return build_customer_response(customer, db)
 
 @router.post("/", response_model=CustomerResponse)
-def create_customer(request: CustomerCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_admin)):
+def create_customer(request: CustomerCreate, db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_admin)):
     # Check if mobile exists
     existing_user = db.query(User).filter(User.mobile == request.mobile).first()
     if existing_user:
@@ -136,7 +136,7 @@ def create_customer(request: CustomerCreate, db: Session = Depends(get_db), curr
     return build_customer_response(customer, db)
 
 @router.put("/{customer_id}", response_model=CustomerResponse)
-def update_customer(customer_id: int, request: CustomerUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_admin)):
+def update_customer(customer_id: int, request: CustomerUpdate, db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_admin)):
     customer = db.query(Customer).filter(Customer.id == customer_id).first()
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
@@ -155,6 +155,8 @@ def update_customer(customer_id: int, request: CustomerUpdate, db: Session = Dep
     
     db.commit()
     db.refresh(customer)
+    if request.name:
+        invalidate_user_tokens(customer.user_id)
     
     return build_customer_response(customer, db)
 
@@ -163,7 +165,7 @@ def update_customer_status(
     customer_id: int, 
     request: CustomerStatusUpdate, 
     db: Session = Depends(get_db), 
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """Toggle customer active status. Admin only."""
     customer = db.query(Customer).filter(Customer.id == customer_id).first()
@@ -181,7 +183,7 @@ def update_customer_location(
     customer_id: int, 
     request: CustomerLocationUpdate, 
     db: Session = Depends(get_db), 
-    current_user: User = Depends(get_current_user)
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """Update customer delivery location. Customers can only update their own location."""
     customer = db.query(Customer).filter(Customer.id == customer_id).first()
@@ -211,14 +213,16 @@ def update_customer_location(
     return build_customer_response(customer, db)
 
 @router.delete("/{customer_id}")
-def delete_customer(customer_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_admin)):
+def delete_customer(customer_id: int, db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_admin)):
     customer = db.query(Customer).filter(Customer.id == customer_id).first()
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
     
     user = customer.user
+    user_id = user.id
     db.delete(customer)
     db.delete(user)
     db.commit()
+    invalidate_user_tokens(user_id)
     
     return {"message": "Customer deleted successfully"}
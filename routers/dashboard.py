@@ -6,7 +6,7 @@ from models.user import User, UserRole
 from models.customer import Customer
 from models.order import Order, OrderStatus
 from models.transaction import Transaction
-from utils.auth_dependency import get_current_admin
+from utils.auth_dependency import AuthUser, get_current_admin
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime, timedelta
@@ -30,7 +30,7 @@ class DashboardStatsResponse(BaseModel):
 @router.get("/stats", response_model=DashboardStatsResponse)
 def get_dashboard_stats(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """Get dashboard statistics for admin"""
     today = datetime.utcnow().date()
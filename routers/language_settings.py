@@ -4,7 +4,8 @@ from pydantic import BaseModel
 from typing import Optional, List
 from database import get_db
 from models.user import User, Language, UserRole
-from utils.auth_dependency import get_current_admin
+from utils.auth_dependency import AuthUser, get_current_admin
+from services.sms_service import SMSService
 
 router = APIRouter(prefix="/api/language-settings", tags=["Language Settings"])
 
@@ -29,7 +30,7 @@ class UserLanguageResponse(BaseModel):
 @router.get("/users", response_model=List[UserLanguageResponse])
 def get_all_users_with_languages(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """Get all users with their language preferences (Admin only)"""
     users = db.query(User).filter(User.role.in_([UserRole.CUSTOMER, UserRole.DRIVER, UserRole.ADMIN])).all()
@@ -50,7 +51,7 @@ def get_all_users_with_languages(
 def update_user_language_preferences(
     request: UpdateLanguagePreferencesRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """Update language preferences for a specific user (Admin only)"""
     user = db.query(User).filter(User.id == request.user_id).first()
@@ -84,6 +85,7 @@ def update_user_language_preferences(
     
     db.commit()
     db.refresh(user)
+    SMSService.invalidate_recipient(user.id)
     
     return UserLanguageResponse(
         id=user.id,
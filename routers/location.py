@@ -12,9 +12,9 @@ from models.truck_location import TruckLocation
 from models.user import User
 from models.order import Order, OrderStatus
 from models.customer import Customer
-from utils.auth_dependency import get_current_user, get_current_driver
+from utils.auth_dependency import AuthUser, get_current_user, get_current_driver
 from utils.logger import DatabaseLogger, LogCategory, LogLevel
-from utils.distance import haversine_distance, calculate_eta
+from utils.distance import haversine_to_prepared, prepare_point, calculate_eta
 import json
 
 router = APIRouter(prefix="/api/location", tags=["Location Tracking"])
@@ -90,7 +90,7 @@ manager = ConnectionManager()
 async def update_location(
     location: LocationUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_driver)
+    current_user: AuthUser = Depends(get_current_driver)
 ):
     """
     Driver sends real-time GPS location update.
@@ -185,7 +185,7 @@ def get_latest_driver_location(
     dest_lat: Optional[float] = Query(None, description="Destination latitude for distance/ETA calculation"),
     dest_long: Optional[float] = Query(None, description="Destination longitude for distance/ETA calculation"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """
     Get the latest location of a specific driver
@@ -259,9 +259,9 @@ def get_latest_driver_location(
     distance_to_destination = None
     eta_minutes = None
     if dest_lat is not None and dest_long is not None:
-        distance_to_destination = haversine_distance(
+        distance_to_destination = haversine_to_prepared(
             location.latitude, location.longitude,
-            dest_lat, dest_long
+            prepare_point(dest_lat, dest_long)
         )
         eta_minutes = calculate_eta(
             distance_to_destination, 
@@ -287,7 +287,7 @@ def get_latest_driver_location(
 @router.get("/all-active", response_model=List[LocationResponse])
 def get_all_active_drivers(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """
     Get latest locations of all active drivers (updated in last 30 minutes)
@@ -9,8 +9,7 @@ from datetime import datetime
 from pydantic import BaseModel
 from database import get_db
 from models.log import SystemLog, ApiLog, ErrorLog, UserActivityLog
-from models.user import User
-from utils.auth_dependency import get_current_user
+from utils.auth_dependency import AuthUser, get_current_user
 
 router = APIRouter(prefix="/api/logs", tags=["Logs"])
 
@@ -39,7 +38,7 @@ class LogResponse(BaseModel):
 def get_all_logs(
     limit: int = 500,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """
     Get all logs (system, api, error, activity) combined
@@ -115,7 +114,7 @@ def get_all_logs(
 def get_system_logs(
     limit: int = 200,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """Get system logs"""
     if current_user.role != "admin":
@@ -140,7 +139,7 @@ def get_system_logs(
 def get_error_logs(
     limit: int = 200,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """Get error logs"""
     if current_user.role != "admin":
@@ -165,7 +164,7 @@ def get_activity_logs(
     limit: int = 200,
     user_id: Optional[int] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """Get user activity logs"""
     if current_user.role != "admin":
@@ -4,8 +4,8 @@ from pydantic import BaseModel
 from typing import Optional
 from database import get_db
 from models.notification_settings import NotificationSettings
-from models.user import User
-from utils.auth_dependency import get_current_admin
+from services.settings_cache import invalidate_notification_settings
+from utils.auth_dependency import AuthUser, get_current_admin
 
 router = APIRouter(prefix="/api/notification-settings", tags=["Notification Settings"])
 
@@ -67,6 +67,7 @@ def get_or_create_settings(db: Session) -> NotificationSettings:
         )
         db.add(settings)
         db.commit()
+        invalidate_notification_settings()
         db.refresh(settings)
     return settings
 
@@ -74,7 +75,7 @@ def get_or_create_settings(db: Session) -> NotificationSettings:
 @router.get("/", response_model=NotificationSettingsResponse)
 def get_notification_settings(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """Get current notification settings (Admin only)"""
     settings = get_or_create_settings(db)
@@ -85,7 +86,7 @@ def get_notification_settings(
 def update_notification_settings(
     request: NotificationSettingsUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """Update notification settings (Admin only)"""
     settings = get_or_create_settings(db)
@@ -118,6 +119,7 @@ def update_notification_settings(
         settings.low_stock_notify = request.low_stock_notify
     
     db.commit()
+    invalidate_notification_settings()
     db.refresh(settings)
     
     return settings
@@ -127,7 +129,7 @@ def update_notification_settings(
 def toggle_role_notifications(
     role: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """Toggle notifications for a specific role (Admin only)"""
     if role not in ["customer", "driver", "admin"]:
@@ -146,6 +148,7 @@ def toggle_role_notifications(
         new_state = settings.admin_notifications_enabled
     
     db.commit()
+    invalidate_notification_settings()
     
     return {
         "message": f"Notifications for {role} {'enabled' if new_state else 'disabled'}",
@@ -158,7 +161,7 @@ def toggle_role_notifications(
 def toggle_all_notifications(
     enabled: bool,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """Enable or disable all notifications at once (Admin only)"""
     settings = get_or_create_settings(db)
@@ -178,6 +181,7 @@ def toggle_all_notifications(
     settings.low_stock_notify = enabled
     
     db.commit()
+    invalidate_notification_settings()
     
     return {
         "message": f"All notifications {'enabled' if enabled else 'disabled'}",
@@ -188,7 +192,7 @@ def toggle_all_notifications(
 @router.post("/toggle-sms")
 def toggle_sms_notifications(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """Toggle SMS notifications globally (Admin only)"""
     settings = get_or_create_settings(db)
@@ -197,6 +201,7 @@ def toggle_sms_notifications(
     new_state = settings.sms_enabled
     
     db.commit()
+    invalidate_notification_settings()
     
     return {
         "message": f"SMS notifications {'enabled' if new_state else 'disabled'}",
@@ -208,7 +213,7 @@ def toggle_sms_notifications(
 def toggle_role_sms(
     role: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """Toggle SMS for a specific role (Admin only)"""
     if role not in ["customer", "driver", "admin"]:
@@ -227,6 +232,7 @@ def toggle_role_sms(
         new_state = settings.admin_sms_enabled
     
     db.commit()
+    invalidate_notification_settings()
     
     return {
         "message": f"SMS for {role} {'enabled' if new_state else 'disabled'}",
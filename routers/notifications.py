@@ -97,12 +97,15 @@ def mark_all_notifications_as_read(
 @router.websocket("/ws")
 async def notifications_websocket(
     websocket: WebSocket, 
-    token: str = Query(...)
+    token: str = Query(...),
+    compress: Optional[str] = Query(None)
 ):
     """
     WebSocket endpoint for real-time notification updates.
     Connect with token query parameter for authentication.
     Receives new notifications in real-time.
+    Pass compress=zlib to receive notifications as zlib-compressed binary frames
+    (control replies such as pong stay as JSON text).
     """
     from utils.auth import verify_token
     from contextlib import contextmanager
@@ -129,7 +132,7 @@ async def notifications_websocket(
         await websocket.close(code=1008, reason="Authentication failed")
         return
     
-    await notification_manager.connect(websocket, user_id, user_role)
+    await notification_manager.connect(websocket, user_id, user_role, compress=(compress == "zlib"))
     
     try:
         with get_db_session() as db:
@@ -11,9 +11,9 @@ from models.user import User
 from models.customer import Customer
 from models.receipt import Receipt
 from models.notification import NotificationType, UserRole
-from utils.auth_dependency import get_current_user, get_current_admin, get_current_admin_or_customer, get_current_admin_or_driver
+from utils.auth_dependency import AuthUser, get_current_user, get_current_admin, get_current_admin_or_customer, get_current_admin_or_driver
 from services.notification_service import NotificationService
-import random
+from utils.security import generate_otp
 import os
 import shutil
 import re
@@ -170,7 +170,7 @@ def get_orders(
     driver_id: Optional[int] = None,
     status: Optional[OrderStatus] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """
     Get orders with role-based authorization:
@@ -285,7 +285,7 @@ def get_orders(
 @router.get("/my-orders", response_model=List[OrderResponse])
 def get_my_orders(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """
     Get all orders for the current authenticated customer
@@ -343,14 +343,14 @@ def get_my_orders(
     return result
 
 @router.get("/{order_id}", response_model=OrderResponse)
-def get_order(order_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_order(order_id: int, db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_user)):
     order = db.query(Order).filter(Order.id == order_id).first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     return order
 
 @router.post("/", response_model=OrderResponse)
-def create_order(request: OrderCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_admin_or_customer)):
+def create_order(request: OrderCreate, db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_admin_or_customer)):
     # Find the customer record for this user
     customer = db.query(Customer).filter(Customer.user_id == current_user.id).first()
     if not customer:
@@ -369,7 +369,7 @@ def create_order(request: OrderCreate, db: Session = Depends(get_db), current_us
         amount=amount,
         status=OrderStatus.PENDING,
         delivery_time=request.delivery_time,
-        otp=str(random.randint(100000, 999999)),
+        otp=generate_otp(),
         delivery_address=request.delivery_address,
         delivery_gps_lat=request.delivery_gps_lat,
         delivery_gps_long=request.delivery_gps_long,
@@ -395,9 +395,10 @@ def create_order(request: OrderCreate, db: Session = Depends(get_db), current_us
     
     # Create notifications for new order
     try:
+        notifications = []
+        
         # Notify admins about new order
-        NotificationService.create_notification(
-            db=db,
+        notifications.append(dict(
             role=UserRole.ADMIN,
             notification_type=NotificationType.NEW_ORDER,
             order_id=order.id,
@@ -407,11 +408,10 @@ def create_order(request: OrderCreate, db: Session = Depends(get_db), current_us
                 "liters": request.liters,
                 "order_id": order.id
             }
-        )
+        ))
         
         # Notify customer about order initiated
-        NotificationService.create_notification(
-            db=db,
+        notifications.append(dict(
             role=UserRole.CUSTOMER,
             notification_type=NotificationType.ORDER_INITIATED,
             user_id=current_user.id,
@@ -421,14 +421,16 @@ def create_order(request: OrderCreate, db: Session = Depends(get_db), current_us
                 "amount": f"₹{amount:,.2f}",
                 "liters": request.liters
             }
-        )
+        ))
+        
+        NotificationService.create_notifications_bulk(db, notifications)
     except Exception as e:
         print(f"Error creating notifications: {e}")
     
     return order
 
 @router.post("/admin", response_model=OrderResponse)
-def create_order_by_admin(request: AdminOrderCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_admin)):
+def create_order_by_admin(request: AdminOrderCreate, db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_admin)):
     """Admin creates order for a specific customer"""
     # Verify customer exists
     customer = db.query(Customer).filter(Customer.id == request.customer_id).first()
@@ -440,7 +442,7 @@ def create_order_by_admin(request: AdminOrderCreate, db: Session = Depends(get_d
         raise HTTPException(status_code=403, detail="Cannot create order for deactivated customer.")
     
     amount = request.liters * request.rate
-    otp = str(random.randint(100000, 999999))
+    otp = generate_otp()
     
     # Use customer's address if not provided
     delivery_address = request.delivery_address or customer.address
@@ -477,10 +479,11 @@ def create_order_by_admin(request: AdminOrderCreate, db: Session = Depends(get_d
     
     # Create notifications for admin-created order
     try:
+        notifications = []
+        
         # Notify customer about order created
         if customer.user_id:
-            NotificationService.create_notification(
-                db=db,
+            notifications.append(dict(
                 role=UserRole.CUSTOMER,
                 notification_type=NotificationType.ORDER_INITIATED,
                 user_id=customer.user_id,
@@ -490,13 +493,12 @@ def create_order_by_admin(request: AdminOrderCreate, db: Session = Depends(get_d
                     "amount": f"₹{amount:,.2f}",
                     "liters": request.liters
                 }
-            )
+            ))
         
         # If driver is assigned, notify driver and customer
         if request.driver_id and driver:
             # Notify driver about new assignment
-            NotificationService.create_notification(
-                db=db,
+            notifications.append(dict(
                 role=UserRole.DRIVER,
                 notification_type=NotificationType.ORDER_ASSIGNED,
                 user_id=request.driver_id,
@@ -508,12 +510,11 @@ def create_order_by_admin(request: AdminOrderCreate, db: Session = Depends(get_d
                     "liters": request.liters,
                     "delivery_address": delivery_address or "Not specified"
                 }
-            )
+            ))
             
             # Notify customer about driver assignment
             if customer.user_id:
-                NotificationService.create_notification(
-                    db=db,
+                notifications.append(dict(
                     role=UserRole.CUSTOMER,
                     notification_type=NotificationType.DRIVER_ASSIGNED,
                     user_id=customer.user_id,
@@ -522,7 +523,9 @@ def create_order_by_admin(request: AdminOrderCreate, db: Session = Depends(get_d
                         "order_id": order.id,
                         "driver_name": driver_name
                     }
-                )
+                ))
+        
+        NotificationService.create_notifications_bulk(db, notifications)
     except Exception as e:
         print(f"Error creating notifications for admin order: {e}")
     
@@ -553,7 +556,7 @@ def create_order_by_admin(request: AdminOrderCreate, db: Session = Depends(get_d
     )
 
 @router.put("/{order_id}", response_model=OrderResponse)
-def update_order(order_id: int, request: OrderUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_admin_or_driver)):
+def update_order(order_id: int, request: OrderUpdate, db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_admin_or_driver)):
     order = db.query(Order).filter(Order.id == order_id).first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
@@ -616,6 +619,8 @@ def update_order(order_id: int, request: OrderUpdate, db: Session = Depends(get_
     
     # Send notifications based on status changes
     try:
+        notifications = []
+        
         customer = db.query(Customer).filter(Customer.id == order.customer_id).first()
         driver = db.query(User).filter(User.id == order.driver_id).first() if order.driver_id else None
         driver_name = driver.name if driver else "Unknown"
@@ -623,8 +628,7 @@ def update_order(order_id: int, request: OrderUpdate, db: Session = Depends(get_
         # 1. Notify when driver is assigned (Admin assigns driver → Customer gets notified)
         if request.driver_id and old_driver_id != request.driver_id:
             # Notify the driver about new assignment
-            NotificationService.create_notification(
-                db=db,
+            notifications.append(dict(
                 role=UserRole.DRIVER,
                 notification_type=NotificationType.ORDER_ASSIGNED,
                 user_id=request.driver_id,
@@ -636,12 +640,11 @@ def update_order(order_id: int, request: OrderUpdate, db: Session = Depends(get_
                     "liters": order.liters,
                     "delivery_address": order.delivery_address or "Not specified"
                 }
-            )
+            ))
             
             # Notify customer that driver has been assigned
             if customer:
-                NotificationService.create_notification(
-                    db=db,
+                notifications.append(dict(
                     role=UserRole.CUSTOMER,
                     notification_type=NotificationType.DRIVER_ASSIGNED,
                     user_id=customer.user_id,
@@ -650,14 +653,13 @@ def update_order(order_id: int, request: OrderUpdate, db: Session = Depends(get_
                         "order_id": order.id,
                         "driver_name": driver_name
                     }
-                )
+                ))
         
         # 2. Notify when driver starts delivery (IN_TRANSIT) → Customer and Admin get notified
         if order.status == OrderStatus.IN_TRANSIT and old_status != OrderStatus.IN_TRANSIT:
             # Notify customer that delivery is on the way
             if customer:
-                NotificationService.create_notification(
-                    db=db,
+                notifications.append(dict(
                     role=UserRole.CUSTOMER,
                     notification_type=NotificationType.ORDER_IN_TRANSIT,
                     user_id=customer.user_id,
@@ -666,11 +668,10 @@ def update_order(order_id: int, request: OrderUpdate, db: Session = Depends(get_
                         "order_id": order.id,
                         "driver_name": driver_name
                     }
-                )
+                ))
             
             # Notify admin that delivery has started
-            NotificationService.create_notification(
-                db=db,
+            notifications.append(dict(
                 role=UserRole.ADMIN,
                 notification_type=NotificationType.DELIVERY_STARTED,
                 order_id=order.id,
@@ -679,14 +680,13 @@ def update_order(order_id: int, request: OrderUpdate, db: Session = Depends(get_
                     "driver_name": driver_name,
                     "customer_name": customer.company_name if customer else "Unknown"
                 }
-            )
+            ))
         
         # 3. Notify when order is delivered → Customer and Admin get notified
         if order.status == OrderStatus.DELIVERED and old_status != OrderStatus.DELIVERED:
             # Notify customer about successful delivery
             if customer:
-                NotificationService.create_notification(
-                    db=db,
+                notifications.append(dict(
                     role=UserRole.CUSTOMER,
                     notification_type=NotificationType.ORDER_DELIVERED,
                     user_id=customer.user_id,
@@ -696,11 +696,10 @@ def update_order(order_id: int, request: OrderUpdate, db: Session = Depends(get_
                         "liters": order.liters,
                         "amount": f"₹{order.amount:,.2f}"
                     }
-                )
+                ))
             
             # Notify admin about delivery completion
-            NotificationService.create_notification(
-                db=db,
+            notifications.append(dict(
                 role=UserRole.ADMIN,
                 notification_type=NotificationType.DELIVERY_COMPLETED,
                 order_id=order.id,
@@ -710,7 +709,9 @@ def update_order(order_id: int, request: OrderUpdate, db: Session = Depends(get_
                     "customer_name": customer.company_name if customer else "Unknown",
                     "amount": f"₹{order.amount:,.2f}"
                 }
-            )
+            ))
+        
+        NotificationService.create_notifications_bulk(db, notifications)
     except Exception as e:
         print(f"Error creating notifications: {e}")
     
@@ -759,7 +760,7 @@ async def upload_vehicle_photo(
     order_id: int,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_or_driver)
+    current_user: AuthUser = Depends(get_current_admin_or_driver)
 ):
     order = db.query(Order).filter(Order.id == order_id).first()
     if not order:
@@ -786,7 +787,7 @@ async def upload_vehicle_photo(
     return {"message": "Vehicle photo uploaded successfully", "file_url": order.vehicle_photo}
 
 @router.delete("/{order_id}")
-def cancel_order(order_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_admin_or_customer)):
+def cancel_order(order_id: int, db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_admin_or_customer)):
     order = db.query(Order).filter(Order.id == order_id).first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
@@ -800,29 +801,31 @@ def cancel_order(order_id: int, db: Session = Depends(get_db), current_user: Use
     
     # Send notifications
     try:
+        notifications = []
+        
         customer = db.query(Customer).filter(Customer.id == customer_id).first()
         
         # Notify customer about cancellation
         if customer:
-            NotificationService.create_notification(
-                db=db,
+            notifications.append(dict(
                 role=UserRole.CUSTOMER,
                 notification_type=NotificationType.ORDER_CANCELLED,
                 user_id=customer.user_id,
                 order_id=order.id,
                 metadata={"order_id": order.id}
-            )
+            ))
         
         # Notify driver if order was assigned
         if driver_id:
-            NotificationService.create_notification(
-                db=db,
+            notifications.append(dict(
                 role=UserRole.DRIVER,
                 notification_type=NotificationType.ORDER_UNASSIGNED,
                 user_id=driver_id,
                 order_id=order.id,
                 metadata={"order_id": order.id}
-            )
+            ))
+        
+        NotificationService.create_notifications_bulk(db, notifications)
     except Exception as e:
         # Log error but don't fail the cancellation
         print(f"Error creating notifications: {e}")
@@ -837,7 +840,7 @@ class DashboardStats(BaseModel):
     total_liters: float
 
 @router.get("/stats/dashboard", response_model=DashboardStats)
-def get_dashboard_stats(db: Session = Depends(get_db), current_user: User = Depends(get_current_admin)):
+def get_dashboard_stats(db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_admin)):
     total_orders = db.query(func.count(Order.id)).scalar()
     pending_orders = db.query(func.count(Order.id)).filter(
         Order.status.in_([OrderStatus.PENDING, OrderStatus.ASSIGNED, OrderStatus.IN_TRANSIT])
@@ -865,7 +868,7 @@ def edit_order(
     order_id: int,
     request: OrderEdit,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_or_customer)
+    current_user: AuthUser = Depends(get_current_admin_or_customer)
 ):
     """Edit order details - only allowed for PENDING or ASSIGNED orders"""
     order = db.query(Order).filter(Order.id == order_id).first()
@@ -930,7 +933,7 @@ def edit_order(
 def delete_order(
     order_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_or_customer)
+    current_user: AuthUser = Depends(get_current_admin_or_customer)
 ):
     """Delete/Cancel an order - only allowed for PENDING or ASSIGNED orders"""
     order = db.query(Order).filter(Order.id == order_id).first()
@@ -1004,7 +1007,7 @@ def get_delivered_orders_for_review(
     limit: int = 50,
     offset: int = 0,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """
     Get delivered orders with documents for admin review.
@@ -1065,7 +1068,7 @@ def get_delivered_orders_for_review(
 def get_order_for_review(
     order_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """
     Get a single order with documents for admin review.
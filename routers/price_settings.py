@@ -7,7 +7,7 @@ from decimal import Decimal
 
 from database import get_db
 from models import User, PriceSettings
-from utils.auth_dependency import get_current_user, get_current_admin
+from utils.auth_dependency import AuthUser, get_current_user, get_current_admin
 from routers.tracking import manager
 
 router = APIRouter(prefix="/api/price-settings", tags=["price-settings"])
@@ -32,7 +32,7 @@ class UpdatePriceRequest(BaseModel):
 @router.get("/", response_model=PriceSettingsResponse)
 def get_price_settings(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """
     Get current diesel price settings.
@@ -64,7 +64,7 @@ def get_price_settings(
 async def update_price_settings(
     request: UpdatePriceRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """
     Update diesel price settings.
@@ -7,7 +7,7 @@ import shutil
 from pathlib import Path
 from database import get_db
 from services.auth_service import AuthService
-from utils.auth_dependency import get_current_user
+from utils.auth_dependency import get_current_user_full, invalidate_user_tokens
 from models.user import User
 from models.customer import Customer
 
@@ -40,7 +40,7 @@ class ProfileResponse(BaseModel):
 async def upload_profile_photo(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_full)
 ):
     """Upload profile photo for current user"""
     
@@ -93,7 +93,7 @@ async def upload_profile_photo(
 @router.delete("/delete-photo")
 def delete_profile_photo(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_full)
 ):
     """Delete profile photo for current user"""
     
@@ -124,7 +124,7 @@ def delete_profile_photo(
 @router.get("/me", response_model=ProfileResponse)
 def get_profile(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_full)
 ):
     """Get current user's profile"""
     
@@ -147,7 +147,7 @@ def get_profile(
 def update_profile(
     update_data: ProfileUpdateRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_full)
 ):
     """Update current user's profile"""
     
@@ -164,5 +164,7 @@ def update_profile(
     
     db.commit()
     db.refresh(current_user)
+    if update_data.name:
+        invalidate_user_tokens(current_user.id)
     
     return get_profile(db, current_user)
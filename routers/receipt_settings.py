@@ -5,8 +5,7 @@ from typing import Optional
 from datetime import datetime
 from database import get_db
 from models.receipt_settings import ReceiptSettings
-from models.user import User
-from utils.auth_dependency import get_current_admin
+from utils.auth_dependency import AuthUser, get_current_admin
 import os
 import shutil
 
@@ -65,7 +64,7 @@ def get_receipt_settings(db: Session = Depends(get_db)):
 def update_receipt_settings(
     request: ReceiptSettingsUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """Update receipt header settings (Admin only)"""
     settings = db.query(ReceiptSettings).first()
@@ -107,7 +106,7 @@ def update_receipt_settings(
 async def upload_logo(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """Upload company logo for receipts (Admin only)"""
     if not file.filename:
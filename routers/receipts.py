@@ -7,8 +7,7 @@ from datetime import datetime
 from database import get_db
 from models.receipt import Receipt
 from models.order import Order
-from models.user import User
-from utils.auth_dependency import get_current_user
+from utils.auth_dependency import AuthUser, get_current_user
 import os
 import shutil
 
@@ -29,7 +28,7 @@ class ReceiptResponse(BaseModel):
         from_attributes = True
 
 @router.get("/", response_model=List[ReceiptResponse])
-def get_receipts(order_id: Optional[int] = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_receipts(order_id: Optional[int] = None, db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_user)):
     query = db.query(Receipt)
     if order_id:
         query = query.filter(Receipt.order_id == order_id)
@@ -41,7 +40,7 @@ async def upload_receipt(
     order_id: int,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthUser = Depends(get_current_user)
 ):
     # Generate unique filename
     file_extension = os.path.splitext(file.filename)[1]
@@ -71,14 +70,14 @@ async def upload_receipt(
     )
 
 @router.get("/{receipt_id}", response_model=ReceiptResponse)
-def get_receipt(receipt_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_receipt(receipt_id: int, db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_user)):
     receipt = db.query(Receipt).filter(Receipt.id == receipt_id).first()
     if not receipt:
         raise HTTPException(status_code=404, detail="Receipt not found")
     return receipt
 
 @router.get("/{receipt_id}/download")
-def download_receipt(receipt_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def download_receipt(receipt_id: int, db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_user)):
     """Download receipt file with proper headers for saving"""
     receipt = db.query(Receipt).filter(Receipt.id == receipt_id).first()
     if not receipt:
@@ -108,7 +107,7 @@ def download_receipt(receipt_id: int, db: Session = Depends(get_db), current_use
     )
 
 @router.get("/order/{order_id}", response_model=List[ReceiptResponse])
-def get_receipts_by_order(order_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_receipts_by_order(order_id: int, db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_user)):
     """Get all receipts for a specific order with access control"""
     # Verify user has access to this order
     order = db.query(Order).filter(Order.id == order_id).first()
@@ -125,7 +124,7 @@ def get_receipts_by_order(order_id: int, db: Session = Depends(get_db), current_
     return receipts
 
 @router.delete("/{receipt_id}")
-def delete_receipt(receipt_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def delete_receipt(receipt_id: int, db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_user)):
     receipt = db.query(Receipt).filter(Receipt.id == receipt_id).first()
     if not receipt:
         raise HTTPException(status_code=404, detail="Receipt not found")
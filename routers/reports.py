@@ -10,7 +10,7 @@ from database import get_db
 from models import Order, Transaction, Customer, User, VehicleOdometer
 from models.order import OrderStatus
 from models.user import UserRole
-from utils.auth_dependency import get_current_user, get_current_admin
+from utils.auth_dependency import AuthUser, get_current_user, get_current_admin
 
 router = APIRouter(prefix="/api/reports", tags=["Reports"])
 
@@ -25,7 +25,7 @@ class ReportsSummaryResponse(BaseModel):
 @router.get("/summary", response_model=ReportsSummaryResponse)
 def get_reports_summary(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """Get overall reports summary"""
     total_orders = db.query(Order).count()
@@ -135,7 +135,7 @@ class DriverDeliveryReportSummary(BaseModel):
 def get_driver_delivery_report(
     period: str = Query("daily", regex="^(daily|weekly|monthly)$"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """Get delivery report for the logged-in driver (daily/weekly/monthly)
     
@@ -248,7 +248,7 @@ def get_customer_summary(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """Get comprehensive customer report with order summary"""
     # First get customer orders summary
@@ -293,7 +293,7 @@ def get_sales_summary(
     end_date: Optional[date] = None,
     period: str = Query("daily", regex="^(daily|weekly|monthly)$"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """Get sales summary grouped by period (daily/weekly/monthly)"""
     if not start_date:
@@ -370,7 +370,7 @@ def get_vehicle_km_report(
     end_date: Optional[date] = None,
     driver_id: Optional[int] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """Get vehicle kilometer tracking report"""
     if not start_date:
@@ -406,7 +406,7 @@ def get_account_statement(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """Get detailed account statement for a customer"""
     # Verify access
@@ -477,7 +477,7 @@ class VehicleKmEntryRequest(BaseModel):
 def add_vehicle_km_entry(
     entry_data: VehicleKmEntryRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """Add daily vehicle kilometer entry (Driver or Admin)"""
     if current_user.role not in [UserRole.DRIVER, UserRole.ADMIN]:
@@ -9,7 +9,7 @@ from database import get_db
 from models.stock import StockTransaction, StockTransactionType, CurrentStock
 from models.order import Order, OrderStatus
 from models.user import User
-from utils.auth_dependency import get_current_admin, get_current_user
+from utils.auth_dependency import AuthUser, get_current_admin, get_current_user
 
 router = APIRouter(prefix="/api/stock", tags=["Stock Management"])
 
@@ -95,7 +95,7 @@ def get_or_create_current_stock(db: Session) -> CurrentStock:
 
 
 @router.get("/current", response_model=CurrentStockResponse)
-def get_current_stock(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_current_stock(db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_user)):
     """Get current stock level"""
     stock = get_or_create_current_stock(db)
     return CurrentStockResponse(
@@ -107,7 +107,7 @@ def get_current_stock(db: Session = Depends(get_db), current_user: User = Depend
 @router.get("/summary", response_model=StockSummary)
 def get_stock_summary(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """Get stock summary with totals (Admin only)"""
     stock = get_or_create_current_stock(db)
@@ -136,7 +136,7 @@ def get_stock_summary(
 def create_stock_transaction(
     request: StockTransactionCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """Create a stock transaction (Admin only)"""
     try:
@@ -198,7 +198,7 @@ def get_stock_transactions(
     limit: int = Query(default=50, le=500),
     offset: int = 0,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """Get stock transaction history (Admin only)"""
     query = db.query(StockTransaction)
@@ -244,7 +244,7 @@ def get_stock_transactions(
 def get_stock_report(
     period: str = Query("daily", regex="^(daily|weekly|monthly)$"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """Get stock in/out report with daily breakdown (Admin only)"""
     today = date.today()
@@ -337,7 +337,7 @@ def get_stock_report(
 @router.post("/sync-from-orders")
 def sync_stock_from_orders(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
+    current_user: AuthUser = Depends(get_current_admin)
 ):
     """Sync stock out from delivered orders (Admin only) - One time utility"""
     delivered_orders = db.query(Order).filter(Order.status == OrderStatus.DELIVERED).all()
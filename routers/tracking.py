@@ -1,26 +1,52 @@
 from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select, true
+from sqlalchemy.orm import Session, Bundle
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Tuple
+from typing import List, Optional, Dict, Set
 from datetime import datetime
 from database import get_db
 from models.truck_location import TruckLocation
 from models.user import User
 from models.order import Order, OrderStatus
 from models.customer import Customer
-from utils.auth_dependency import get_current_user, get_current_admin_or_driver
-from utils.distance import get_distance_and_eta, get_route_with_geometry, haversine_distance, get_alternative_routes
-import json
+from config import settings
+from utils.auth_dependency import AuthUser, get_current_user, get_current_admin_or_driver
+from utils.distance import get_distance_and_eta, get_route_with_geometry, get_alternative_routes
+from utils.distance_fast import moved_more_than_m
+from utils.polyline import simplify, is_valid_india_bulk
+from utils.route_cache import RouteCache, SharedRouteCache
+from utils.ws_hotpath import prepare, FLAG_VALID, FLAG_MOVED
+from services.location_writer import enqueue_location
+from collections import defaultdict
+import asyncio
 import math
+import time
 import logging
+import orjson
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api/tracking", tags=["Tracking"])
+router = APIRouter(prefix="/api/tracking", tags=["Tracking"], default_response_class=ORJSONResponse)
 
-route_cache: Dict[int, Tuple[float, float, float, float, List[List[float]]]] = {}
-selected_route_cache: Dict[int, int] = {}
+# Bounded per-order caches: order_id -> (driver_lat, driver_lng, cust_lat, cust_lng, route_coords, cached_at)
+# and order_id -> selected route index
+ROUTE_CACHE_CAPACITY = 4096
+route_cache = RouteCache(ROUTE_CACHE_CAPACITY)
+selected_route_cache = RouteCache(ROUTE_CACHE_CAPACITY)
+# Shared across workers when REDIS_URL is configured; no-op otherwise
+shared_route_cache = SharedRouteCache(settings.redis_url)
+# In-flight OSRM fetches per order so concurrent pollers share a single request
+_inflight_routes: Dict[int, asyncio.Future] = {}
 ROUTE_CACHE_THRESHOLD_METERS = 100
+# Below this speed a truck cannot cover ROUTE_CACHE_THRESHOLD_METERS within ROUTE_CACHE_FRESH_SECONDS
+ROUTE_CACHE_FRESH_SECONDS = 5.0
+ROUTE_CACHE_FRESH_MAX_SPEED_KMH = ROUTE_CACHE_THRESHOLD_METERS / ROUTE_CACHE_FRESH_SECONDS * 3.6
+# Pings closer than this to the last stored position are not written to the database,
+# except for one heartbeat row per interval so a parked driver still shows as recently seen
+STATIONARY_THRESHOLD_METERS = 5.0
+STATIONARY_HEARTBEAT_SECONDS = 60
 OFF_ROUTE_THRESHOLD_METERS = 50
 
 def is_valid_india_location(latitude: float, longitude: float) -> bool:
@@ -87,18 +113,201 @@ class RecalculateRouteRequest(BaseModel):
     driver_lat: float
     driver_lng: float
 
+def _get_order_context(db: Session, order_id: int):
+    """
+    Load an order with its driver, customer and the driver's latest location
+    in a single query (LEFT JOIN LATERAL for the latest location).
+    Only the columns the tracking endpoints use are selected, so each part is
+    a lightweight Row rather than a hydrated ORM instance.
+    Returns (order, driver, customer, location); missing parts are None.
+    """
+    latest_location = (
+        select(
+            TruckLocation.latitude,
+            TruckLocation.longitude,
+            TruckLocation.lat_cos,
+            TruckLocation.accuracy,
+            TruckLocation.speed,
+            TruckLocation.heading,
+            TruckLocation.timestamp,
+        )
+        .where(TruckLocation.driver_id == Order.driver_id)
+        .order_by(TruckLocation.timestamp.desc())
+        .limit(1)
+        .lateral("latest_location")
+    )
+    
+    stmt = (
+        select(
+            Bundle(
+                "order",
+                Order.id, Order.driver_id, Order.status, Order.customer_id,
+                Order.delivery_gps_lat, Order.delivery_gps_long, Order.delivery_address,
+            ),
+            Bundle("driver", User.id, User.name, User.mobile),
+            Bundle("customer", Customer.id, Customer.company_name, Customer.address, Customer.gps_lat, Customer.gps_long),
+            Bundle("location", *latest_location.c),
+        )
+        .outerjoin(User, User.id == Order.driver_id)
+        .outerjoin(Customer, Customer.id == Order.customer_id)
+        .outerjoin(latest_location, true())
+        .where(Order.id == order_id)
+    )
+    row = db.execute(stmt).first()
+    if row is None:
+        return None, None, None, None
+    
+    driver = row.driver if row.driver.id is not None else None
+    customer = row.customer if row.customer.id is not None else None
+    location = row.location if row.location.timestamp is not None else None
+    return row.order, driver, customer, location
+
+async def _get_cached_route(order_id: int, driver_lat: float, driver_lng: float, lat_cos: Optional[float] = None):
+    """
+    Return the cached (driver_lat, driver_lng, cust_lat, cust_lng, coords, cached_at).
+    The shared cache is only read when this worker has no route for the order or its
+    route was computed more than ROUTE_CACHE_THRESHOLD_METERS from the driver's position;
+    a newer shared route then replaces the local one.
+    """
+    local = route_cache.get(order_id)
+    if local is not None and not moved_more_than_m(
+        local[0], local[1], driver_lat, driver_lng, ROUTE_CACHE_THRESHOLD_METERS, lat_cos=lat_cos
+    ):
+        return local
+    shared = await shared_route_cache.get(order_id)
+    if shared is not None and (local is None or shared[5] > local[5]):
+        route = shared[:6]
+        route_cache.put(order_id, route)
+        return route
+    return local
+
+async def _invalidate_cached_route(order_id: int):
+    route_cache.invalidate(order_id)
+    await shared_route_cache.invalidate(order_id)
+
+async def _fetch_prepared_route(
+    order_id: int,
+    driver_lat: float,
+    driver_lng: float,
+    cust_lat: float,
+    cust_lng: float,
+    timeout: float
+):
+    """Fetch a route from OSRM and return it validated and simplified (coords None if unusable)"""
+    distance, eta, coords = await get_route_with_geometry(
+        driver_lat, driver_lng,
+        cust_lat, cust_lng,
+        timeout=timeout
+    )
+    if coords and not is_valid_india_bulk(coords):
+        logger.warning(f"Order {order_id}: OSRM route leaves the service area, discarding geometry")
+        coords = None
+    elif coords:
+        coords = simplify(coords)
+    return distance, eta, coords
+
+async def _fetch_route_across_workers(
+    order_id: int,
+    driver_lat: float,
+    driver_lng: float,
+    cust_lat: float,
+    cust_lng: float,
+    timeout: float
+):
+    """
+    Fetch a route so that at most one worker per order talks to OSRM.
+    The lock holder publishes its result to the shared cache; other workers
+    wait for it and reuse it if it was computed from (nearly) the same position.
+    Without Redis this is a plain fetch.
+    """
+    lock_token = await shared_route_cache.acquire_lock(order_id)
+    if lock_token is not None:
+        try:
+            distance, eta, coords = await _fetch_prepared_route(
+                order_id, driver_lat, driver_lng, cust_lat, cust_lng, timeout
+            )
+            if coords:
+                await shared_route_cache.put(
+                    order_id, (driver_lat, driver_lng, cust_lat, cust_lng, coords, time.time()), distance, eta
+                )
+            return distance, eta, coords
+        finally:
+            await shared_route_cache.release_lock(order_id, lock_token)
+    
+    logger.info(f"Order {order_id}: Waiting for another worker's OSRM fetch")
+    if await shared_route_cache.wait_ready(order_id, timeout):
+        shared = await shared_route_cache.get(order_id)
+        if (
+            shared is not None
+            and shared[6] is not None
+            and not moved_more_than_m(shared[0], shared[1], driver_lat, driver_lng, ROUTE_CACHE_THRESHOLD_METERS)
+        ):
+            return shared[6], shared[7], shared[4]
+    
+    return await _fetch_prepared_route(order_id, driver_lat, driver_lng, cust_lat, cust_lng, timeout)
+
+async def _fetch_route_single_flight(
+    order_id: int,
+    driver_lat: float,
+    driver_lng: float,
+    cust_lat: float,
+    cust_lng: float,
+    timeout: float
+):
+    """
+    Fetch route geometry from OSRM, coalescing concurrent fetches for the same order.
+    Only the first caller in this worker talks to OSRM; others await its result.
+    """
+    pending = _inflight_routes.get(order_id)
+    if pending is not None:
+        logger.info(f"Order {order_id}: Joining in-flight OSRM fetch")
+        try:
+            return await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            # Only our own cancellation propagates; if the leader was cancelled
+            # (e.g. its client disconnected) fetch for ourselves instead
+            if not pending.cancelled():
+                raise
+        logger.info(f"Order {order_id}: In-flight OSRM fetch was cancelled, fetching again")
+        return await _fetch_route_single_flight(
+            order_id, driver_lat, driver_lng, cust_lat, cust_lng, timeout
+        )
+    
+    future = asyncio.get_running_loop().create_future()
+    _inflight_routes[order_id] = future
+    try:
+        result = await _fetch_route_across_workers(
+            order_id,
+            driver_lat, driver_lng,
+            cust_lat, cust_lng,
+            timeout
+        )
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as exc:
+        future.set_exception(exc)
+        # Joiners re-raise it; mark it retrieved so a failure nobody joined is not logged again
+        future.exception()
+        raise
+    finally:
+        _inflight_routes.pop(order_id, None)
+    
+    future.set_result(result)
+    return result
+
 @router.get("/{order_id}", response_model=OrderTrackingResponse)
-def get_order_tracking(
+async def get_order_tracking(
     order_id: int, 
     db: Session = Depends(get_db), 
-    current_user: User = Depends(get_current_user)
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """
     Get real-time tracking data for a specific order.
     Returns the driver's current location and customer delivery coordinates.
     Used by admin live tracking and customer tracking screens.
     """
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order, driver, customer, location = await run_in_threadpool(_get_order_context, db, order_id)
     
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
@@ -109,19 +318,12 @@ def get_order_tracking(
     if order.status not in [OrderStatus.ASSIGNED, OrderStatus.IN_TRANSIT]:
         raise HTTPException(status_code=404, detail="Order is not in trackable status")
     
-    location = db.query(TruckLocation).filter(
-        TruckLocation.driver_id == order.driver_id
-    ).order_by(TruckLocation.timestamp.desc()).first()
-    
     if not location:
         raise HTTPException(status_code=404, detail="No location data found for driver")
     
-    driver = db.query(User).filter(User.id == order.driver_id).first()
     if not driver:
         raise HTTPException(status_code=404, detail="Driver not found")
     
-    customer = db.query(Customer).filter(Customer.id == order.customer_id).first()
-    
     customer_lat = None
     customer_lng = None
     customer_name = None
@@ -149,22 +351,30 @@ def get_order_tracking(
     
     if cust_lat and cust_lng:
         logger.info(f"Order {order_id}: Fetching route from driver ({driver_lat}, {driver_lng}) to customer ({cust_lat}, {cust_lng})")
-        cached = route_cache.get(order_id)
+        cached = await _get_cached_route(order_id, driver_lat, driver_lng, location.lat_cos)
         should_refetch = True
         
         if cached:
-            cached_driver_lat, cached_driver_lng, cached_cust_lat, cached_cust_lng, cached_route = cached
-            movement_km = haversine_distance(cached_driver_lat, cached_driver_lng, driver_lat, driver_lng)
-            movement_meters = movement_km * 1000
+            cached_driver_lat, cached_driver_lng, cached_cust_lat, cached_cust_lng, cached_route, cached_at = cached
             
-            if movement_meters < ROUTE_CACHE_THRESHOLD_METERS:
+            # A route cached moments ago is fresh unless the truck is fast enough to cover the threshold
+            # in that window; only otherwise do the distance math
+            recently_cached = (
+                time.time() - cached_at < ROUTE_CACHE_FRESH_SECONDS
+                and (location.speed or 0) < ROUTE_CACHE_FRESH_MAX_SPEED_KMH
+            )
+            if recently_cached or not moved_more_than_m(
+                cached_driver_lat, cached_driver_lng, driver_lat, driver_lng,
+                ROUTE_CACHE_THRESHOLD_METERS, lat_cos=location.lat_cos
+            ):
                 should_refetch = False
                 route_geometry = cached_route
-                logger.info(f"Order {order_id}: Using cached route with {len(cached_route) if cached_route else 0} points (driver moved {movement_meters:.0f}m)")
+                logger.info(f"Order {order_id}: Using cached route with {len(cached_route) if cached_route else 0} points (driver moved <{ROUTE_CACHE_THRESHOLD_METERS}m)")
         
         if should_refetch:
             logger.info(f"Order {order_id}: Fetching new route from OSRM...")
-            road_distance, road_eta, route_coords = get_route_with_geometry(
+            road_distance, road_eta, route_coords = await _fetch_route_single_flight(
+                order_id,
                 driver_lat, driver_lng,
                 cust_lat, cust_lng,
                 timeout=20.0
@@ -177,7 +387,7 @@ def get_order_tracking(
                 eta_minutes = road_eta
                 if route_coords:
                     route_geometry = route_coords
-                    route_cache[order_id] = (driver_lat, driver_lng, cust_lat, cust_lng, route_coords)
+                    route_cache.put(order_id, (driver_lat, driver_lng, cust_lat, cust_lng, route_coords, time.time()))
                     logger.info(f"Order {order_id}: Cached new route with {len(route_coords)} points")
             
             if route_geometry is None and cached:
@@ -186,7 +396,7 @@ def get_order_tracking(
         
         if distance_km is None:
             logger.info(f"Order {order_id}: Using fallback distance calculation")
-            distance_km, eta_minutes, is_road = get_distance_and_eta(
+            distance_km, eta_minutes, is_road = await get_distance_and_eta(
                 driver_lat, driver_lng,
                 cust_lat, cust_lng,
                 current_speed_kmh=float(location.speed) if location.speed else None
@@ -194,14 +404,15 @@ def get_order_tracking(
         
         if route_geometry is None and distance_km is not None:
             logger.info(f"Order {order_id}: Attempting to fetch route geometry separately...")
-            _, _, route_coords = get_route_with_geometry(
+            _, _, route_coords = await _fetch_route_single_flight(
+                order_id,
                 driver_lat, driver_lng,
                 cust_lat, cust_lng,
                 timeout=25.0
             )
             if route_coords:
                 route_geometry = route_coords
-                route_cache[order_id] = (driver_lat, driver_lng, cust_lat, cust_lng, route_coords)
+                route_cache.put(order_id, (driver_lat, driver_lng, cust_lat, cust_lng, route_coords, time.time()))
                 logger.info(f"Order {order_id}: Got route geometry on second attempt: {len(route_coords)} points")
         
         logger.info(f"Order {order_id}: Final response - distance: {distance_km}, eta: {eta_minutes}, route_points: {len(route_geometry) if route_geometry else 0}")
@@ -228,16 +439,16 @@ def get_order_tracking(
     )
 
 @router.get("/{order_id}/routes", response_model=AlternativeRoutesResponse)
-def get_alternative_routes_endpoint(
+async def get_alternative_routes_endpoint(
     order_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: AuthUser = Depends(get_current_user)
 ):
     """
     Get alternative route options for an order.
     Returns up to 3 routes that driver can choose from.
     """
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order, _, customer, location = await run_in_threadpool(_get_order_context, db, order_id)
     
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
@@ -245,10 +456,6 @@ def get_alternative_routes_endpoint(
     if not order.driver_id:
         raise HTTPException(status_code=404, detail="No driver assigned to this order")
     
-    location = db.query(TruckLocation).filter(
-        TruckLocation.driver_id == order.driver_id
-    ).order_by(TruckLocation.timestamp.desc()).first()
-    
     if not location:
         raise HTTPException(status_code=404, detail="No location data found for driver")
     
@@ -256,7 +463,6 @@ def get_alternative_routes_endpoint(
     customer_lng = order.delivery_gps_long
     
     if not customer_lat or not customer_lng:
-        customer = db.query(Customer).filter(Customer.id == order.customer_id).first()
         if customer:
             customer_lat = customer.gps_lat
             customer_lng = customer.gps_long
@@ -264,7 +470,7 @@ def get_alternative_routes_endpoint(
     if not customer_lat or not customer_lng:
         raise HTTPException(status_code=404, detail="Customer location not available")
     
-    routes = get_alternative_routes(
+    routes = await get_alternative_routes(
         float(location.latitude), float(location.longitude),
         float(customer_lat), float(customer_lng)
     )
@@ -282,17 +488,18 @@ def get_alternative_routes_endpoint(
     )
 
 @router.post("/{order_id}/select-route")
-def select_route(
+async def select_route(
     order_id: int,
     request: SelectRouteRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_or_driver)
+    current_user: AuthUser = Depends(get_current_admin_or_driver)
 ):
     """
     Driver selects which route to use.
     Clears the route cache to force refetch with selected route.
     """
-    order = db.query(Order).filter(Order.id == order_id).first()
+    result = await run_in_threadpool(db.execute, select(Order.driver_id).where(Order.id == order_id))
+    order = result.first()
     
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
@@ -300,28 +507,26 @@ def select_route(
     if current_user.role == "driver" and order.driver_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to modify this order's route")
     
-    selected_route_cache[order_id] = request.route_index
-    
-    if order_id in route_cache:
-        del route_cache[order_id]
+    selected_route_cache.put(order_id, request.route_index)
+    await _invalidate_cached_route(order_id)
     
     logger.info(f"Order {order_id}: Driver selected route index {request.route_index}")
     
     return {"success": True, "selected_route_index": request.route_index}
 
 @router.post("/{order_id}/recalculate")
-def recalculate_route(
+async def recalculate_route(
     order_id: int,
     request: RecalculateRouteRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_or_driver)
+    current_user: AuthUser = Depends(get_current_admin_or_driver)
 ):
     """
     Recalculate route from driver's current position.
     Called when driver deviates from selected route.
     Returns new route options.
     """
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order, _, customer, _ = await run_in_threadpool(_get_order_context, db, order_id)
     
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
@@ -333,7 +538,6 @@ def recalculate_route(
     customer_lng = order.delivery_gps_long
     
     if not customer_lat or not customer_lng:
-        customer = db.query(Customer).filter(Customer.id == order.customer_id).first()
         if customer:
             customer_lat = customer.gps_lat
             customer_lng = customer.gps_long
@@ -341,18 +545,17 @@ def recalculate_route(
     if not customer_lat or not customer_lng:
         raise HTTPException(status_code=404, detail="Customer location not available")
     
-    if order_id in route_cache:
-        del route_cache[order_id]
-    
-    selected_route_cache[order_id] = 0
+    await _invalidate_cached_route(order_id)
+    selected_route_cache.put(order_id, 0)
     
-    routes = get_alternative_routes(
+    routes = await get_alternative_routes(
         request.driver_lat, request.driver_lng,
         float(customer_lat), float(customer_lng)
     )
     
     if not routes:
-        road_distance, road_eta, route_coords = get_route_with_geometry(
+        # An explicit recalculation must not get the geometry cached from before it
+        road_distance, road_eta, route_coords = await get_route_with_geometry.refresh(
             request.driver_lat, request.driver_lng,
             float(customer_lat), float(customer_lng)
         )
@@ -365,48 +568,85 @@ def recalculate_route(
                 "coordinates": route_coords
             }]
     
+    routes = [route for route in (routes or []) if is_valid_india_bulk(route["coordinates"])]
+    
     if not routes:
         raise HTTPException(status_code=404, detail="Could not calculate new routes")
     
-    route_cache[order_id] = (
+    for route in routes:
+        route["coordinates"] = simplify(route["coordinates"])
+    
+    recalculated = (
         request.driver_lat, request.driver_lng,
         float(customer_lat), float(customer_lng),
-        routes[0]["coordinates"]
+        routes[0]["coordinates"],
+        time.time()
+    )
+    route_cache.put(order_id, recalculated)
+    await shared_route_cache.put(
+        order_id, recalculated, routes[0]["distance_km"], routes[0]["duration_minutes"]
     )
     
     logger.info(f"Order {order_id}: Route recalculated from driver position, {len(routes)} options")
     
-    route_options = [RouteOption(**r) for r in routes]
-    
+    # Route dicts already have RouteOption's shape, so return them as-is
     return {
         "success": True,
-        "routes": [r.dict() for r in route_options],
+        "routes": routes,
         "selected_route_index": 0
     }
 
-# Store active WebSocket connections
+# Store active WebSocket connections, partitioned by driver_id
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.by_driver: Dict[int, Set[WebSocket]] = defaultdict(set)
+        self.driver_of: Dict[WebSocket, int] = {}
     
-    async def connect(self, websocket: WebSocket):
+    async def connect(self, websocket: WebSocket, driver_id: int):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.by_driver[driver_id].add(websocket)
+        self.driver_of[websocket] = driver_id
     
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        driver_id = self.driver_of.pop(websocket, None)
+        if driver_id is None:
+            return
+        sockets = self.by_driver.get(driver_id)
+        if sockets is not None:
+            sockets.discard(websocket)
+            if not sockets:
+                del self.by_driver[driver_id]
+    
+    async def _send_all(self, connections: List[WebSocket], message: dict):
+        """
+        Encode the message once and send it to the given connections concurrently.
+        datetime values are encoded natively by orjson (same ISO format as isoformat()).
+        """
+        if not connections:
+            return
+        
+        payload = orjson.dumps(message).decode()
+        results = await asyncio.gather(
+            *(connection.send_text(payload) for connection in connections),
+            return_exceptions=True
+        )
+        
+        for connection, result in zip(connections, results):
+            if isinstance(result, Exception):
+                self.disconnect(connection)
+    
+    async def broadcast_driver(self, driver_id: int, message: dict):
+        """Send a message only to sockets subscribed to this driver"""
+        await self._send_all(list(self.by_driver.get(driver_id, ())), message)
     
     async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except:
-                pass
+        """Send a message to every connected socket (global admin screens)"""
+        await self._send_all(list(self.driver_of), message)
 
 manager = ConnectionManager()
 
 @router.post("/update", response_model=LocationResponse)
-def update_location(request: LocationUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_admin_or_driver)):
+def update_location(request: LocationUpdate, db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_admin_or_driver)):
     """
     Legacy endpoint - prefer using /api/location/update instead.
     Only accepts live GPS coordinates from driver devices.
@@ -427,7 +667,7 @@ def update_location(request: LocationUpdate, db: Session = Depends(get_db), curr
 
 @router.get("/truck/{driver_id}", response_model=LocationResponse)
 @router.get("/driver/{driver_id}", response_model=LocationResponse)
-def get_driver_location(driver_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_driver_location(driver_id: int, db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_user)):
     location = db.query(TruckLocation).filter(
         TruckLocation.driver_id == driver_id
     ).order_by(TruckLocation.timestamp.desc()).first()
@@ -440,36 +680,37 @@ def get_driver_location(driver_id: int, db: Session = Depends(get_db), current_u
 
 @router.websocket("/ws/{driver_id}")
 async def websocket_endpoint(websocket: WebSocket, driver_id: int):
-    await manager.connect(websocket)
+    await manager.connect(websocket, driver_id)
+    # Last stored position and time for this driver; NaN / None until the first ping is stored
+    last_lat = last_lng = math.nan
+    last_stored_at = None
     try:
         while True:
             data = await websocket.receive_text()
-            location_data = json.loads(data)
-            
-            latitude = location_data.get('latitude') or location_data.get('lat')
-            longitude = location_data.get('longitude') or location_data.get('long')
             
-            if not latitude or not longitude:
+            try:
+                location_data = orjson.loads(data)
+                latitude = float(location_data.get('latitude') or location_data.get('lat'))
+                longitude = float(location_data.get('longitude') or location_data.get('long'))
+            except (TypeError, ValueError, AttributeError):
                 continue
-                
-            if not is_valid_india_location(latitude, longitude):
+            
+            flags = prepare(latitude, longitude, last_lat, last_lng, STATIONARY_THRESHOLD_METERS)
+            if not flags & FLAG_VALID:
                 continue
             
-            db = next(get_db())
-            location = TruckLocation(
-                driver_id=driver_id,
-                latitude=latitude,
-                longitude=longitude
-            )
-            db.add(location)
-            db.commit()
-            db.close()
+            now = datetime.utcnow()
+            # GPS jitter on a parked truck is broadcast but only stored as a periodic heartbeat
+            heartbeat_due = last_stored_at is None or (now - last_stored_at).total_seconds() >= STATIONARY_HEARTBEAT_SECONDS
+            if (flags & FLAG_MOVED or heartbeat_due) and enqueue_location(driver_id, latitude, longitude, now):
+                last_lat, last_lng = latitude, longitude
+                last_stored_at = now
             
-            await manager.broadcast({
+            await manager.broadcast_driver(driver_id, {
                 "driver_id": driver_id,
                 "latitude": latitude,
                 "longitude": longitude,
-                "timestamp": datetime.utcnow().isoformat()
+                "timestamp": now
             })
     except WebSocketDisconnect:
         manager.disconnect(websocket)
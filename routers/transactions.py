@@ -1,13 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, case
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
 from database import get_db
 from models.transaction import Transaction
-from models.user import User
-from utils.auth_dependency import get_current_user
+from utils.auth_dependency import AuthUser, get_current_user
 
 router = APIRouter(prefix="/api/transactions", tags=["Transactions"])
 
@@ -37,7 +36,7 @@ class AccountStatement(BaseModel):
     transactions: List[TransactionResponse]
 
 @router.get("/", response_model=List[TransactionResponse])
-def get_transactions(customer_id: Optional[int] = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_transactions(customer_id: Optional[int] = None, db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_user)):
     query = db.query(Transaction)
     if customer_id:
         query = query.filter(Transaction.customer_id == customer_id)
@@ -45,7 +44,7 @@ def get_transactions(customer_id: Optional[int] = None, db: Session = Depends(ge
     return transactions
 
 @router.post("/payment", response_model=TransactionResponse)
-def record_payment(request: PaymentCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def record_payment(request: PaymentCreate, db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_user)):
     # Get customer's total due
     total_due = db.query(func.sum(Transaction.due)).filter(
         Transaction.customer_id == request.customer_id
@@ -69,34 +68,26 @@ def record_payment(request: PaymentCreate, db: Session = Depends(get_db), curren
     return transaction
 
 @router.get("/statement/{customer_id}", response_model=AccountStatement)
-def get_account_statement(customer_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_account_statement(customer_id: int, db: Session = Depends(get_db), current_user: AuthUser = Depends(get_current_user)):
     transactions = db.query(Transaction).filter(
         Transaction.customer_id == customer_id
     ).order_by(Transaction.date.desc()).all()
     
-    total_amount = db.query(func.sum(Transaction.amount)).filter(
-        Transaction.customer_id == customer_id,
-        Transaction.is_payment == False
-    ).scalar() or 0.0
-    
-    total_paid = db.query(func.sum(Transaction.paid)).filter(
-        Transaction.customer_id == customer_id
-    ).scalar() or 0.0
-    
-    total_due = db.query(func.sum(Transaction.due)).filter(
+    # All four totals in a single pass using conditional aggregation
+    total_orders, total_amount, total_paid, total_due = db.query(
+        func.count(Transaction.id).filter(Transaction.is_payment == False),
+        func.sum(case((Transaction.is_payment == False, Transaction.amount), else_=0)),
+        func.sum(Transaction.paid),
+        func.sum(Transaction.due)
+    ).filter(
         Transaction.customer_id == customer_id
-    ).scalar() or 0.0
-    
-    total_orders = db.query(func.count(Transaction.id)).filter(
-        Transaction.customer_id == customer_id,
-        Transaction.is_payment == False
-    ).scalar() or 0
+    ).one()
     
     return AccountStatement(
         customer_id=customer_id,
-        total_orders=total_orders,
-        total_amount=float(total_amount),
-        total_paid=float(total_paid),
-        total_due=float(total_due),
+        total_orders=total_orders or 0,
+        total_amount=float(total_amount or 0.0),
+        total_paid=float(total_paid or 0.0),
+        total_due=float(total_due or 0.0),
         transactions=transactions
     )
@@ -7,20 +7,186 @@ from utils.security import (
 )
 from datetime import timedelta
 from config import settings
-from typing import Optional, Tuple, Dict
+from typing import Optional, Tuple, Dict, Deque
+from collections import deque
+from cachetools import TTLCache
+import hashlib
+import threading
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+    redis = None
+
+# Recent password verification results keyed by (user_id, sha256(password + stored hash)),
+# so repeated identical attempts skip the deliberately slow KDF
+VERIFY_CACHE_SIZE = 1024
+VERIFY_CACHE_TTL_SECONDS = 60
+_verified_logins: TTLCache = TTLCache(maxsize=VERIFY_CACHE_SIZE, ttl=VERIFY_CACHE_TTL_SECONDS)
+_failed_logins: TTLCache = TTLCache(maxsize=VERIFY_CACHE_SIZE, ttl=VERIFY_CACHE_TTL_SECONDS)
+_verify_cache_lock = threading.Lock()
+
+
+class LoginLockedError(Exception):
+    """Raised when an account has had too many failed logins from the same client"""
+    
+    def __init__(self, retry_after: int):
+        super().__init__("Too many failed login attempts")
+        self.retry_after = retry_after
+
+
+class LoginAttemptTracker:
+    """
+    Counts failed password checks per key (e.g. user_id or user_id:client IP) over a sliding window.
+    Only failures count, so a user who logs in correctly is never throttled.
+    With REDIS_URL set the counts are shared by every worker (fixed window from the
+    first failure); otherwise they are kept per process.
+    """
+    
+    KEY_PREFIX = "login_failures:"
+    
+    def __init__(self, max_failures: int, window_seconds: int, redis_url: Optional[str] = None):
+        self.max_failures = max_failures
+        self.window_seconds = window_seconds
+        self._failures: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+        self._redis = None
+        if redis_url and REDIS_AVAILABLE:
+            self._redis = redis.Redis.from_url(redis_url, socket_timeout=1.0)
+        elif redis_url:
+            logger.warning("REDIS_URL is set but the redis package is not installed - login lockout is per worker")
+    
+    def _prune(self, key: str, now: float) -> Deque[float]:
+        failures = self._failures.get(key)
+        if failures is None:
+            return deque()
+        cutoff = now - self.window_seconds
+        while failures and failures[0] <= cutoff:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+        return failures
+    
+    def locked_for(self, key: str) -> int:
+        """Seconds until the key may try again, 0 if it is not locked"""
+        if self._redis is not None:
+            try:
+                count = self._redis.get(self.KEY_PREFIX + key)
+                if count is None or int(count) < self.max_failures:
+                    return 0
+                return max(1, self._redis.ttl(self.KEY_PREFIX + key))
+            except Exception as e:
+                logger.warning(f"Login lockout lookup failed, using local counts: {e}")
+        
+        now = time.time()
+        with self._lock:
+            failures = self._prune(key, now)
+            if len(failures) < self.max_failures:
+                return 0
+            return max(1, int(failures[0] + self.window_seconds - now) + 1)
+    
+    def record_failure(self, key: str):
+        if self._redis is not None:
+            try:
+                redis_key = self.KEY_PREFIX + key
+                with self._redis.pipeline() as pipe:
+                    # Create the counter with the window as its TTL only if absent; INCR keeps the TTL
+                    pipe.set(redis_key, 0, ex=self.window_seconds, nx=True)
+                    pipe.incr(redis_key)
+                    pipe.execute()
+                return
+            except Exception as e:
+                logger.warning(f"Login lockout update failed, using local counts: {e}")
+        
+        now = time.time()
+        with self._lock:
+            self._prune(key, now)
+            self._failures.setdefault(key, deque()).append(now)
+    
+    def reset(self, key: str):
+        """Forget the failures for a key after a successful login"""
+        if self._redis is not None:
+            try:
+                self._redis.delete(self.KEY_PREFIX + key)
+            except Exception as e:
+                logger.warning(f"Login lockout reset failed: {e}")
+        with self._lock:
+            self._failures.pop(key, None)
+
+
+# Per (account, client IP): guessing from one address does not lock the account for everyone else
+login_attempts = LoginAttemptTracker(
+    max_failures=settings.max_login_attempts,
+    window_seconds=settings.lockout_duration_minutes * 60,
+    redis_url=settings.redis_url
+)
+# Per account, with a higher threshold: bounds the password hashing work spent on one
+# account however many addresses the guesses come from
+account_login_attempts = LoginAttemptTracker(
+    max_failures=settings.max_account_login_attempts,
+    window_seconds=settings.lockout_duration_minutes * 60,
+    redis_url=settings.redis_url
+)
+
+
+def _verify_login_password(user: User, password: str, client_ip: str) -> bool:
+    """
+    Verify a login password, reusing recent results and locking out a client (or, after
+    more failures from all clients, the account) after repeated failures.
+    Raises LoginLockedError while the lockout lasts.
+    """
+    account_key = str(user.id)
+    attempt_key = f"{user.id}:{client_ip}"
+    retry_after = login_attempts.locked_for(attempt_key) or account_login_attempts.locked_for(account_key)
+    if retry_after:
+        logger.warning(f"Login locked for user: {user.id}")
+        raise LoginLockedError(retry_after)
+    
+    key = (user.id, hashlib.sha256(password.encode() + user.password_hash.encode()).digest())
+    with _verify_cache_lock:
+        if key in _verified_logins:
+            valid = True
+        elif key in _failed_logins:
+            valid = False
+        else:
+            valid = None
+    
+    if valid is None:
+        valid = verify_password(password, user.password_hash)
+        with _verify_cache_lock:
+            if valid:
+                _verified_logins[key] = True
+            else:
+                _failed_logins[key] = True
+    
+    # The account-wide count is left to expire rather than reset, so a success cannot
+    # reopen the budget for guesses coming from elsewhere
+    if valid:
+        login_attempts.reset(attempt_key)
+    else:
+        login_attempts.record_failure(attempt_key)
+        account_login_attempts.record_failure(account_key)
+    return valid
+
 class AuthService:
     @staticmethod
-    def authenticate_user(db: Session, mobile: str, password: str) -> Optional[User]:
-        """Authenticate user with mobile and password"""
+    def authenticate_user(db: Session, mobile: str, password: str, client_ip: str = "unknown") -> Optional[User]:
+        """
+        Authenticate user with mobile and password.
+        Raises LoginLockedError when this client, or all clients together, have too many
+        recent failures for the account.
+        """
         user = db.query(User).filter(User.mobile == mobile).first()
         if not user:
             logger.warning(f"Login attempt with non-existent mobile: {mobile[:4]}****")
             return None
-        if not verify_password(password, user.password_hash):
+        if not _verify_login_password(user, password, client_ip):
             logger.warning(f"Failed login attempt for user: {user.id}")
             return None
         logger.info(f"Successful login for user: {user.id}")
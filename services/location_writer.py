@@ -0,0 +1,132 @@
+"""
+Write-behind buffer for live GPS pings
+WebSocket pings are queued in memory and flushed to truck_locations in batches,
+so N drivers pinging at 1 Hz cost one commit per flush instead of N per second
+"""
+import asyncio
+import logging
+import math
+from datetime import datetime
+from typing import Dict, List, Optional
+from fastapi.concurrency import run_in_threadpool
+from database import SessionLocal
+from models.truck_location import TruckLocation
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = 0.5
+FLUSH_BATCH_SIZE = 500
+QUEUE_MAX_SIZE = 50000
+
+_queue: Optional[asyncio.Queue] = None
+_task: Optional[asyncio.Task] = None
+# Rows taken off the queue but not yet handed to the database
+_pending: List[Dict] = []
+
+
+def enqueue_location(
+    driver_id: int,
+    latitude: float,
+    longitude: float,
+    timestamp: Optional[datetime] = None
+) -> bool:
+    """
+    Queue a location row for the next batched insert.
+
+    Returns:
+        False if the writer is not running or the buffer is full (row dropped)
+    """
+    if _queue is None:
+        return False
+    try:
+        _queue.put_nowait({
+            "driver_id": driver_id,
+            "latitude": latitude,
+            "longitude": longitude,
+            "lat_cos": math.cos(math.radians(latitude)),
+            "timestamp": timestamp or datetime.utcnow(),
+        })
+    except asyncio.QueueFull:
+        logger.warning(f"Location buffer full, dropping ping for driver {driver_id}")
+        return False
+    return True
+
+
+def _write_rows(rows: List[Dict]) -> None:
+    """Insert a batch of location rows with a single executemany and one commit"""
+    db = SessionLocal()
+    try:
+        db.execute(TruckLocation.__table__.insert(), rows)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to flush {len(rows)} location rows: {e}")
+    finally:
+        db.close()
+
+
+async def _collect_batch(rows: List[Dict]) -> None:
+    """Wait for the first row, then gather more until the batch is full or the interval ends"""
+    loop = asyncio.get_running_loop()
+    rows.append(await _queue.get())
+    deadline = loop.time() + FLUSH_INTERVAL_SECONDS
+
+    while len(rows) < FLUSH_BATCH_SIZE:
+        try:
+            rows.append(_queue.get_nowait())
+            continue
+        except asyncio.QueueEmpty:
+            pass
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        try:
+            rows.append(await asyncio.wait_for(_queue.get(), remaining))
+        except asyncio.TimeoutError:
+            break
+
+
+async def _run() -> None:
+    global _pending
+    while True:
+        await _collect_batch(_pending)
+        rows, _pending = _pending, []
+        try:
+            await run_in_threadpool(_write_rows, rows)
+        except Exception as e:
+            logger.error(f"Location flush error: {e}")
+
+
+def _drain() -> List[Dict]:
+    global _pending
+    rows, _pending = _pending, []
+    while _queue is not None and not _queue.empty():
+        rows.append(_queue.get_nowait())
+    return rows
+
+
+def start_location_writer() -> None:
+    """Start the background flush task (call from application startup)"""
+    global _queue, _task
+    if SessionLocal is None or _task is not None:
+        return
+    _queue = asyncio.Queue(maxsize=QUEUE_MAX_SIZE)
+    _task = asyncio.create_task(_run())
+    logger.info("Location write-behind buffer started")
+
+
+async def stop_location_writer() -> None:
+    """Stop the flush task and write out anything still buffered"""
+    global _queue, _task
+    if _task is None:
+        return
+    _task.cancel()
+    try:
+        await _task
+    except asyncio.CancelledError:
+        pass
+    rows = _drain()
+    if rows:
+        await run_in_threadpool(_write_rows, rows)
+    _task = None
+    _queue = None
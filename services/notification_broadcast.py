@@ -1,91 +1,168 @@
 from fastapi import WebSocket
-from typing import Dict, List, Optional
-import json
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Set, Union
 import asyncio
+import orjson
 import logging
+import zlib
 
 logger = logging.getLogger(__name__)
 
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+    aioredis = None
+
+# Pub/sub channels are notifications:role:{role} and notifications:user:{user_id}
+CHANNEL_PREFIX = "notifications:"
+
+# Per-socket send timeout and how many messages may wait for a slow client
+SEND_TIMEOUT_SECONDS = 5.0
+CHANNEL_QUEUE_SIZE = 32
+
+# zlib level for clients that opted into compressed binary frames
+COMPRESSION_LEVEL = 6
+
+@dataclass(eq=False)
+class Channel:
+    """A connected socket with its own outbound queue, drained by a relay task"""
+    websocket: WebSocket
+    user_id: int
+    role: str
+    compress: bool = False  # receive broadcasts as zlib-compressed binary frames
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(maxsize=CHANNEL_QUEUE_SIZE))
+    relay_task: Optional[asyncio.Task] = None
+
 class NotificationConnectionManager:
     """Manages WebSocket connections for real-time notification broadcasting"""
     
     def __init__(self):
-        self.active_connections: Dict[int, List[WebSocket]] = {}
-        self.role_connections: Dict[str, List[WebSocket]] = {
-            "admin": [],
-            "driver": [],
-            "customer": []
+        self.channels: Dict[WebSocket, Channel] = {}
+        self.active_connections: Dict[int, Set[Channel]] = {}
+        self.role_connections: Dict[str, Set[Channel]] = {
+            "admin": set(),
+            "driver": set(),
+            "customer": set()
         }
+        # Pending slow-client close tasks, kept referenced until they finish
+        self._close_tasks: Set[asyncio.Task] = set()
     
-    async def connect(self, websocket: WebSocket, user_id: int, role: str):
+    async def connect(self, websocket: WebSocket, user_id: int, role: str, compress: bool = False):
         """Accept a WebSocket connection and track it by user_id and role"""
         await websocket.accept()
         
+        channel = Channel(websocket=websocket, user_id=user_id, role=role, compress=compress)
+        self.channels[websocket] = channel
+        
         if user_id not in self.active_connections:
-            self.active_connections[user_id] = []
-        self.active_connections[user_id].append(websocket)
+            self.active_connections[user_id] = set()
+        self.active_connections[user_id].add(channel)
         
         if role in self.role_connections:
-            self.role_connections[role].append(websocket)
+            self.role_connections[role].add(channel)
         
+        channel.relay_task = asyncio.create_task(self._relay(channel))
         logger.info(f"WebSocket connected: user_id={user_id}, role={role}")
     
+    def _detach(self, channel: Channel):
+        """Stop tracking a channel (idempotent)"""
+        if self.channels.pop(channel.websocket, None) is None:
+            return False
+        
+        user_channels = self.active_connections.get(channel.user_id)
+        if user_channels is not None:
+            user_channels.discard(channel)
+            if not user_channels:
+                del self.active_connections[channel.user_id]
+        
+        if channel.role in self.role_connections:
+            self.role_connections[channel.role].discard(channel)
+        return True
+    
     def disconnect(self, websocket: WebSocket, user_id: int, role: str):
         """Remove a WebSocket connection"""
-        if user_id in self.active_connections:
-            try:
-                self.active_connections[user_id].remove(websocket)
-                if not self.active_connections[user_id]:
-                    del self.active_connections[user_id]
-            except ValueError:
-                pass
+        channel = self.channels.get(websocket)
+        if channel is None or not self._detach(channel):
+            return
         
-        if role in self.role_connections:
-            try:
-                self.role_connections[role].remove(websocket)
-            except ValueError:
-                pass
+        if channel.relay_task is not None and channel.relay_task is not asyncio.current_task():
+            channel.relay_task.cancel()
         
         logger.info(f"WebSocket disconnected: user_id={user_id}, role={role}")
     
-    async def send_to_user(self, user_id: int, message: dict):
-        """Send notification to a specific user"""
+    async def _relay(self, channel: Channel):
+        """Forward queued messages to the socket; detach the channel if a send fails"""
+        try:
+            while True:
+                item = await channel.queue.get()
+                if isinstance(item, bytes):
+                    send = channel.websocket.send_bytes(item)
+                else:
+                    send = channel.websocket.send_text(item)
+                await asyncio.wait_for(send, timeout=SEND_TIMEOUT_SECONDS)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("WebSocket send failed for user_id=%s: %r", channel.user_id, e)
+            self.disconnect(channel.websocket, channel.user_id, channel.role)
+    
+    async def _close_slow_channel(self, channel: Channel):
+        try:
+            await channel.websocket.close(code=1013, reason="Client too slow")
+        except Exception:
+            pass
+    
+    @staticmethod
+    def encode_message(message: dict) -> str:
+        """Encode a message once for all recipients (same compact UTF-8 JSON as send_json)"""
+        return orjson.dumps(message).decode()
+    
+    def _enqueue_many(self, channels: Iterable[Channel], encoded: str) -> int:
+        """
+        Queue a pre-encoded message on each channel without waiting for any send.
+        A channel whose queue is full is disconnected rather than allowed to lag further.
+        Channels that asked for compression get the message deflated once, shared by all of them.
+        Returns the number of channels the message was queued on.
+        """
+        queued = 0
+        compressed = None
+        for channel in channels:
+            item = encoded
+            if channel.compress:
+                if compressed is None:
+                    compressed = zlib.compress(encoded.encode(), COMPRESSION_LEVEL)
+                item = compressed
+            try:
+                channel.queue.put_nowait(item)
+                queued += 1
+            except asyncio.QueueFull:
+                logger.warning("Dropping slow WebSocket client: user_id=%s, role=%s", channel.user_id, channel.role)
+                self.disconnect(channel.websocket, channel.user_id, channel.role)
+                close_task = asyncio.create_task(self._close_slow_channel(channel))
+                self._close_tasks.add(close_task)
+                close_task.add_done_callback(self._close_tasks.discard)
+        return queued
+    
+    async def send_to_user(self, user_id: int, message: Union[dict, str]):
+        """Send notification to a specific user (message may already be encoded)"""
         if user_id in self.active_connections:
-            disconnected = []
-            for websocket in self.active_connections[user_id]:
-                try:
-                    await websocket.send_json(message)
-                    logger.info(f"Notification sent to user_id={user_id}")
-                except Exception as e:
-                    logger.error(f"Failed to send to user_id={user_id}: {e}")
-                    disconnected.append(websocket)
-            
-            for ws in disconnected:
-                try:
-                    self.active_connections[user_id].remove(ws)
-                except:
-                    pass
+            if isinstance(message, dict):
+                message = self.encode_message(message)
+            queued = self._enqueue_many(list(self.active_connections[user_id]), message)
+            logger.info("Notification sent to user_id=%s, sockets=%d", user_id, queued)
     
-    async def broadcast_to_role(self, role: str, message: dict):
-        """Broadcast notification to all users of a specific role"""
+    async def broadcast_to_role(self, role: str, message: Union[dict, str]):
+        """Broadcast notification to all users of a specific role (message may already be encoded)"""
         if role not in self.role_connections:
             return
         
-        disconnected = []
-        for websocket in self.role_connections[role]:
-            try:
-                await websocket.send_json(message)
-            except Exception as e:
-                logger.error(f"Failed to broadcast to role={role}: {e}")
-                disconnected.append(websocket)
-        
-        for ws in disconnected:
-            try:
-                self.role_connections[role].remove(ws)
-            except:
-                pass
+        if isinstance(message, dict):
+            message = self.encode_message(message)
+        recipients = self._enqueue_many(list(self.role_connections[role]), message)
         
-        logger.info(f"Broadcast sent to role={role}, recipients={len(self.role_connections[role])}")
+        logger.info("Broadcast sent to role=%s, recipients=%d", role, recipients)
     
     async def broadcast_notification(
         self, 
@@ -113,9 +190,31 @@ class NotificationConnectionManager:
         }
         
         if user_id:
-            await self.send_to_user(user_id, payload)
+            target = f"user:{user_id}"
         elif role:
-            await self.broadcast_to_role(role, payload)
+            target = f"role:{role}"
+        else:
+            return
+        
+        encoded = self.encode_message(payload)
+        
+        # With Redis every worker (including this one) receives it via the relay
+        if _redis is not None:
+            try:
+                await _redis.publish(CHANNEL_PREFIX + target, encoded)
+                return
+            except Exception as e:
+                logger.warning(f"Redis publish failed, delivering locally only: {e}")
+        
+        await self.deliver_local(target, encoded)
+    
+    async def deliver_local(self, target: str, encoded: str):
+        """Deliver an encoded message to this worker's sockets for 'user:{id}' or 'role:{role}'"""
+        kind, _, key = target.partition(":")
+        if kind == "user":
+            await self.send_to_user(int(key), encoded)
+        elif kind == "role":
+            await self.broadcast_to_role(key, encoded)
     
     def get_connection_count(self) -> dict:
         """Get current connection statistics"""
@@ -129,6 +228,67 @@ class NotificationConnectionManager:
 
 notification_manager = NotificationConnectionManager()
 
+# The application's event loop, recorded at startup so sync code running in
+# threadpool workers can hand broadcasts to it
+_event_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def set_broadcast_loop(loop: asyncio.AbstractEventLoop):
+    """Record the running event loop (called from app startup)"""
+    global _event_loop
+    _event_loop = loop
+
+# Optional Redis pub/sub so a notification created in one worker reaches
+# sockets connected to every worker
+_redis = None
+_relay_task: Optional[asyncio.Task] = None
+
+async def _relay_from_redis():
+    """Forward published notifications to this worker's sockets, reconnecting on errors"""
+    while True:
+        pubsub = _redis.pubsub()
+        try:
+            await pubsub.psubscribe(CHANNEL_PREFIX + "*")
+            async for message in pubsub.listen():
+                if message["type"] != "pmessage":
+                    continue
+                target = message["channel"].decode()[len(CHANNEL_PREFIX):]
+                await notification_manager.deliver_local(target, message["data"].decode())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Notification relay error, reconnecting: {e}")
+            await asyncio.sleep(1)
+        finally:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+def start_notification_relay(redis_url: Optional[str]):
+    """Enable cross-worker delivery when Redis is configured (call from app startup)"""
+    global _redis, _relay_task
+    if not redis_url or _relay_task is not None:
+        return
+    if not REDIS_AVAILABLE:
+        logger.warning("REDIS_URL is set but the redis package is not installed - notifications stay per-worker")
+        return
+    _redis = aioredis.from_url(redis_url)
+    _relay_task = asyncio.create_task(_relay_from_redis())
+    logger.info("Notification pub/sub relay started")
+
+async def stop_notification_relay():
+    global _redis, _relay_task
+    if _relay_task is not None:
+        _relay_task.cancel()
+        try:
+            await _relay_task
+        except asyncio.CancelledError:
+            pass
+        _relay_task = None
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+
 async def broadcast_new_notification(
     notification_id: int,
     notification_type: str,
@@ -150,3 +310,15 @@ async def broadcast_new_notification(
         order_id=order_id,
         extra_data=extra_data
     )
+
+
+def schedule_broadcast(**kwargs) -> bool:
+    """
+    Schedule broadcast_new_notification on the app event loop from any thread
+    without waiting for it. Returns False if no loop has been registered.
+    """
+    if _event_loop is None or _event_loop.is_closed():
+        logger.warning("Notification broadcast loop not registered - skipping real-time delivery")
+        return False
+    asyncio.run_coroutine_threadsafe(broadcast_new_notification(**kwargs), _event_loop)
+    return True
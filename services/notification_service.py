@@ -1,10 +1,10 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select, insert, func, union_all
+from sqlalchemy.orm import Session, aliased
 from models import Notification, NotificationType, UserRole, User
 from models.user import Language
-from typing import Optional, Dict, Any
-import asyncio
+from typing import Optional, Dict, Any, List
 import logging
-from services.notification_translations import NOTIFICATION_TITLES, NOTIFICATION_MESSAGES
+from services.notification_translations import get_notification_templates, render_template
 
 logger = logging.getLogger(__name__)
 
@@ -27,22 +27,14 @@ class NotificationService:
         metadata: Optional[Dict[str, Any]] = None
     ) -> tuple:
         """Get translated title and message for a notification"""
-        # Get title for user's language, fallback to English
-        titles = NOTIFICATION_TITLES.get(language, NOTIFICATION_TITLES.get(Language.english, {}))
-        title = titles.get(notification_type, f"Notification: {notification_type.value}")
+        title_template, message_template = get_notification_templates(language, notification_type)
+        title = title_template if title_template is not None else f"Notification: {notification_type.value}"
+        message_template = message_template or ""
         
-        # Get message for user's language, fallback to English
-        messages = NOTIFICATION_MESSAGES.get(language, NOTIFICATION_MESSAGES.get(Language.english, {}))
-        message_template = messages.get(notification_type, "")
-        
-        # Format message with metadata
+        # Format message with metadata (missing keys leave the template as-is)
         formatted_message = message_template
         if metadata and message_template:
-            try:
-                formatted_message = message_template.format(**metadata)
-            except KeyError:
-                # Missing key in metadata, use template as-is
-                pass
+            formatted_message = render_template(message_template, metadata)
         
         return title, formatted_message
     
@@ -69,6 +61,10 @@ class NotificationService:
         Returns:
             Created notification object
         """
+        # Normalize enum-or-string arguments once
+        type_value = getattr(notification_type, "value", None) or str(notification_type)
+        role_value = getattr(role, "value", None) or str(role)
+        
         # Get user's language preference
         language = NotificationService.get_user_language(db, user_id)
         
@@ -92,51 +88,114 @@ class NotificationService:
         db.commit()
         db.refresh(notification)
         
+        NotificationService._broadcast(
+            notification.id, type_value, role_value, title, formatted_message, user_id, order_id, metadata
+        )
+        
+        return notification
+    
+    @staticmethod
+    def create_notifications_bulk(db: Session, notifications: List[Dict[str, Any]]) -> List[int]:
+        """
+        Create several notifications with one INSERT ... RETURNING and a single commit
+        
+        Args:
+            db: Database session
+            notifications: One dict per notification with create_notification's keyword
+                arguments (role, notification_type, and optionally user_id, order_id, metadata)
+        
+        Returns:
+            IDs of the created notifications, in input order
+        """
+        if not notifications:
+            return []
+        
+        # Resolve every recipient's language in one query
+        user_ids = {spec["user_id"] for spec in notifications if spec.get("user_id")}
+        languages = {}
+        if user_ids:
+            languages = dict(db.execute(
+                select(User.id, User.base_language).where(User.id.in_(user_ids))
+            ).all())
+        
+        rows = []
+        for spec in notifications:
+            language = languages.get(spec.get("user_id")) or Language.english
+            title, formatted_message = NotificationService.get_translated_content(
+                spec["notification_type"], language, spec.get("metadata")
+            )
+            rows.append({
+                "user_id": spec.get("user_id"),
+                "role": spec["role"],
+                "order_id": spec.get("order_id"),
+                "type": spec["notification_type"],
+                "title": title,
+                "message": formatted_message,
+                "extra_data": spec.get("metadata"),
+                "is_read": False
+            })
+        
+        ids = db.execute(
+            insert(Notification).returning(Notification.id, sort_by_parameter_order=True),
+            rows
+        ).scalars().all()
+        db.commit()
+        
+        for notification_id, row in zip(ids, rows):
+            NotificationService._broadcast(
+                notification_id,
+                getattr(row["type"], "value", None) or str(row["type"]),
+                getattr(row["role"], "value", None) or str(row["role"]),
+                row["title"],
+                row["message"],
+                row["user_id"],
+                row["order_id"],
+                row["extra_data"]
+            )
+        
+        return ids
+    
+    @staticmethod
+    def _broadcast(
+        notification_id: int,
+        type_value: str,
+        role_value: str,
+        title: str,
+        message: str,
+        user_id: Optional[int],
+        order_id: Optional[int],
+        metadata: Optional[Dict[str, Any]]
+    ):
+        """Hand a committed notification to the real-time broadcaster"""
         try:
-            from services.notification_broadcast import broadcast_new_notification
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                asyncio.create_task(broadcast_new_notification(
-                    notification_id=notification.id,
-                    notification_type=notification_type.value if hasattr(notification_type, 'value') else str(notification_type),
-                    title=title,
-                    message=formatted_message,
-                    user_id=user_id,
-                    role=role.value if hasattr(role, 'value') else str(role),
-                    order_id=order_id,
-                    extra_data=metadata
-                ))
-            else:
-                loop.run_until_complete(broadcast_new_notification(
-                    notification_id=notification.id,
-                    notification_type=notification_type.value if hasattr(notification_type, 'value') else str(notification_type),
-                    title=title,
-                    message=formatted_message,
-                    user_id=user_id,
-                    role=role.value if hasattr(role, 'value') else str(role),
-                    order_id=order_id,
-                    extra_data=metadata
-                ))
+            from services.notification_broadcast import schedule_broadcast
+            schedule_broadcast(
+                notification_id=notification_id,
+                notification_type=type_value,
+                title=title,
+                message=message,
+                user_id=user_id,
+                role=role_value,
+                order_id=order_id,
+                extra_data=metadata
+            )
         except Exception as e:
             logger.warning(f"Failed to broadcast notification: {e}")
-        
-        return notification
+    
+    @staticmethod
+    def _owns(notification: Notification, user_id: int, user_role: str) -> bool:
+        """True if the notification is the user's own or a broadcast to their role"""
+        if notification.user_id is not None:
+            return notification.user_id == user_id
+        return notification.role == user_role
     
     @staticmethod
     def mark_as_read(db: Session, notification_id: int, user_id: int, user_role: str) -> bool:
         """Mark a notification as read - handles both user-specific and role-broadcast notifications"""
-        from sqlalchemy import or_
-        
-        # Find notification that belongs to this user (either user-specific OR role-broadcast)
-        notification = db.query(Notification).filter(
-            Notification.id == notification_id,
-            or_(
-                Notification.user_id == user_id,
-                (Notification.user_id == None) & (Notification.role == user_role)
-            )
-        ).first()
+        # Primary key lookup, ownership checked in Python
+        notification = db.get(Notification, notification_id)
         
-        if notification:
+        if notification and NotificationService._owns(notification, user_id, user_role):
             # For broadcast notifications, we can't just mark them as read globally
             # since they're shared across all users of that role
             # Instead, we would need a separate read-tracking table
@@ -158,10 +217,27 @@ class NotificationService:
         count = db.query(Notification).filter(
             Notification.user_id == user_id,
             Notification.is_read == False
-        ).update({"is_read": True})
+        ).update({"is_read": True}, synchronize_session=False)
         db.commit()
         return count
     
+    @staticmethod
+    def _feed_branches(user_id: int, user_role: str, unread_only: bool = False):
+        """
+        The two halves of a user's feed as separate selects, so each can use its own index:
+        1. Specifically for this user (user_id matches)
+        2. Broadcast to this user's role (user_id is NULL and role matches)
+        """
+        own = select(Notification).where(Notification.user_id == user_id)
+        broadcast = select(Notification).where(
+            Notification.user_id == None,
+            Notification.role == user_role
+        )
+        if unread_only:
+            own = own.where(Notification.is_read == False)
+            broadcast = broadcast.where(Notification.is_read == False)
+        return own, broadcast
+    
     @staticmethod
     def get_user_notifications(
         db: Session, 
@@ -171,32 +247,25 @@ class NotificationService:
         limit: int = 50
     ) -> list[Notification]:
         """Get notifications for a specific user - includes user-specific AND role-broadcast notifications"""
-        from sqlalchemy import or_
+        own, broadcast = NotificationService._feed_branches(user_id, user_role, unread_only)
         
-        # Get notifications that are either:
-        # 1. Specifically for this user (user_id matches)
-        # 2. Broadcast to this user's role (user_id is NULL and role matches)
-        query = db.query(Notification).filter(
-            or_(
-                Notification.user_id == user_id,
-                (Notification.user_id == None) & (Notification.role == user_role)
-            )
-        )
-        
-        if unread_only:
-            query = query.filter(Notification.is_read == False)
+        # Each branch is an index-ordered top-N; UNION ALL then merges at most 2 * limit rows
+        feed = union_all(
+            own.order_by(Notification.created_at.desc()).limit(limit),
+            broadcast.order_by(Notification.created_at.desc()).limit(limit)
+        ).subquery()
+        notification = aliased(Notification, feed)
         
-        return query.order_by(Notification.created_at.desc()).limit(limit).all()
+        return db.execute(
+            select(notification).order_by(notification.created_at.desc()).limit(limit)
+        ).scalars().all()
     
     @staticmethod
     def get_unread_count(db: Session, user_id: int, user_role: str) -> int:
         """Get count of unread notifications for a user"""
-        from sqlalchemy import or_
+        own, broadcast = NotificationService._feed_branches(user_id, user_role, unread_only=True)
         
-        return db.query(Notification).filter(
-            or_(
-                Notification.user_id == user_id,
-                (Notification.user_id == None) & (Notification.role == user_role)
-            ),
-            Notification.is_read == False
-        ).count()
+        # Two independent counts in one round trip instead of an OR over both branches
+        own_count = select(func.count()).select_from(own.subquery()).scalar_subquery()
+        broadcast_count = select(func.count()).select_from(broadcast.subquery()).scalar_subquery()
+        return db.execute(select(own_count + broadcast_count)).scalar_one()
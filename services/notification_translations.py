@@ -4,6 +4,7 @@ Supports: English, Marathi, Hindi, Gujarati, Tamil, Kannada
 """
 from models.notification import NotificationType
 from models.user import Language
+from typing import Dict, Optional, Tuple
 
 NOTIFICATION_TITLES = {
     Language.english: {
@@ -285,29 +286,59 @@ SMS_TEMPLATES = {
 }
 
 
+
+def _flatten(table: dict) -> Dict[Tuple[Language, NotificationType], Optional[str]]:
+    """
+    Flatten {language: {type: template}} into {(language, type): template} for every
+    language and type, materializing the English fallback for languages without a table.
+    Types a language has no template for map to None so callers keep their own defaults.
+    """
+    english = table[Language.english]
+    return {
+        (language, notification_type): table.get(language, english).get(notification_type)
+        for language in Language
+        for notification_type in NotificationType
+    }
+
+
+_TITLES = _flatten(NOTIFICATION_TITLES)
+_MESSAGES = _flatten(NOTIFICATION_MESSAGES)
+_SMS = _flatten(SMS_TEMPLATES)
+
+
+def get_notification_templates(language: Language, notification_type: NotificationType) -> Tuple[Optional[str], Optional[str]]:
+    """Get the raw (title, message) templates for a language, None where there is no template"""
+    key = (language, notification_type)
+    return _TITLES.get(key), _MESSAGES.get(key)
+
+
+def render_template(template: str, metadata: dict) -> str:
+    """Substitute metadata into a template; templates without placeholders are returned as-is"""
+    if "{" not in template and "}" not in template:
+        return template
+    try:
+        return template.format_map(metadata)
+    except KeyError:
+        return template
+
+
 def get_notification_title(language: Language, notification_type: NotificationType) -> str:
     """Get notification title in specified language"""
-    titles = NOTIFICATION_TITLES.get(language, NOTIFICATION_TITLES[Language.english])
-    return titles.get(notification_type, "Yadav Diesel Delivery")
+    title = _TITLES.get((language, notification_type))
+    return title if title is not None else "Yadav Diesel Delivery"
 
 
 def get_notification_message(language: Language, notification_type: NotificationType, metadata: dict) -> str:
     """Get notification message in specified language with metadata substitution"""
-    messages = NOTIFICATION_MESSAGES.get(language, NOTIFICATION_MESSAGES[Language.english])
-    template = messages.get(notification_type, "You have a new notification")
-    
-    try:
-        return template.format(**metadata)
-    except KeyError:
-        return template
+    template = _MESSAGES.get((language, notification_type))
+    if template is None:
+        template = "You have a new notification"
+    return render_template(template, metadata)
 
 
 def get_sms_message(language: Language, notification_type: NotificationType, metadata: dict) -> str:
     """Get SMS message in specified language with metadata substitution"""
-    templates = SMS_TEMPLATES.get(language, SMS_TEMPLATES[Language.english])
-    template = templates.get(notification_type, "Yadav Diesel: You have a new notification")
-    
-    try:
-        return template.format(**metadata)
-    except KeyError:
-        return template
+    template = _SMS.get((language, notification_type))
+    if template is None:
+        template = "Yadav Diesel: You have a new notification"
+    return render_template(template, metadata)
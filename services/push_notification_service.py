@@ -4,20 +4,114 @@ Sends push notifications to Android/iOS devices for all user roles
 Notifications are sent in user's preferred language
 """
 import os
-import json
+import asyncio
+import logging
 import httpx
-from typing import Optional, List, Dict, Any
+import orjson
+from collections import defaultdict
+from types import MappingProxyType
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, Mapping
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from models.user import User, UserRole, Language
+from models.customer import Customer
 from models.notification import NotificationType
-from models.notification_settings import NotificationSettings
+from utils.sql_filters import exclude_ids
+from services.settings_cache import NotificationSettingsSnapshot, NOTIFICATION_TYPE_SETTINGS, get_notification_settings_snapshot
 from services.notification_translations import get_notification_title, get_notification_message
 
+logger = logging.getLogger(__name__)
+
+FCM_BASE_URL = "https://fcm.googleapis.com"
+FCM_SEND_PATH = "/fcm/send"
+
+_push_client: Optional[httpx.AsyncClient] = None
+
+
+def _format_uncached(notification_type: NotificationType, language: Language, metadata: Dict[str, Any]) -> tuple:
+    title = get_notification_title(language, notification_type)
+    message = get_notification_message(language, notification_type, metadata)
+    return title, message
+
+
+def _build_data(notification_type: NotificationType, metadata: Optional[Dict[str, Any]]) -> Mapping[str, str]:
+    """FCM data payload (all values strings), read-only so one instance can be shared by every send"""
+    data = {
+        "type": notification_type.value,
+        "click_action": "OPEN_APP",
+        **(metadata or {})
+    }
+    return MappingProxyType({
+        key: value if isinstance(value, str) else str(value)
+        for key, value in data.items()
+    })
+
+
+def _dumps(payload: Dict[str, Any]) -> bytes:
+    # default=dict lets orjson serialize the shared MappingProxyType data
+    return orjson.dumps(payload, default=dict)
+
+
+@lru_cache(maxsize=1024)
+def _format_cached(notification_type: NotificationType, language: Language, meta_items: tuple) -> tuple:
+    """Memoized formatting - the same (type, language, metadata) always renders the same text"""
+    return _format_uncached(notification_type, language, dict(meta_items))
+
+
+def get_push_client() -> httpx.AsyncClient:
+    """Get the shared FCM HTTP client, creating it on first use"""
+    global _push_client
+    if _push_client is None or _push_client.is_closed:
+        _push_client = httpx.AsyncClient(
+            base_url=FCM_BASE_URL,
+            http2=True,
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=50),
+            # Fail fast when FCM is unreachable instead of holding the worker for the full timeout
+            timeout=httpx.Timeout(10.0, connect=2.0)
+        )
+    return _push_client
+
+
+async def close_push_client():
+    """Close the shared FCM HTTP client (called on app shutdown)"""
+    global _push_client
+    if _push_client is not None:
+        await _push_client.aclose()
+        _push_client = None
+
+
+# Synchronous recipient lookups; the async send paths run them via run_in_threadpool
+# so SQLAlchemy never blocks the event loop
+
+def _load_user(db: Session, user_id: int):
+    return db.query(User.role, User.fcm_token, User.base_language).filter(User.id == user_id).first()
+
+
+def _load_role_tokens(db: Session, role: UserRole, exclude_user_ids: Optional[List[int]]):
+    query = db.query(User.fcm_token, User.base_language).filter(
+        User.role == role,
+        User.fcm_token.isnot(None),
+        User.fcm_token != ""
+    )
+    if exclude_user_ids:
+        query = query.filter(exclude_ids(User.id, exclude_user_ids))
+    return query.all()
+
+
+def _customer_user_id(db: Session, customer_id: int) -> Optional[int]:
+    return db.query(Customer.user_id).filter(Customer.id == customer_id).scalar()
+
 
 class PushNotificationService:
-    """Service to send push notifications via FCM"""
+    """
+    Service to send push notifications via FCM.
+    The send_* and notify_* methods are coroutines: await them from async code.
+    """
     
-    FCM_API_URL = "https://fcm.googleapis.com/fcm/send"
+    FCM_API_URL = FCM_BASE_URL + FCM_SEND_PATH
+    # FCM accepts at most 500 registration_ids per request
+    FCM_MAX_TOKENS_PER_REQUEST = 500
     
     @staticmethod
     def get_fcm_server_key() -> Optional[str]:
@@ -25,14 +119,13 @@ class PushNotificationService:
         return os.environ.get("FCM_SERVER_KEY")
     
     @staticmethod
-    def get_notification_settings(db: Session) -> Optional[NotificationSettings]:
-        """Get notification settings from database"""
-        return db.query(NotificationSettings).first()
+    def get_notification_settings(db: Session) -> Optional[NotificationSettingsSnapshot]:
+        """Get notification settings (cached snapshot, refreshed periodically)"""
+        return get_notification_settings_snapshot(db)
     
     @staticmethod
-    def is_role_notifications_enabled(db: Session, role: UserRole) -> bool:
+    def is_role_notifications_enabled(settings: Optional[NotificationSettingsSnapshot], role: UserRole) -> bool:
         """Check if notifications are enabled for a specific role"""
-        settings = PushNotificationService.get_notification_settings(db)
         if not settings:
             return True
         
@@ -45,40 +138,108 @@ class PushNotificationService:
         return True
     
     @staticmethod
-    def is_notification_type_enabled(db: Session, notification_type: NotificationType) -> bool:
+    def is_notification_type_enabled(settings: Optional[NotificationSettingsSnapshot], notification_type: NotificationType) -> bool:
         """Check if a specific notification type is enabled"""
-        settings = PushNotificationService.get_notification_settings(db)
         if not settings:
             return True
         
-        type_settings = {
-            NotificationType.ORDER_INITIATED: settings.order_created_notify,
-            NotificationType.NEW_ORDER: settings.order_created_notify,
-            NotificationType.DRIVER_ASSIGNED: settings.order_assigned_notify,
-            NotificationType.ORDER_ASSIGNED: settings.order_assigned_notify,
-            NotificationType.ORDER_IN_TRANSIT: settings.delivery_started_notify,
-            NotificationType.DELIVERY_STARTED: settings.delivery_started_notify,
-            NotificationType.ORDER_DELIVERED: settings.delivery_completed_notify,
-            NotificationType.DELIVERY_COMPLETED: settings.delivery_completed_notify,
-            NotificationType.PAYMENT_RECEIVED: settings.payment_received_notify,
-            NotificationType.PAYMENT_CONFIRMED: settings.payment_received_notify,
-            NotificationType.LOW_STOCK: settings.low_stock_notify,
-        }
-        return type_settings.get(notification_type, True)
+        setting_name = NOTIFICATION_TYPE_SETTINGS.get(notification_type)
+        if setting_name is None:
+            return True
+        return getattr(settings, setting_name)
     
     @staticmethod
     def format_message(notification_type: NotificationType, metadata: Dict[str, Any], language: Language = Language.english) -> tuple:
         """Format notification title and message using templates in user's language"""
-        title = get_notification_title(language, notification_type)
-        message = get_notification_message(language, notification_type, metadata or {})
-        return title, message
+        try:
+            return _format_cached(notification_type, language, tuple(sorted((metadata or {}).items())))
+        except TypeError:
+            # Unhashable metadata values - format without caching
+            return _format_uncached(notification_type, language, metadata or {})
+    
+    @staticmethod
+    def _build_headers(server_key: str) -> Dict[str, str]:
+        return {
+            "Authorization": f"key={server_key}",
+            "Content-Type": "application/json"
+        }
+    
+    @staticmethod
+    def _build_payload(title: str, message: str, data: Optional[Mapping[str, Any]] = None) -> Dict[str, Any]:
+        """FCM message body without the target (to / registration_ids)"""
+        return {
+            "notification": {
+                "title": title,
+                "body": message,
+                "sound": "default",
+                "click_action": "OPEN_APP"
+            },
+            "data": data or {},
+            "priority": "high"
+        }
     
     @staticmethod
-    def send_to_token(
+    async def send_multicast(
+        fcm_tokens: List[str],
+        title: str,
+        message: str,
+        data: Optional[Mapping[str, Any]] = None
+    ) -> int:
+        """
+        Send the same push notification to many device tokens,
+        one FCM request per FCM_MAX_TOKENS_PER_REQUEST tokens
+        Returns number of tokens the notification was delivered to
+        """
+        server_key = PushNotificationService.get_fcm_server_key()
+        if not server_key:
+            logger.warning("FCM_SERVER_KEY not configured. Skipping push notification.")
+            return 0
+        
+        tokens = [token for token in fcm_tokens if token]
+        headers = PushNotificationService._build_headers(server_key)
+        chunk_size = PushNotificationService.FCM_MAX_TOKENS_PER_REQUEST
+        base_payload = PushNotificationService._build_payload(title, message, data)
+        
+        async def send_chunk(chunk: List[str]) -> int:
+            payload = {**base_payload, "registration_ids": chunk}
+            
+            try:
+                response = await get_push_client().post(
+                    FCM_SEND_PATH,
+                    headers=headers,
+                    content=_dumps(payload)
+                )
+                
+                if response.status_code != 200:
+                    logger.error(f"FCM API error: {response.status_code} - {response.text}")
+                    return 0
+                
+                result = response.json()
+                failed = [
+                    (token, item.get("error"))
+                    for token, item in zip(chunk, result.get("results", []))
+                    if "error" in item
+                ]
+                if failed:
+                    logger.warning(f"FCM multicast: {len(failed)}/{len(chunk)} tokens failed, e.g. {failed[0][0][:20]}...: {failed[0][1]}")
+                return result.get("success", 0)
+                    
+            except Exception as e:
+                logger.error(f"Error sending multicast push notification: {e}")
+                return 0
+        
+        results = await asyncio.gather(*(
+            send_chunk(tokens[start:start + chunk_size])
+            for start in range(0, len(tokens), chunk_size)
+        ))
+        return sum(results)
+    
+    @staticmethod
+    async def send_to_token(
         fcm_token: str,
         title: str,
         message: str,
-        data: Optional[Dict[str, Any]] = None
+        data: Optional[Mapping[str, Any]] = None
     ) -> bool:
         """
         Send push notification to a single device token
@@ -86,71 +247,59 @@ class PushNotificationService:
         """
         server_key = PushNotificationService.get_fcm_server_key()
         if not server_key:
-            print("FCM_SERVER_KEY not configured. Skipping push notification.")
+            logger.warning("FCM_SERVER_KEY not configured. Skipping push notification.")
             return False
         
         if not fcm_token:
             return False
         
-        headers = {
-            "Authorization": f"key={server_key}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "to": fcm_token,
-            "notification": {
-                "title": title,
-                "body": message,
-                "sound": "default",
-                "click_action": "OPEN_APP"
-            },
-            "data": data or {},
-            "priority": "high"
-        }
+        headers = PushNotificationService._build_headers(server_key)
+        payload = PushNotificationService._build_payload(title, message, data)
+        payload["to"] = fcm_token
         
         try:
-            response = httpx.post(
-                PushNotificationService.FCM_API_URL,
+            response = await get_push_client().post(
+                FCM_SEND_PATH,
                 headers=headers,
-                json=payload,
-                timeout=10.0
+                content=_dumps(payload)
             )
             
             if response.status_code == 200:
                 result = response.json()
                 if result.get("success", 0) > 0:
-                    print(f"Push notification sent successfully to token: {fcm_token[:20]}...")
+                    logger.info(f"Push notification sent successfully to token: {fcm_token[:20]}...")
                     return True
                 else:
-                    print(f"FCM returned failure: {result}")
+                    logger.warning(f"FCM returned failure: {result}")
                     return False
             else:
-                print(f"FCM API error: {response.status_code} - {response.text}")
+                logger.error(f"FCM API error: {response.status_code} - {response.text}")
                 return False
                 
         except Exception as e:
-            print(f"Error sending push notification: {e}")
+            logger.error(f"Error sending push notification: {e}")
             return False
     
     @staticmethod
-    def send_to_user(
+    async def send_to_user(
         db: Session,
         user_id: int,
         notification_type: NotificationType,
         metadata: Optional[Dict[str, Any]] = None
     ) -> bool:
         """Send push notification to a specific user in their preferred language"""
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await run_in_threadpool(_load_user, db, user_id)
         if not user or not user.fcm_token:
             return False
         
-        if not PushNotificationService.is_role_notifications_enabled(db, user.role):
-            print(f"Notifications disabled for role {user.role.value}")
+        settings = await run_in_threadpool(PushNotificationService.get_notification_settings, db)
+        
+        if not PushNotificationService.is_role_notifications_enabled(settings, user.role):
+            logger.info(f"Notifications disabled for role {user.role.value}")
             return False
         
-        if not PushNotificationService.is_notification_type_enabled(db, notification_type):
-            print(f"Notification type {notification_type.value} is disabled")
+        if not PushNotificationService.is_notification_type_enabled(settings, notification_type):
+            logger.info(f"Notification type {notification_type.value} is disabled")
             return False
         
         user_language = user.base_language if user.base_language else Language.english
@@ -161,17 +310,9 @@ class PushNotificationService:
             user_language
         )
         
-        data = {
-            "type": notification_type.value,
-            "click_action": "OPEN_APP",
-            **(metadata or {})
-        }
-        
-        for key, value in data.items():
-            if not isinstance(value, str):
-                data[key] = str(value)
+        data = _build_data(notification_type, metadata)
         
-        return PushNotificationService.send_to_token(
+        return await PushNotificationService.send_to_token(
             user.fcm_token,
             title,
             message,
@@ -179,7 +320,7 @@ class PushNotificationService:
         )
     
     @staticmethod
-    def send_to_role(
+    async def send_to_role(
         db: Session,
         role: UserRole,
         notification_type: NotificationType,
@@ -191,51 +332,39 @@ class PushNotificationService:
         Each user receives notification in their preferred language
         Returns number of successful notifications sent
         """
-        if not PushNotificationService.is_role_notifications_enabled(db, role):
-            print(f"Notifications disabled for role {role.value}")
-            return 0
+        settings = await run_in_threadpool(PushNotificationService.get_notification_settings, db)
         
-        if not PushNotificationService.is_notification_type_enabled(db, notification_type):
-            print(f"Notification type {notification_type.value} is disabled")
+        if not PushNotificationService.is_role_notifications_enabled(settings, role):
+            logger.info(f"Notifications disabled for role {role.value}")
             return 0
         
-        query = db.query(User).filter(
-            User.role == role,
-            User.fcm_token.isnot(None),
-            User.fcm_token != ""
-        )
-        
-        if exclude_user_ids:
-            query = query.filter(~User.id.in_(exclude_user_ids))
+        if not PushNotificationService.is_notification_type_enabled(settings, notification_type):
+            logger.info(f"Notification type {notification_type.value} is disabled")
+            return 0
         
-        users = query.all()
+        users = await run_in_threadpool(_load_role_tokens, db, role, exclude_user_ids)
         
-        data = {
-            "type": notification_type.value,
-            "click_action": "OPEN_APP",
-            **(metadata or {})
-        }
+        tokens_by_language: Dict[Language, List[str]] = defaultdict(list)
+        for user in users:
+            tokens_by_language[user.base_language or Language.english].append(user.fcm_token)
         
-        for key, value in data.items():
-            if not isinstance(value, str):
-                data[key] = str(value)
+        data = _build_data(notification_type, metadata)
         
-        success_count = 0
-        for user in users:
-            user_language = user.base_language if user.base_language else Language.english
+        sends = []
+        for language, tokens in tokens_by_language.items():
             title, message = PushNotificationService.format_message(
                 notification_type,
                 metadata or {},
-                user_language
+                language
             )
-            if PushNotificationService.send_to_token(user.fcm_token, title, message, data):
-                success_count += 1
+            sends.append(PushNotificationService.send_multicast(tokens, title, message, data))
+        success_count = sum(await asyncio.gather(*sends))
         
-        print(f"Sent push notification to {success_count}/{len(users)} {role.value}s")
+        logger.info(f"Sent push notification to {success_count}/{len(users)} {role.value}s")
         return success_count
     
     @staticmethod
-    def notify_order_created(db: Session, order_id: int, customer_name: str, liters: float, amount: float):
+    async def notify_order_created(db: Session, order_id: int, customer_name: str, liters: float, amount: float):
         """Notify admins about new order"""
         metadata = {
             "order_id": order_id,
@@ -243,12 +372,12 @@ class PushNotificationService:
             "liters": f"{liters:.1f}",
             "amount": f"{amount:,.2f}"
         }
-        PushNotificationService.send_to_role(
+        await PushNotificationService.send_to_role(
             db, UserRole.ADMIN, NotificationType.NEW_ORDER, metadata
         )
     
     @staticmethod
-    def notify_order_assigned(db: Session, order_id: int, driver_id: int, customer_id: int, 
+    async def notify_order_assigned(db: Session, order_id: int, driver_id: int, customer_id: int, 
                               driver_name: str, customer_name: str, liters: float):
         """Notify driver about assigned order and customer about driver assignment"""
         driver_metadata = {
@@ -256,46 +385,42 @@ class PushNotificationService:
             "customer_name": customer_name,
             "liters": f"{liters:.1f}"
         }
-        PushNotificationService.send_to_user(
+        await PushNotificationService.send_to_user(
             db, driver_id, NotificationType.ORDER_ASSIGNED, driver_metadata
         )
         
-        customer_user = db.query(User).join(User.customer).filter(
-            User.customer.has(id=customer_id)
-        ).first()
+        customer_user_id = await run_in_threadpool(_customer_user_id, db, customer_id)
         
-        if customer_user:
+        if customer_user_id:
             customer_metadata = {
                 "order_id": order_id,
                 "driver_name": driver_name
             }
-            PushNotificationService.send_to_user(
-                db, customer_user.id, NotificationType.DRIVER_ASSIGNED, customer_metadata
+            await PushNotificationService.send_to_user(
+                db, customer_user_id, NotificationType.DRIVER_ASSIGNED, customer_metadata
             )
     
     @staticmethod
-    def notify_delivery_started(db: Session, order_id: int, customer_id: int, driver_name: str):
+    async def notify_delivery_started(db: Session, order_id: int, customer_id: int, driver_name: str):
         """Notify customer and admins when delivery starts"""
         metadata = {
             "order_id": order_id,
             "driver_name": driver_name
         }
         
-        customer_user = db.query(User).join(User.customer).filter(
-            User.customer.has(id=customer_id)
-        ).first()
+        customer_user_id = await run_in_threadpool(_customer_user_id, db, customer_id)
         
-        if customer_user:
-            PushNotificationService.send_to_user(
-                db, customer_user.id, NotificationType.ORDER_IN_TRANSIT, metadata
+        if customer_user_id:
+            await PushNotificationService.send_to_user(
+                db, customer_user_id, NotificationType.ORDER_IN_TRANSIT, metadata
             )
         
-        PushNotificationService.send_to_role(
+        await PushNotificationService.send_to_role(
             db, UserRole.ADMIN, NotificationType.DELIVERY_STARTED, metadata
         )
     
     @staticmethod
-    def notify_delivery_completed(db: Session, order_id: int, customer_id: int, 
+    async def notify_delivery_completed(db: Session, order_id: int, customer_id: int, 
                                   driver_id: int, driver_name: str, liters: float):
         """Notify customer and admins when delivery is completed"""
         customer_metadata = {
@@ -304,45 +429,43 @@ class PushNotificationService:
             "driver_name": driver_name
         }
         
-        customer_user = db.query(User).join(User.customer).filter(
-            User.customer.has(id=customer_id)
-        ).first()
+        customer_user_id = await run_in_threadpool(_customer_user_id, db, customer_id)
         
-        if customer_user:
-            PushNotificationService.send_to_user(
-                db, customer_user.id, NotificationType.ORDER_DELIVERED, customer_metadata
+        if customer_user_id:
+            await PushNotificationService.send_to_user(
+                db, customer_user_id, NotificationType.ORDER_DELIVERED, customer_metadata
             )
         
         admin_metadata = {
             "order_id": order_id,
             "driver_name": driver_name
         }
-        PushNotificationService.send_to_role(
+        await PushNotificationService.send_to_role(
             db, UserRole.ADMIN, NotificationType.DELIVERY_COMPLETED, admin_metadata
         )
     
     @staticmethod
-    def notify_payment_received(db: Session, order_id: int, driver_id: int, amount: float):
+    async def notify_payment_received(db: Session, order_id: int, driver_id: int, amount: float):
         """Notify driver and admins about payment"""
         metadata = {
             "order_id": order_id,
             "amount": f"{amount:,.2f}"
         }
         
-        PushNotificationService.send_to_user(
+        await PushNotificationService.send_to_user(
             db, driver_id, NotificationType.PAYMENT_CONFIRMED, metadata
         )
         
-        PushNotificationService.send_to_role(
+        await PushNotificationService.send_to_role(
             db, UserRole.ADMIN, NotificationType.PAYMENT_RECEIVED, metadata
         )
     
     @staticmethod
-    def notify_low_stock(db: Session, stock_level: float):
+    async def notify_low_stock(db: Session, stock_level: float):
         """Notify admins about low stock"""
         metadata = {
             "stock_level": f"{stock_level:.1f}"
         }
-        PushNotificationService.send_to_role(
+        await PushNotificationService.send_to_role(
             db, UserRole.ADMIN, NotificationType.LOW_STOCK, metadata
         )
@@ -0,0 +1,91 @@
+"""
+Cached snapshot of the notification settings row
+The row is tiny and only changes when an admin edits it, so notification
+checks read a detached snapshot refreshed every SETTINGS_CACHE_TTL_SECONDS
+(or immediately after an update in this worker) instead of querying per check
+"""
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy.orm import Session
+from models.notification_settings import NotificationSettings
+from models.notification import NotificationType
+import threading
+import time
+
+SETTINGS_CACHE_TTL_SECONDS = 30.0
+
+# Which settings flag controls each notification type (types not listed are always enabled)
+NOTIFICATION_TYPE_SETTINGS = {
+    NotificationType.ORDER_INITIATED: "order_created_notify",
+    NotificationType.NEW_ORDER: "order_created_notify",
+    NotificationType.DRIVER_ASSIGNED: "order_assigned_notify",
+    NotificationType.ORDER_ASSIGNED: "order_assigned_notify",
+    NotificationType.ORDER_IN_TRANSIT: "delivery_started_notify",
+    NotificationType.DELIVERY_STARTED: "delivery_started_notify",
+    NotificationType.ORDER_DELIVERED: "delivery_completed_notify",
+    NotificationType.DELIVERY_COMPLETED: "delivery_completed_notify",
+    NotificationType.PAYMENT_RECEIVED: "payment_received_notify",
+    NotificationType.PAYMENT_CONFIRMED: "payment_received_notify",
+    NotificationType.LOW_STOCK: "low_stock_notify",
+}
+
+
+@dataclass(frozen=True)
+class NotificationSettingsSnapshot:
+    """Read-only copy of the notification settings flags"""
+    customer_notifications_enabled: bool = True
+    driver_notifications_enabled: bool = True
+    admin_notifications_enabled: bool = True
+    sms_enabled: bool = True
+    customer_sms_enabled: bool = True
+    driver_sms_enabled: bool = True
+    admin_sms_enabled: bool = True
+    order_created_notify: bool = True
+    order_assigned_notify: bool = True
+    delivery_started_notify: bool = True
+    delivery_completed_notify: bool = True
+    payment_received_notify: bool = True
+    low_stock_notify: bool = True
+
+    @classmethod
+    def from_model(cls, settings: NotificationSettings) -> "NotificationSettingsSnapshot":
+        return cls(**{name: getattr(settings, name) for name in cls.__dataclass_fields__})
+
+
+_lock = threading.Lock()
+_snapshot: Optional[NotificationSettingsSnapshot] = None
+_loaded_at = 0.0
+_loaded = False
+# Bumped on invalidation so a reload that started earlier cannot store stale data
+_generation = 0
+
+
+def get_notification_settings_snapshot(db: Session) -> Optional[NotificationSettingsSnapshot]:
+    """
+    Get the cached notification settings, reloading them when the TTL has expired.
+    Returns None if no settings row exists (callers treat that as everything enabled).
+    """
+    global _snapshot, _loaded_at, _loaded
+    now = time.monotonic()
+    with _lock:
+        if _loaded and now - _loaded_at < SETTINGS_CACHE_TTL_SECONDS:
+            return _snapshot
+        generation = _generation
+
+    settings = db.query(NotificationSettings).first()
+    snapshot = NotificationSettingsSnapshot.from_model(settings) if settings else None
+
+    with _lock:
+        if generation == _generation:
+            _snapshot = snapshot
+            _loaded_at = now
+            _loaded = True
+    return snapshot
+
+
+def invalidate_notification_settings():
+    """Drop the cached settings so the next check reloads them (call after updates)"""
+    global _loaded, _generation
+    with _lock:
+        _loaded = False
+        _generation += 1
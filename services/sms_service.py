@@ -4,11 +4,24 @@ Sends SMS notifications to users for order updates and alerts
 SMS messages are sent in user's preferred language
 """
 import os
-from typing import Optional, Dict, Any
+import atexit
+import logging
+import threading
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, NamedTuple
+from cachetools import TTLCache
 from sqlalchemy.orm import Session
 from models.user import User, UserRole, Language
+from models.customer import Customer
 from models.notification import NotificationType
-from models.notification_settings import NotificationSettings
+from utils.sql_filters import exclude_ids
+from services.settings_cache import (
+    NotificationSettingsSnapshot,
+    NOTIFICATION_TYPE_SETTINGS,
+    get_notification_settings_snapshot,
+    invalidate_notification_settings,
+)
 from services.notification_translations import get_sms_message
 
 try:
@@ -18,6 +31,53 @@ except ImportError:
     TWILIO_AVAILABLE = False
     Client = None
 
+logger = logging.getLogger(__name__)
+
+
+class SMSRecipient(NamedTuple):
+    """The user columns needed to send an SMS"""
+    user_id: int
+    mobile: Optional[str]
+    language: Language
+    role: UserRole
+
+
+# Recently resolved recipients by user_id; entries are dropped when a user's
+# mobile or language changes (see SMSService.invalidate_recipient)
+RECIPIENT_CACHE_SIZE = 2048
+RECIPIENT_CACHE_TTL_SECONDS = 300
+_recipient_cache: TTLCache = TTLCache(maxsize=RECIPIENT_CACHE_SIZE, ttl=RECIPIENT_CACHE_TTL_SECONDS)
+_recipient_cache_lock = threading.Lock()
+
+# Twilio credentials are read once and a single client (one pooled HTTP session)
+# is shared by every SMS; call reload_twilio_config() after changing the environment
+_twilio_from_number: Optional[str] = None
+_twilio_client = None
+
+
+# Role-wide SMS are sent concurrently; Twilio calls are network-bound and release the GIL
+SMS_POOL_WORKERS = 16
+_sms_pool = ThreadPoolExecutor(max_workers=SMS_POOL_WORKERS, thread_name_prefix="sms")
+atexit.register(_sms_pool.shutdown, wait=False)
+
+
+def reload_twilio_config():
+    """(Re)read Twilio credentials from the environment and rebuild the shared client"""
+    global _twilio_from_number, _twilio_client
+    account_sid, auth_token, from_number = SMSService.get_twilio_credentials()
+    if TWILIO_AVAILABLE and all([account_sid, auth_token, from_number]):
+        _twilio_client = Client(account_sid, auth_token)
+        _twilio_from_number = from_number
+    else:
+        _twilio_client = None
+        _twilio_from_number = None
+
+
+@lru_cache(maxsize=1024)
+def _format_cached(notification_type: NotificationType, language: Language, meta_items: tuple) -> str:
+    """Memoized formatting - the same (type, language, metadata) always renders the same text"""
+    return get_sms_message(language, notification_type, dict(meta_items))
+
 
 class SMSService:
     """Service to send SMS notifications via Twilio"""
@@ -33,28 +93,28 @@ class SMSService:
     @staticmethod
     def is_configured() -> bool:
         """Check if Twilio is properly configured"""
-        if not TWILIO_AVAILABLE:
-            return False
-        account_sid, auth_token, from_number = SMSService.get_twilio_credentials()
-        return all([account_sid, auth_token, from_number])
+        return _twilio_client is not None
+    
+    @staticmethod
+    def get_notification_settings(db: Session) -> Optional[NotificationSettingsSnapshot]:
+        """Get notification settings (cached snapshot shared with push notifications)"""
+        return get_notification_settings_snapshot(db)
     
     @staticmethod
-    def get_notification_settings(db: Session) -> Optional[NotificationSettings]:
-        """Get notification settings from database"""
-        return db.query(NotificationSettings).first()
+    def invalidate_settings_cache():
+        """Drop the cached settings so the next check reloads them (call after updates)"""
+        invalidate_notification_settings()
     
     @staticmethod
-    def is_sms_enabled(db: Session) -> bool:
+    def is_sms_enabled(settings: Optional[NotificationSettingsSnapshot]) -> bool:
         """Check if SMS is globally enabled"""
-        settings = SMSService.get_notification_settings(db)
         if not settings:
             return True
         return settings.sms_enabled
     
     @staticmethod
-    def is_role_sms_enabled(db: Session, role: UserRole) -> bool:
+    def is_role_sms_enabled(settings: Optional[NotificationSettingsSnapshot], role: UserRole) -> bool:
         """Check if SMS is enabled for a specific role"""
-        settings = SMSService.get_notification_settings(db)
         if not settings:
             return True
         
@@ -70,31 +130,24 @@ class SMSService:
         return True
     
     @staticmethod
-    def is_notification_type_enabled(db: Session, notification_type: NotificationType) -> bool:
+    def is_notification_type_enabled(settings: Optional[NotificationSettingsSnapshot], notification_type: NotificationType) -> bool:
         """Check if a specific notification type is enabled"""
-        settings = SMSService.get_notification_settings(db)
         if not settings:
             return True
         
-        type_settings = {
-            NotificationType.ORDER_INITIATED: settings.order_created_notify,
-            NotificationType.NEW_ORDER: settings.order_created_notify,
-            NotificationType.DRIVER_ASSIGNED: settings.order_assigned_notify,
-            NotificationType.ORDER_ASSIGNED: settings.order_assigned_notify,
-            NotificationType.ORDER_IN_TRANSIT: settings.delivery_started_notify,
-            NotificationType.DELIVERY_STARTED: settings.delivery_started_notify,
-            NotificationType.ORDER_DELIVERED: settings.delivery_completed_notify,
-            NotificationType.DELIVERY_COMPLETED: settings.delivery_completed_notify,
-            NotificationType.PAYMENT_RECEIVED: settings.payment_received_notify,
-            NotificationType.PAYMENT_CONFIRMED: settings.payment_received_notify,
-            NotificationType.LOW_STOCK: settings.low_stock_notify,
-        }
-        return type_settings.get(notification_type, True)
+        setting_name = NOTIFICATION_TYPE_SETTINGS.get(notification_type)
+        if setting_name is None:
+            return True
+        return getattr(settings, setting_name)
     
     @staticmethod
     def format_message(notification_type: NotificationType, metadata: Dict[str, Any], language: Language = Language.english) -> str:
         """Format SMS message using templates in user's language"""
-        return get_sms_message(language, notification_type, metadata or {})
+        try:
+            return _format_cached(notification_type, language, tuple(sorted((metadata or {}).items())))
+        except TypeError:
+            # Unhashable metadata values - format without caching
+            return get_sms_message(language, notification_type, metadata or {})
     
     @staticmethod
     def send_sms(to_number: str, message: str) -> bool:
@@ -103,13 +156,11 @@ class SMSService:
         Returns True if successful, False otherwise
         """
         if not SMSService.is_configured():
-            print("Twilio not configured. Skipping SMS.")
+            logger.warning("Twilio not configured. Skipping SMS.")
             return False
         
-        account_sid, auth_token, from_number = SMSService.get_twilio_credentials()
-        
         if not to_number or len(to_number) < 10:
-            print(f"Invalid phone number: {to_number}")
+            logger.warning("Invalid phone number: %s", to_number)
             return False
         
         formatted_number = to_number
@@ -117,49 +168,108 @@ class SMSService:
             formatted_number = f"+91{to_number}"
         
         try:
-            client = Client(account_sid, auth_token)
-            
-            sms = client.messages.create(
+            sms = _twilio_client.messages.create(
                 body=message,
-                from_=from_number,
+                from_=_twilio_from_number,
                 to=formatted_number
             )
             
-            print(f"SMS sent successfully. SID: {sms.sid}")
+            logger.info("SMS sent successfully. SID: %s", sms.sid)
             return True
             
         except Exception as e:
-            print(f"Error sending SMS: {e}")
+            logger.exception("Error sending SMS: %s", e)
             return False
     
     @staticmethod
-    def send_to_user(
+    def _resolve_recipient(
         db: Session,
-        user_id: int,
+        customer_id: Optional[int] = None,
+        user_id: Optional[int] = None
+    ) -> Optional[SMSRecipient]:
+        """
+        Look up the SMS recipient for a user, or for a customer's linked user
+        (one User JOIN Customer query instead of a Customer lookup followed by a User lookup)
+        """
+        if user_id is not None:
+            with _recipient_cache_lock:
+                recipient = _recipient_cache.get(user_id)
+            if recipient is not None:
+                return recipient
+        
+        query = db.query(User.id, User.mobile, User.base_language, User.role)
+        if customer_id is not None:
+            query = query.join(Customer, Customer.user_id == User.id).filter(Customer.id == customer_id)
+        elif user_id is not None:
+            query = query.filter(User.id == user_id)
+        else:
+            return None
+        
+        row = query.first()
+        if not row:
+            return None
+        
+        recipient = SMSRecipient(row.id, row.mobile, row.base_language or Language.english, row.role)
+        with _recipient_cache_lock:
+            _recipient_cache[recipient.user_id] = recipient
+        return recipient
+    
+    @staticmethod
+    def invalidate_recipient(user_id: int):
+        """Forget a cached recipient (call after changing a user's mobile or language)"""
+        with _recipient_cache_lock:
+            _recipient_cache.pop(user_id, None)
+    
+    @staticmethod
+    def send_sms_prepared(
+        settings: Optional[NotificationSettingsSnapshot],
+        recipient: SMSRecipient,
         notification_type: NotificationType,
         metadata: Optional[Dict[str, Any]] = None
     ) -> bool:
-        """Send SMS notification to a specific user in their preferred language"""
-        if not SMSService.is_sms_enabled(db):
-            print("SMS notifications are disabled globally")
+        """Send an SMS to an already-resolved recipient, applying the notification settings"""
+        if not SMSService.is_sms_enabled(settings):
+            logger.info("SMS notifications are disabled globally")
             return False
         
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user or not user.mobile:
+        if not recipient.mobile:
             return False
         
-        if not SMSService.is_role_sms_enabled(db, user.role):
-            print(f"SMS disabled for role {user.role.value}")
+        if not SMSService.is_role_sms_enabled(settings, recipient.role):
+            logger.info("SMS disabled for role %s", recipient.role.value)
             return False
         
-        if not SMSService.is_notification_type_enabled(db, notification_type):
-            print(f"Notification type {notification_type.value} is disabled")
+        if not SMSService.is_notification_type_enabled(settings, notification_type):
+            logger.info("Notification type %s is disabled", notification_type.value)
             return False
         
-        user_language = user.base_language if user.base_language else Language.english
-        message = SMSService.format_message(notification_type, metadata or {}, user_language)
+        message = SMSService.format_message(notification_type, metadata or {}, recipient.language)
+        return SMSService.send_sms(recipient.mobile, message)
+    
+    @staticmethod
+    def send_to_user(
+        db: Session,
+        user_id: int,
+        notification_type: NotificationType,
+        metadata: Optional[Dict[str, Any]] = None,
+        settings: Optional[NotificationSettingsSnapshot] = None
+    ) -> bool:
+        """
+        Send SMS notification to a specific user in their preferred language
+        Pass settings to reuse a snapshot the caller already fetched
+        """
+        if settings is None:
+            settings = SMSService.get_notification_settings(db)
+        
+        if not SMSService.is_sms_enabled(settings):
+            logger.info("SMS notifications are disabled globally")
+            return False
+        
+        recipient = SMSService._resolve_recipient(db, user_id=user_id)
+        if not recipient:
+            return False
         
-        return SMSService.send_sms(user.mobile, message)
+        return SMSService.send_sms_prepared(settings, recipient, notification_type, metadata)
     
     @staticmethod
     def send_to_role(
@@ -174,37 +284,47 @@ class SMSService:
         Each user receives SMS in their preferred language
         Returns number of successful SMS sent
         """
-        if not SMSService.is_sms_enabled(db):
-            print("SMS notifications are disabled globally")
+        settings = SMSService.get_notification_settings(db)
+        
+        if not SMSService.is_sms_enabled(settings):
+            logger.info("SMS notifications are disabled globally")
             return 0
         
-        if not SMSService.is_role_sms_enabled(db, role):
-            print(f"SMS disabled for role {role.value}")
+        if not SMSService.is_role_sms_enabled(settings, role):
+            logger.info("SMS disabled for role %s", role.value)
             return 0
         
-        if not SMSService.is_notification_type_enabled(db, notification_type):
-            print(f"Notification type {notification_type.value} is disabled")
+        if not SMSService.is_notification_type_enabled(settings, notification_type):
+            logger.info("Notification type %s is disabled", notification_type.value)
             return 0
         
-        query = db.query(User).filter(
+        query = db.query(User.mobile, User.base_language).filter(
             User.role == role,
             User.mobile.isnot(None),
             User.mobile != ""
         )
         
         if exclude_user_ids:
-            query = query.filter(~User.id.in_(exclude_user_ids))
+            query = query.filter(exclude_ids(User.id, exclude_user_ids))
         
         users = query.all()
         
-        success_count = 0
+        # Most recipients share a language, so format each language's message once
+        messages_by_language: Dict[Language, str] = {}
+        mobiles = []
+        messages = []
         for user in users:
             user_language = user.base_language if user.base_language else Language.english
-            message = SMSService.format_message(notification_type, metadata or {}, user_language)
-            if SMSService.send_sms(user.mobile, message):
-                success_count += 1
+            message = messages_by_language.get(user_language)
+            if message is None:
+                message = SMSService.format_message(notification_type, metadata or {}, user_language)
+                messages_by_language[user_language] = message
+            mobiles.append(user.mobile)
+            messages.append(message)
+        
+        success_count = sum(_sms_pool.map(SMSService.send_sms, mobiles, messages))
         
-        print(f"Sent SMS to {success_count}/{len(users)} {role.value}s")
+        logger.info("Sent SMS to %d/%d %ss", success_count, len(users), role.value)
         return success_count
     
     @staticmethod
@@ -218,6 +338,28 @@ class SMSService:
         }
         SMSService.send_to_role(db, UserRole.ADMIN, NotificationType.NEW_ORDER, metadata)
     
+    @staticmethod
+    def _send_to_customer(
+        db: Session,
+        customer_id: int,
+        notification_type: NotificationType,
+        metadata: Dict[str, Any],
+        settings: Optional[NotificationSettingsSnapshot] = None
+    ) -> bool:
+        """Send SMS to the user linked to a customer"""
+        if settings is None:
+            settings = SMSService.get_notification_settings(db)
+        
+        if not SMSService.is_sms_enabled(settings):
+            logger.info("SMS notifications are disabled globally")
+            return False
+        
+        recipient = SMSService._resolve_recipient(db, customer_id=customer_id)
+        if not recipient:
+            return False
+        
+        return SMSService.send_sms_prepared(settings, recipient, notification_type, metadata)
+    
     @staticmethod
     def notify_order_assigned(db: Session, order_id: int, driver_id: int, customer_id: int,
                               driver_name: str, customer_name: str, liters: float):
@@ -227,44 +369,34 @@ class SMSService:
             "customer_name": customer_name,
             "liters": f"{liters:.1f}"
         }
-        SMSService.send_to_user(db, driver_id, NotificationType.ORDER_ASSIGNED, driver_metadata)
+        settings = SMSService.get_notification_settings(db)
+        SMSService.send_to_user(db, driver_id, NotificationType.ORDER_ASSIGNED, driver_metadata, settings)
         
-        from models.customer import Customer
-        customer = db.query(Customer).filter(Customer.id == customer_id).first()
-        if customer and customer.user_id:
-            customer_metadata = {
-                "order_id": order_id,
-                "driver_name": driver_name
-            }
-            SMSService.send_to_user(db, customer.user_id, NotificationType.DRIVER_ASSIGNED, customer_metadata)
+        customer_metadata = {
+            "order_id": order_id,
+            "driver_name": driver_name
+        }
+        SMSService._send_to_customer(db, customer_id, NotificationType.DRIVER_ASSIGNED, customer_metadata, settings)
     
     @staticmethod
     def notify_delivery_started(db: Session, order_id: int, customer_id: int, driver_name: str):
         """Notify customer when delivery starts via SMS"""
-        from models.customer import Customer
-        customer = db.query(Customer).filter(Customer.id == customer_id).first()
-        
-        if customer and customer.user_id:
-            metadata = {
-                "order_id": order_id,
-                "driver_name": driver_name
-            }
-            SMSService.send_to_user(db, customer.user_id, NotificationType.ORDER_IN_TRANSIT, metadata)
+        metadata = {
+            "order_id": order_id,
+            "driver_name": driver_name
+        }
+        SMSService._send_to_customer(db, customer_id, NotificationType.ORDER_IN_TRANSIT, metadata)
     
     @staticmethod
     def notify_delivery_completed(db: Session, order_id: int, customer_id: int,
                                   driver_id: int, driver_name: str, liters: float):
         """Notify customer when delivery is completed via SMS"""
-        from models.customer import Customer
-        customer = db.query(Customer).filter(Customer.id == customer_id).first()
-        
-        if customer and customer.user_id:
-            metadata = {
-                "order_id": order_id,
-                "liters": f"{liters:.1f}",
-                "driver_name": driver_name
-            }
-            SMSService.send_to_user(db, customer.user_id, NotificationType.ORDER_DELIVERED, metadata)
+        metadata = {
+            "order_id": order_id,
+            "liters": f"{liters:.1f}",
+            "driver_name": driver_name
+        }
+        SMSService._send_to_customer(db, customer_id, NotificationType.ORDER_DELIVERED, metadata)
     
     @staticmethod
     def notify_payment_received(db: Session, order_id: int, driver_id: int, amount: float):
@@ -274,3 +406,6 @@ class SMSService:
             "amount": f"{amount:,.2f}"
         }
         SMSService.send_to_user(db, driver_id, NotificationType.PAYMENT_CONFIRMED, metadata)
+
+
+reload_twilio_config()
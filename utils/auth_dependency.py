@@ -1,53 +1,194 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from jose import JWTError
+from jwt import InvalidTokenError as JWTError
 from database import get_db
 from models.user import User, UserRole
 from utils.security import decode_token
+from cachetools import TTLCache
+from dataclasses import dataclass
+from typing import Optional
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+    aioredis = None
 
 security = HTTPBearer()
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
+@dataclass(frozen=True)
+class AuthUser:
+    """
+    The authenticated user's identity - the only columns authorization checks and most
+    handlers need. Handlers that read or modify other User fields depend on
+    get_current_user_full instead.
+    """
+    id: int
+    mobile: str
+    name: str
+    role: UserRole
+
+# Authenticated users by access token, so back-to-back requests with the same token skip
+# signature verification and the user lookup. Entries also expire with the token itself.
+TOKEN_CACHE_SIZE = 10_000
+TOKEN_CACHE_TTL_SECONDS = 30
+_token_cache: TTLCache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL_SECONDS)
+# user_id -> that user's cached tokens, so an account change can drop all of them
+_tokens_by_user: TTLCache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL_SECONDS)
+# Sync handlers invalidate from threadpool workers while requests read on the event loop
+_token_cache_lock = threading.Lock()
+
+# With Redis, user invalidations are published so every worker drops its entries
+INVALIDATION_CHANNEL = "auth:invalidate_user"
+
+def _unauthorized(detail: str = "Could not validate credentials") -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def _resolve_token(token: str, db: Session) -> AuthUser:
+    """Verify a token and load its user's identity, using the short-lived token cache"""
+    with _token_cache_lock:
+        entry = _token_cache.get(token)
+    if entry is not None:
+        expires_at, auth_user = entry
+        if expires_at > time.time():
+            return auth_user
+        with _token_cache_lock:
+            _token_cache.pop(token, None)
+    
     try:
-        token = credentials.credentials
         payload = decode_token(token)
-        
-        if payload is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        mobile = payload.get("sub")
-        if mobile is None or not isinstance(mobile, str):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
     except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _unauthorized()
     
-    user = db.query(User).filter(User.mobile == mobile).first()
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    if payload is None:
+        raise _unauthorized()
+    
+    mobile = payload.get("sub")
+    if mobile is None or not isinstance(mobile, str):
+        raise _unauthorized()
+    
+    row = db.execute(
+        select(User.id, User.mobile, User.name, User.role).where(User.mobile == mobile)
+    ).first()
+    if row is None:
+        raise _unauthorized("User not found")
     
+    auth_user = AuthUser(id=row.id, mobile=row.mobile, name=row.name, role=row.role)
+    with _token_cache_lock:
+        _token_cache[token] = (payload.get("exp", 0), auth_user)
+        # Re-set (not mutate) so the index entry lives at least as long as this token's
+        tokens = {t for t in _tokens_by_user.get(auth_user.id, ()) if t in _token_cache}
+        tokens.add(token)
+        _tokens_by_user[auth_user.id] = tokens
+    return auth_user
+
+def invalidate_token(token: str):
+    """Drop a cached token (call when a token is revoked, e.g. on logout)"""
+    with _token_cache_lock:
+        _token_cache.pop(token, None)
+
+def _drop_user_tokens(user_id: int):
+    with _token_cache_lock:
+        for token in _tokens_by_user.pop(user_id, ()):
+            _token_cache.pop(token, None)
+
+def invalidate_user_tokens(user_id: int):
+    """
+    Drop every cached token of a user, in all workers when Redis is configured.
+    Call after committing a change to the cached identity (account deleted, mobile, name or role changed).
+    Safe to call from sync handlers running in the threadpool.
+    """
+    _drop_user_tokens(user_id)
+    if _redis is not None and _relay_loop is not None and not _relay_loop.is_closed():
+        asyncio.run_coroutine_threadsafe(_publish_invalidation(user_id), _relay_loop)
+
+# Optional Redis pub/sub relay for invalidate_user_tokens
+_redis = None
+_relay_loop: Optional[asyncio.AbstractEventLoop] = None
+_relay_task: Optional[asyncio.Task] = None
+
+async def _publish_invalidation(user_id: int):
+    try:
+        await _redis.publish(INVALIDATION_CHANNEL, user_id)
+    except Exception as e:
+        logger.warning(f"Token invalidation publish failed for user {user_id}, other workers keep it up to {TOKEN_CACHE_TTL_SECONDS}s: {e}")
+
+async def _relay_invalidations():
+    """Drop tokens invalidated by other workers, reconnecting on errors"""
+    while True:
+        pubsub = _redis.pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    _drop_user_tokens(int(message["data"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Token invalidation relay error, reconnecting: {e}")
+            await asyncio.sleep(1)
+        finally:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+def start_token_invalidation_relay(redis_url: Optional[str]):
+    """Share user token invalidations across workers when Redis is configured (call from app startup)"""
+    global _redis, _relay_loop, _relay_task
+    if not redis_url or _relay_task is not None:
+        return
+    if not REDIS_AVAILABLE:
+        logger.warning("REDIS_URL is set but the redis package is not installed - token invalidation stays per-worker")
+        return
+    _redis = aioredis.from_url(redis_url)
+    _relay_loop = asyncio.get_running_loop()
+    _relay_task = asyncio.create_task(_relay_invalidations())
+
+async def stop_token_invalidation_relay():
+    global _redis, _relay_loop, _relay_task
+    if _relay_task is not None:
+        _relay_task.cancel()
+        try:
+            await _relay_task
+        except asyncio.CancelledError:
+            pass
+        _relay_task = None
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+    _relay_loop = None
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> AuthUser:
+    return _resolve_token(credentials.credentials, db)
+
+async def get_current_user_full(
+    current_user: AuthUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> User:
+    """The authenticated user as a full ORM object, for handlers that need other fields or modify the user"""
+    user = db.get(User, current_user.id)
+    if user is None:
+        raise _unauthorized("User not found")
     return user
 
-async def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_admin(current_user: AuthUser = Depends(get_current_user)) -> AuthUser:
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -55,7 +196,7 @@ async def get_current_admin(current_user: User = Depends(get_current_user)) -> U
         )
     return current_user
 
-async def get_current_driver(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_driver(current_user: AuthUser = Depends(get_current_user)) -> AuthUser:
     if current_user.role != UserRole.DRIVER:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -63,7 +204,7 @@ async def get_current_driver(current_user: User = Depends(get_current_user)) ->
         )
     return current_user
 
-async def get_current_customer(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_customer(current_user: AuthUser = Depends(get_current_user)) -> AuthUser:
     if current_user.role != UserRole.CUSTOMER:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -71,7 +212,7 @@ async def get_current_customer(current_user: User = Depends(get_current_user)) -
         )
     return current_user
 
-async def get_current_admin_or_customer(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_admin_or_customer(current_user: AuthUser = Depends(get_current_user)) -> AuthUser:
     if current_user.role not in [UserRole.ADMIN, UserRole.CUSTOMER]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -79,7 +220,7 @@ async def get_current_admin_or_customer(current_user: User = Depends(get_current
         )
     return current_user
 
-async def get_current_admin_or_driver(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_admin_or_driver(current_user: AuthUser = Depends(get_current_user)) -> AuthUser:
     if current_user.role not in [UserRole.ADMIN, UserRole.DRIVER]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
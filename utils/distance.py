@@ -2,13 +2,25 @@
 Distance and ETA calculation utilities using Haversine formula and OSRM routing
 """
 import math
+import time
+import asyncio
+import functools
 import httpx
-from typing import Optional, Tuple
+from cachetools import TTLCache
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass
+from utils.jit import njit
+from config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
-OSRM_BASE_URL = "https://router.project-osrm.org"
+# Point OSRM_BASE_URL at a self-hosted osrm-backend (e.g. http://osrm:5000 on the private
+# network) to avoid the public demo server's rate limits and WAN round trips
+OSRM_BASE_URL = settings.osrm_base_url.rstrip("/")
+
+# Shared OSRM client so concurrent route requests reuse pooled keep-alive connections
+_osrm_client: Optional[httpx.AsyncClient] = None
 
 # Correction factors to align OSRM with Google Maps for Indian roads
 # These values are tuned to approximate Google Maps results
@@ -19,6 +31,170 @@ DISTANCE_CORRECTION_FACTOR = 1.10
 # Single factor applied to all routes for consistency
 DURATION_CORRECTION_FACTOR = 1.25
 
+
+def _apply_corrections(distance_meters: float, duration_seconds: float) -> Tuple[float, int]:
+    """
+    Convert a raw OSRM leg to corrected (distance_km, duration_minutes).
+    Any trip longer than 100 m takes at least a minute.
+    """
+    distance_km = (distance_meters / 1000) * DISTANCE_CORRECTION_FACTOR
+    duration_minutes = int(duration_seconds / 60 * DURATION_CORRECTION_FACTOR)
+    return distance_km, duration_minutes or int(distance_km > 0.1)
+
+# Recent OSRM results keyed by coordinates rounded to a grid: road distance barely changes
+# while a driver moves a few metres, so nearby lookups reuse the same answer.
+# 4 decimals is about 11 m, well below the 100 m movement that makes tracking refetch a route,
+# so a refetch never lands in the cell of the position the old route started from.
+_ROUTE_CACHE: TTLCache = TTLCache(maxsize=10_000, ttl=30)
+_GEOM_CACHE: TTLCache = TTLCache(maxsize=2_000, ttl=120)
+ROUTE_CACHE_DECIMALS = 4
+GEOM_CACHE_DECIMALS = 4
+
+def _quantized_cache(cache: TTLCache, decimals: int):
+    """
+    Cache an async OSRM lookup taking (lat1, lon1, lat2, lon2, ...) by rounded coordinates.
+    Failed lookups (first value None) are not cached. The wrapper gets an invalidate() to clear it
+    and a refresh() that skips the cached value and stores the fresh one.
+    """
+    def decorator(func):
+        async def fetch(key, lat1, lon1, lat2, lon2, *args, **kwargs):
+            result = await func(lat1, lon1, lat2, lon2, *args, **kwargs)
+            if result[0] is not None:
+                cache[key] = result
+            return result
+        
+        @functools.wraps(func)
+        async def wrapper(lat1: float, lon1: float, lat2: float, lon2: float, *args, **kwargs):
+            key = (round(lat1, decimals), round(lon1, decimals), round(lat2, decimals), round(lon2, decimals))
+            result = cache.get(key)
+            if result is None:
+                result = await fetch(key, lat1, lon1, lat2, lon2, *args, **kwargs)
+            return result
+        
+        async def refresh(lat1: float, lon1: float, lat2: float, lon2: float, *args, **kwargs):
+            key = (round(lat1, decimals), round(lon1, decimals), round(lat2, decimals), round(lon2, decimals))
+            return await fetch(key, lat1, lon1, lat2, lon2, *args, **kwargs)
+        
+        wrapper.invalidate = cache.clear
+        wrapper.refresh = refresh
+        return wrapper
+    return decorator
+
+class CircuitBreaker:
+    """
+    Stops calling OSRM after fail_max consecutive failures so callers fall back to
+    Haversine immediately instead of waiting for each request to time out.
+    After reset_timeout seconds one trial request is let through (half-open);
+    its success closes the breaker again, its failure re-opens it.
+    """
+    
+    def __init__(self, fail_max: int = 5, reset_timeout: float = 30.0):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_started_at: Optional[float] = None
+        self.trips = 0
+    
+    @property
+    def trial_in_flight(self) -> bool:
+        # A trial abandoned without a result (e.g. its request was cancelled) expires after reset_timeout
+        return (
+            self.trial_started_at is not None
+            and time.monotonic() - self.trial_started_at < self.reset_timeout
+        )
+    
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+    
+    def allow(self) -> bool:
+        """True if a request may be sent now"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial_in_flight:
+            self.trial_started_at = time.monotonic()
+            return True
+        return False
+    
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started_at = None
+    
+    def record_failure(self):
+        self.failures += 1
+        if self.trial_in_flight or self.failures >= self.fail_max:
+            if self.opened_at is None or self.trial_in_flight:
+                self.trips += 1
+                logger.warning(f"OSRM circuit breaker open after {self.failures} failures")
+            self.opened_at = time.monotonic()
+        self.trial_started_at = None
+    
+    def record_response(self, status_code: int):
+        """Server errors and rate limiting count as failures; any other response means OSRM is healthy"""
+        if status_code >= 500 or status_code == 429:
+            self.record_failure()
+        else:
+            self.record_success()
+    
+    def stats(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures, "trips": self.trips}
+
+osrm_breaker = CircuitBreaker()
+
+def get_osrm_client() -> httpx.AsyncClient:
+    """Get the shared OSRM HTTP client, creating it on first use"""
+    global _osrm_client
+    if _osrm_client is None or _osrm_client.is_closed:
+        _osrm_client = httpx.AsyncClient(
+            base_url=OSRM_BASE_URL,
+            http2=True,
+            timeout=httpx.Timeout(5.0),
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=50)
+        )
+    return _osrm_client
+
+def _route_path(lat1: float, lon1: float, lat2: float, lon2: float) -> str:
+    """OSRM driving route path (relative to OSRM_BASE_URL) between two points"""
+    return f"/route/v1/driving/{lon1},{lat1};{lon2},{lat2}"
+
+async def close_osrm_client():
+    """Close the shared OSRM HTTP client (called on app shutdown)"""
+    global _osrm_client
+    if _osrm_client is not None:
+        await _osrm_client.aclose()
+        _osrm_client = None
+
+# Module-level aliases skip the math attribute lookup on every call when running as plain Python
+_radians = math.radians
+_sin = math.sin
+_cos = math.cos
+_asin = math.asin
+_sqrt = math.sqrt
+
+@njit(cache=True, fastmath=True)
+def _haversine_core(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    lat1_rad = _radians(lat1)
+    lon1_rad = _radians(lon1)
+    lat2_rad = _radians(lat2)
+    lon2_rad = _radians(lon2)
+    
+    dlat = lat2_rad - lat1_rad
+    dlon = lon2_rad - lon1_rad
+    
+    a = _sin(dlat / 2)**2 + _cos(lat1_rad) * _cos(lat2_rad) * _sin(dlon / 2)**2
+    c = 2 * _asin(_sqrt(a))
+    
+    r = 6371
+    
+    return c * r
+
 def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
     Calculate the great circle distance between two points on Earth
@@ -31,22 +207,39 @@ def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     Returns:
         Distance in kilometers
     """
-    lat1_rad = math.radians(lat1)
-    lon1_rad = math.radians(lon1)
-    lat2_rad = math.radians(lat2)
-    lon2_rad = math.radians(lon2)
-    
-    dlat = lat2_rad - lat1_rad
-    dlon = lon2_rad - lon1_rad
-    
-    a = math.sin(dlat / 2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2)**2
-    c = 2 * math.asin(math.sqrt(a))
-    
-    r = 6371
-    
-    return c * r
+    return _haversine_core(lat1, lon1, lat2, lon2)
+
+@dataclass(frozen=True)
+class PreparedPoint:
+    """A fixed destination (e.g. a customer) with its trig terms precomputed for repeated distance checks"""
+    lat_rad: float
+    lon_rad: float
+    cos_lat: float
+    
+    @classmethod
+    def from_degrees(cls, lat: float, lon: float) -> "PreparedPoint":
+        lat_rad = _radians(lat)
+        return cls(lat_rad, _radians(lon), _cos(lat_rad))
 
-def get_road_distance(
+@functools.lru_cache(maxsize=4096)
+def prepare_point(lat: float, lon: float) -> PreparedPoint:
+    """
+    Cached PreparedPoint for a destination. Keyed by the coordinates themselves,
+    so a changed delivery address simply gets a new entry.
+    """
+    return PreparedPoint.from_degrees(lat, lon)
+
+def haversine_to_prepared(lat: float, lon: float, prepared: PreparedPoint) -> float:
+    """haversine_distance from (lat, lon) to a prepared point, in kilometers"""
+    lat_rad = _radians(lat)
+    dlat = prepared.lat_rad - lat_rad
+    dlon = prepared.lon_rad - _radians(lon)
+    
+    a = _sin(dlat / 2)**2 + _cos(lat_rad) * prepared.cos_lat * _sin(dlon / 2)**2
+    return 2 * _asin(_sqrt(a)) * 6371
+
+@_quantized_cache(_ROUTE_CACHE, ROUTE_CACHE_DECIMALS)
+async def get_road_distance(
     lat1: float, 
     lon1: float, 
     lat2: float, 
@@ -65,47 +258,198 @@ def get_road_distance(
     Returns:
         Tuple of (distance_km, duration_minutes) or (None, None) on failure
     """
+    if not osrm_breaker.allow():
+        return None, None
+    
     try:
-        url = f"{OSRM_BASE_URL}/route/v1/driving/{lon1},{lat1};{lon2},{lat2}"
+        path = _route_path(lat1, lon1, lat2, lon2)
         params = {
             "overview": "false",
             "annotations": "false"
         }
         
-        with httpx.Client(timeout=timeout) as client:
-            response = client.get(url, params=params)
+        response = await get_osrm_client().get(path, params=params, timeout=timeout)
+        osrm_breaker.record_response(response.status_code)
+        
+        if response.status_code == 200:
+            data = response.json()
             
-            if response.status_code == 200:
-                data = response.json()
+            if data.get("code") == "Ok" and data.get("routes"):
+                route = data["routes"][0]
+                distance_meters = route.get("distance", 0)
+                duration_seconds = route.get("duration", 0)
                 
-                if data.get("code") == "Ok" and data.get("routes"):
-                    route = data["routes"][0]
-                    distance_meters = route.get("distance", 0)
-                    duration_seconds = route.get("duration", 0)
-                    
-                    # Apply correction factors to match Google Maps
-                    distance_km = (distance_meters / 1000) * DISTANCE_CORRECTION_FACTOR
-                    duration_minutes = int((duration_seconds / 60) * DURATION_CORRECTION_FACTOR)
-                    if duration_minutes == 0 and distance_km > 0.1:
-                        duration_minutes = 1
-                    
-                    logger.debug(f"OSRM route (corrected): {distance_km:.2f} km, {duration_minutes} min")
-                    return distance_km, duration_minutes
-                else:
-                    logger.warning(f"OSRM returned no routes: {data.get('code')}")
-                    return None, None
+                # Apply correction factors to match Google Maps
+                distance_km, duration_minutes = _apply_corrections(distance_meters, duration_seconds)
+                
+                logger.debug(f"OSRM route (corrected): {distance_km:.2f} km, {duration_minutes} min")
+                return distance_km, duration_minutes
             else:
-                logger.warning(f"OSRM request failed with status {response.status_code}")
+                logger.warning(f"OSRM returned no routes: {data.get('code')}")
                 return None, None
-                
+        else:
+            logger.warning(f"OSRM request failed with status {response.status_code}")
+            return None, None
+            
     except httpx.TimeoutException:
+        osrm_breaker.record_failure()
         logger.warning("OSRM request timed out")
         return None, None
     except Exception as e:
+        osrm_breaker.record_failure()
         logger.error(f"OSRM request error: {str(e)}")
         return None, None
 
-def get_route_with_geometry(
+# Pairs requested within one window are resolved by a single OSRM /table request
+BATCH_WINDOW_SECONDS = 0.2
+BATCH_MAX_PAIRS = 50
+TABLE_TIMEOUT_SECONDS = 5.0
+
+class OSRMBatcher:
+    """
+    Collects (origin, destination) distance lookups and resolves them together with
+    OSRM's many-to-many /table service, flushing every BATCH_WINDOW_SECONDS or once
+    BATCH_MAX_PAIRS lookups are queued. Failed lookups resolve to (None, None).
+    """
+    
+    def __init__(self, window: float = BATCH_WINDOW_SECONDS, max_pairs: int = BATCH_MAX_PAIRS):
+        self.window = window
+        self.max_pairs = max_pairs
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flushes: set = set()
+    
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+    
+    def start(self):
+        """Start the batching task (call from app startup)"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop batching and release anyone still waiting (call on app shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for flush in list(self._flushes):
+            flush.cancel()
+        while self._queue is not None and not self._queue.empty():
+            _, _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_result((None, None))
+    
+    async def get_road_distance(
+        self,
+        lat1: float,
+        lon1: float,
+        lat2: float,
+        lon2: float
+    ) -> Tuple[Optional[float], Optional[int]]:
+        """Batched equivalent of get_road_distance: (distance_km, duration_minutes) or (None, None)"""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(((lat1, lon1), (lat2, lon2), future))
+        try:
+            return await asyncio.wait_for(future, TABLE_TIMEOUT_SECONDS + self.window)
+        except asyncio.TimeoutError:
+            logger.warning("OSRM table lookup timed out waiting for its batch")
+            return None, None
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_pairs:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            
+            # Flush in the background so the next window starts collecting immediately
+            flush = asyncio.create_task(self._flush(batch))
+            self._flushes.add(flush)
+            flush.add_done_callback(self._flushes.discard)
+    
+    async def _flush(self, batch: List[tuple]):
+        try:
+            await self._resolve(batch)
+        except Exception as e:
+            logger.error(f"OSRM table batch failed ({len(batch)} pairs): {str(e)}")
+        finally:
+            # Whatever happened, nobody is left waiting on this batch
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_result((None, None))
+    
+    async def _resolve(self, batch: List[tuple]):
+        sources: Dict[Tuple[float, float], int] = {}
+        destinations: Dict[Tuple[float, float], int] = {}
+        for origin, destination, _ in batch:
+            sources.setdefault(origin, len(sources))
+            destinations.setdefault(destination, len(destinations))
+        
+        coords = list(sources) + list(destinations)
+        path = "/table/v1/driving/" + ";".join(f"{lon},{lat}" for lat, lon in coords)
+        params = {
+            "sources": ";".join(str(i) for i in range(len(sources))),
+            "destinations": ";".join(str(len(sources) + i) for i in range(len(destinations))),
+            "annotations": "duration,distance"
+        }
+        
+        durations = distances = None
+        if not osrm_breaker.allow():
+            return
+        
+        try:
+            response = await get_osrm_client().get(path, params=params, timeout=TABLE_TIMEOUT_SECONDS)
+            osrm_breaker.record_response(response.status_code)
+            if response.status_code == 200:
+                data = response.json()
+                if data.get("code") == "Ok":
+                    durations = data.get("durations")
+                    distances = data.get("distances")
+                else:
+                    logger.warning(f"OSRM table returned: {data.get('code')}")
+            else:
+                logger.warning(f"OSRM table request failed with status {response.status_code}")
+        except httpx.TimeoutException:
+            osrm_breaker.record_failure()
+            logger.warning(f"OSRM table request timed out ({len(batch)} pairs)")
+        except Exception as e:
+            osrm_breaker.record_failure()
+            logger.error(f"OSRM table request error: {str(e)}")
+        
+        if not (durations and distances):
+            return
+        for origin, destination, future in batch:
+            if future.done():
+                continue
+            duration_seconds = durations[sources[origin]][destinations[destination]]
+            distance_meters = distances[sources[origin]][destinations[destination]]
+            if duration_seconds is not None and distance_meters is not None:
+                # Apply correction factors to match Google Maps
+                future.set_result(_apply_corrections(distance_meters, duration_seconds))
+
+osrm_batcher = OSRMBatcher()
+
+@_quantized_cache(_ROUTE_CACHE, ROUTE_CACHE_DECIMALS)
+async def _batched_road_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> Tuple[Optional[float], Optional[int]]:
+    """get_road_distance through the batcher, sharing get_road_distance's result cache"""
+    return await osrm_batcher.get_road_distance(lat1, lon1, lat2, lon2)
+
+@_quantized_cache(_GEOM_CACHE, GEOM_CACHE_DECIMALS)
+async def get_route_with_geometry(
     lat1: float, 
     lon1: float, 
     lat2: float, 
@@ -125,52 +469,54 @@ def get_route_with_geometry(
         Tuple of (distance_km, duration_minutes, geometry_coords) or (None, None, None) on failure
         geometry_coords is a list of [lng, lat] pairs
     """
+    if not osrm_breaker.allow():
+        return None, None, None
+    
     try:
-        url = f"{OSRM_BASE_URL}/route/v1/driving/{lon1},{lat1};{lon2},{lat2}"
+        path = _route_path(lat1, lon1, lat2, lon2)
         params = {
             "overview": "simplified",
             "geometries": "geojson"
         }
         
-        logger.info(f"OSRM geometry request: {url}")
+        logger.info(f"OSRM geometry request: {path}")
         
-        with httpx.Client(timeout=timeout) as client:
-            response = client.get(url, params=params)
-            
-            logger.info(f"OSRM response status: {response.status_code}")
+        response = await get_osrm_client().get(path, params=params, timeout=timeout)
+        osrm_breaker.record_response(response.status_code)
+        
+        logger.info(f"OSRM response status: {response.status_code}")
+        
+        if response.status_code == 200:
+            data = response.json()
             
-            if response.status_code == 200:
-                data = response.json()
+            if data.get("code") == "Ok" and data.get("routes"):
+                route = data["routes"][0]
+                distance_meters = route.get("distance", 0)
+                duration_seconds = route.get("duration", 0)
+                geometry = route.get("geometry", {})
+                coordinates = geometry.get("coordinates", [])
                 
-                if data.get("code") == "Ok" and data.get("routes"):
-                    route = data["routes"][0]
-                    distance_meters = route.get("distance", 0)
-                    duration_seconds = route.get("duration", 0)
-                    geometry = route.get("geometry", {})
-                    coordinates = geometry.get("coordinates", [])
-                    
-                    distance_km = (distance_meters / 1000) * DISTANCE_CORRECTION_FACTOR
-                    duration_minutes = int((duration_seconds / 60) * DURATION_CORRECTION_FACTOR)
-                    if duration_minutes == 0 and distance_km > 0.1:
-                        duration_minutes = 1
-                    
-                    logger.info(f"OSRM route with geometry (corrected): {distance_km:.2f} km, {duration_minutes} min, {len(coordinates)} points")
-                    return distance_km, duration_minutes, coordinates
-                else:
-                    logger.warning(f"OSRM returned no routes: {data.get('code')}")
-                    return None, None, None
+                distance_km, duration_minutes = _apply_corrections(distance_meters, duration_seconds)
+                
+                logger.info(f"OSRM route with geometry (corrected): {distance_km:.2f} km, {duration_minutes} min, {len(coordinates)} points")
+                return distance_km, duration_minutes, coordinates
             else:
-                logger.warning(f"OSRM request failed with status {response.status_code}")
+                logger.warning(f"OSRM returned no routes: {data.get('code')}")
                 return None, None, None
-                
+        else:
+            logger.warning(f"OSRM request failed with status {response.status_code}")
+            return None, None, None
+            
     except httpx.TimeoutException:
+        osrm_breaker.record_failure()
         logger.warning(f"OSRM request timed out for geometry (timeout={timeout}s)")
         return None, None, None
     except Exception as e:
+        osrm_breaker.record_failure()
         logger.error(f"OSRM request error for geometry: {str(e)}")
         return None, None, None
 
-def get_distance_and_eta(
+async def get_distance_and_eta(
     driver_lat: float,
     driver_lon: float,
     customer_lat: float,
@@ -193,7 +539,9 @@ def get_distance_and_eta(
         is_road_distance indicates if actual road distance was used
     """
     if use_road_distance:
-        road_distance, road_eta = get_road_distance(
+        # Share one OSRM /table request with concurrent lookups when the batcher is running
+        lookup = _batched_road_distance if osrm_batcher.running else get_road_distance
+        road_distance, road_eta = await lookup(
             driver_lat, driver_lon,
             customer_lat, customer_lon
         )
@@ -201,9 +549,9 @@ def get_distance_and_eta(
         if road_distance is not None and road_eta is not None:
             return road_distance, road_eta, True
     
-    straight_distance = haversine_distance(
+    straight_distance = haversine_to_prepared(
         driver_lat, driver_lon,
-        customer_lat, customer_lon
+        prepare_point(customer_lat, customer_lon)
     )
     eta = calculate_eta(straight_distance, current_speed_kmh)
     
@@ -263,7 +611,7 @@ def format_eta(eta_minutes: int) -> str:
         else:
             return f"{hours} hr {minutes} min"
 
-def get_alternative_routes(
+async def get_alternative_routes(
     lat1: float, 
     lon1: float, 
     lat2: float, 
@@ -282,54 +630,56 @@ def get_alternative_routes(
     Returns:
         List of route dictionaries with distance_km, duration_minutes, and coordinates
     """
+    if not osrm_breaker.allow():
+        return []
+    
     try:
-        url = f"{OSRM_BASE_URL}/route/v1/driving/{lon1},{lat1};{lon2},{lat2}"
+        path = _route_path(lat1, lon1, lat2, lon2)
         params = {
             "overview": "full",
             "geometries": "geojson",
             "alternatives": "true"
         }
         
-        with httpx.Client(timeout=timeout) as client:
-            response = client.get(url, params=params)
+        response = await get_osrm_client().get(path, params=params, timeout=timeout)
+        osrm_breaker.record_response(response.status_code)
+        
+        if response.status_code == 200:
+            data = response.json()
             
-            if response.status_code == 200:
-                data = response.json()
-                
-                if data.get("code") == "Ok" and data.get("routes"):
-                    routes = []
-                    for idx, route in enumerate(data["routes"][:3]):
-                        distance_meters = route.get("distance", 0)
-                        duration_seconds = route.get("duration", 0)
-                        geometry = route.get("geometry", {})
-                        coordinates = geometry.get("coordinates", [])
-                        
-                        # Apply correction factors to match Google Maps
-                        distance_km = (distance_meters / 1000) * DISTANCE_CORRECTION_FACTOR
-                        duration_minutes = int((duration_seconds / 60) * DURATION_CORRECTION_FACTOR)
-                        if duration_minutes == 0 and distance_km > 0.1:
-                            duration_minutes = 1
-                        
-                        routes.append({
-                            "route_index": idx,
-                            "distance_km": round(distance_km, 2),
-                            "duration_minutes": duration_minutes,
-                            "coordinates": coordinates
-                        })
+            if data.get("code") == "Ok" and data.get("routes"):
+                routes = []
+                for idx, route in enumerate(data["routes"][:3]):
+                    distance_meters = route.get("distance", 0)
+                    duration_seconds = route.get("duration", 0)
+                    geometry = route.get("geometry", {})
+                    coordinates = geometry.get("coordinates", [])
                     
-                    logger.debug(f"OSRM returned {len(routes)} alternative routes")
-                    return routes
-                else:
-                    logger.warning(f"OSRM returned no routes: {data.get('code')}")
-                    return []
+                    # Apply correction factors to match Google Maps
+                    distance_km, duration_minutes = _apply_corrections(distance_meters, duration_seconds)
+                    
+                    routes.append({
+                        "route_index": idx,
+                        "distance_km": round(distance_km, 2),
+                        "duration_minutes": duration_minutes,
+                        "coordinates": coordinates
+                    })
+                
+                logger.debug(f"OSRM returned {len(routes)} alternative routes")
+                return routes
             else:
-                logger.warning(f"OSRM alternatives request failed with status {response.status_code}")
+                logger.warning(f"OSRM returned no routes: {data.get('code')}")
                 return []
-                
+        else:
+            logger.warning(f"OSRM alternatives request failed with status {response.status_code}")
+            return []
+            
     except httpx.TimeoutException:
+        osrm_breaker.record_failure()
         logger.warning("OSRM alternatives request timed out")
         return []
     except Exception as e:
+        osrm_breaker.record_failure()
         logger.error(f"OSRM alternatives request error: {str(e)}")
         return []
 
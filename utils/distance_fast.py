@@ -0,0 +1,40 @@
+"""
+Fast approximate distance checks for short-range movement thresholds
+Uses an equirectangular (flat-earth) projection, accurate to well under 1%
+for the sub-kilometre distances these checks are used for
+"""
+from typing import Optional
+import math
+
+# Metres per degree of latitude (and of longitude at the equator)
+METERS_PER_DEGREE = 111320.0
+
+
+def moved_more_than_m(
+    lat1: float,
+    lng1: float,
+    lat2: float,
+    lng2: float,
+    threshold_m: float,
+    lat_cos: Optional[float] = None
+) -> bool:
+    """
+    Check whether two points are further apart than threshold_m metres.
+    Compares squared distances so no square root is needed.
+
+    Args:
+        lat1, lng1: Previous position (in degrees)
+        lat2, lng2: Current position (in degrees)
+        threshold_m: Movement threshold in metres
+        lat_cos: Precomputed cos(latitude) of either point (e.g. TruckLocation.lat_cos);
+                 computed from lat1 if omitted
+
+    Returns:
+        True if the distance between the points exceeds the threshold
+    """
+    if lat_cos is None:
+        lat_cos = math.cos(math.radians(lat1))
+    dx = (lng2 - lng1) * lat_cos * METERS_PER_DEGREE
+    dy = (lat2 - lat1) * METERS_PER_DEGREE
+    return dx * dx + dy * dy > threshold_m * threshold_m
+
@@ -0,0 +1,19 @@
+"""
+Optional Numba JIT compilation
+Exposes njit, which compiles with Numba when it is installed and
+leaves functions as plain Python otherwise
+"""
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        # Supports both @njit and @njit(...)
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+        return decorator
@@ -1,14 +1,184 @@
 """
 Comprehensive logging utilities for database logging
 """
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session
 from models.log import SystemLog, ApiLog, ErrorLog, UserActivityLog, LogLevel, LogCategory
 from database import SessionLocal
 from utils.sanitizer import DataSanitizer
-import json
-from typing import Optional, Dict, Any
+from config import settings
+import orjson
+import time
+import queue
+import atexit
+import threading
+from typing import Optional, Dict, Any, List, Tuple, Type
 from datetime import datetime
 
+# Log rows are written behind the request: log_* calls queue the row and a single
+# drain thread inserts them in batches, one transaction per batch. The db argument
+# of the log_* methods is kept for compatibility; rows never use the caller's session.
+LOG_QUEUE_MAX_SIZE = 20000
+LOG_BATCH_SIZE = 200
+LOG_FLUSH_INTERVAL_SECONDS = 0.5
+
+# Records below the configured level are discarded before any sanitizing or queueing;
+# API requests and user activity are treated as INFO
+_LEVEL_ORDER = {
+    LogLevel.DEBUG: 0,
+    LogLevel.INFO: 1,
+    LogLevel.WARNING: 2,
+    LogLevel.ERROR: 3,
+    LogLevel.CRITICAL: 4,
+}
+try:
+    _MIN_LEVEL = _LEVEL_ORDER[LogLevel(settings.log_level.lower())]
+except ValueError:
+    _MIN_LEVEL = _LEVEL_ORDER[LogLevel.INFO]
+
+
+def _should_log(level: LogLevel) -> bool:
+    return _LEVEL_ORDER[level] >= _MIN_LEVEL
+
+
+def _dumps(data: Dict[str, Any]) -> str:
+    """Serialize log details to JSON text (non-string keys are stringified like json.dumps)"""
+    return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+_log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_MAX_SIZE)
+_drain_thread: Optional[threading.Thread] = None
+_drain_lock = threading.Lock()
+_dropped_logs = 0
+
+
+def _insert_rows(db: Session, rows_by_model: Dict[Type, List[Dict[str, Any]]]):
+    for model, rows in rows_by_model.items():
+        db.execute(model.__table__.insert(), rows)
+    db.commit()
+
+
+def _write_batch(db: Session, batch: List[Tuple[Type, Dict[str, Any]]]) -> Session:
+    """
+    Insert a batch of queued log rows in one transaction, one executemany per log table.
+    If the connection was lost the batch is retried once on a fresh session.
+    Returns the session to use for the next batch.
+    """
+    rows_by_model: Dict[Type, List[Dict[str, Any]]] = {}
+    for model, fields in batch:
+        rows_by_model.setdefault(model, []).append(fields)
+    
+    try:
+        _insert_rows(db, rows_by_model)
+        return db
+    except OperationalError as e:
+        print(f"Log writer lost its database connection, retrying: {e}")
+        try:
+            db.close()
+        except Exception:
+            pass
+        db = SessionLocal()
+    except Exception as e:
+        print(f"Failed to write {len(batch)} log rows: {e}")
+        db.rollback()
+        return db
+    
+    try:
+        _insert_rows(db, rows_by_model)
+    except Exception as e:
+        print(f"Failed to write {len(batch)} log rows: {e}")
+        db.rollback()
+    return db
+
+
+def _collect_batch() -> List[Tuple[Type, Dict[str, Any]]]:
+    """Wait for the first row, then gather more until the batch is full or the interval ends"""
+    batch = [_log_queue.get()]
+    deadline = time.monotonic() + LOG_FLUSH_INTERVAL_SECONDS
+    while len(batch) < LOG_BATCH_SIZE:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(_log_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return batch
+
+
+def _drain_loop():
+    # One session reused across batches, each batch its own transaction. If a batch fails
+    # outright (even opening or rolling back a session) it is dropped and the next batch
+    # starts on a fresh session, so the thread never dies and leaves the queue to fill up.
+    db = None
+    while True:
+        batch = _collect_batch()
+        try:
+            if db is None:
+                db = SessionLocal()
+            db = _write_batch(db, batch)
+        except Exception as e:
+            print(f"Log writer dropped {len(batch)} log rows, reconnecting: {e}")
+            if db is not None:
+                try:
+                    db.close()
+                except Exception:
+                    pass
+            db = None
+            # Don't spin while the database is unreachable
+            time.sleep(LOG_FLUSH_INTERVAL_SECONDS)
+
+
+def _ensure_drain_thread():
+    """Start the drain thread on first use (in the worker process, after any fork), or restart it if it died"""
+    global _drain_thread
+    if _drain_thread is not None and _drain_thread.is_alive():
+        return
+    with _drain_lock:
+        if _drain_thread is None or not _drain_thread.is_alive():
+            thread = threading.Thread(target=_drain_loop, name="db-log-writer", daemon=True)
+            thread.start()
+            _drain_thread = thread
+
+
+def _enqueue_log(model: Type, fields: Dict[str, Any]) -> bool:
+    """Queue a log row for the drain thread; returns False if it was dropped"""
+    global _dropped_logs
+    if SessionLocal is None:
+        return False
+    _ensure_drain_thread()
+    try:
+        _log_queue.put_nowait((model, fields))
+    except queue.Full:
+        _dropped_logs += 1
+        return False
+    return True
+
+
+def flush_logs():
+    """Write out every queued log row now (runs at interpreter exit)"""
+    batch = []
+    while True:
+        try:
+            batch.append(_log_queue.get_nowait())
+        except queue.Empty:
+            break
+    if batch:
+        db = SessionLocal()
+        try:
+            db = _write_batch(db, batch)
+        finally:
+            db.close()
+
+
+def get_log_queue_stats() -> Dict[str, int]:
+    """Queued and dropped log row counts for monitoring"""
+    return {"queued": _log_queue.qsize(), "dropped": _dropped_logs}
+
+
+atexit.register(flush_logs)
+
+
 class DatabaseLogger:
     """Centralized database logger for all application logging"""
     
@@ -24,32 +194,24 @@ class DatabaseLogger:
         db: Optional[Session] = None
     ):
         """Log system events with sensitive data sanitization"""
-        should_close = False
-        if db is None:
-            db = SessionLocal()
-            should_close = True
+        if not _should_log(level):
+            return
         
         try:
             # Sanitize details dictionary
             sanitized_details = DataSanitizer.sanitize_dict(details) if details else None
             
-            log = SystemLog(
+            _enqueue_log(SystemLog, dict(
                 level=level,
                 category=category,
                 message=message,
-                details=json.dumps(sanitized_details) if sanitized_details else None,
+                details=_dumps(sanitized_details) if sanitized_details else None,
                 user_id=user_id,
                 ip_address=ip_address,
                 user_agent=user_agent
-            )
-            db.add(log)
-            db.commit()
+            ))
         except Exception as e:
-            print(f"Failed to write system log: {e}")
-            db.rollback()
-        finally:
-            if should_close:
-                db.close()
+            print(f"Failed to queue system log: {e}")
     
     @staticmethod
     def log_api_request(
@@ -64,17 +226,15 @@ class DatabaseLogger:
         db: Optional[Session] = None
     ):
         """Log API requests and responses with sensitive data sanitization"""
-        should_close = False
-        if db is None:
-            db = SessionLocal()
-            should_close = True
+        if not _should_log(LogLevel.INFO):
+            return
         
         try:
             # Sanitize request and response bodies to remove sensitive data
             sanitized_request = DataSanitizer.sanitize_json_string(request_body) if request_body else None
             sanitized_response = DataSanitizer.sanitize_json_string(response_body) if response_body else None
             
-            log = ApiLog(
+            _enqueue_log(ApiLog, dict(
                 method=method,
                 endpoint=endpoint,
                 status_code=status_code,
@@ -83,15 +243,9 @@ class DatabaseLogger:
                 user_id=user_id,
                 ip_address=ip_address,
                 duration_ms=duration_ms
-            )
-            db.add(log)
-            db.commit()
+            ))
         except Exception as e:
-            print(f"Failed to write API log: {e}")
-            db.rollback()
-        finally:
-            if should_close:
-                db.close()
+            print(f"Failed to queue API log: {e}")
     
     @staticmethod
     def log_error(
@@ -105,33 +259,25 @@ class DatabaseLogger:
         db: Optional[Session] = None
     ):
         """Log errors and exceptions with sensitive data sanitization"""
-        should_close = False
-        if db is None:
-            db = SessionLocal()
-            should_close = True
+        if not _should_log(severity):
+            return
         
         try:
             # Sanitize request_data dictionary
             sanitized_request_data = DataSanitizer.sanitize_dict(request_data) if request_data else None
             
-            log = ErrorLog(
+            _enqueue_log(ErrorLog, dict(
                 error_type=error_type,
                 error_message=error_message,
                 stack_trace=stack_trace,
                 endpoint=endpoint,
                 user_id=user_id,
-                request_data=json.dumps(sanitized_request_data) if sanitized_request_data else None,
+                request_data=_dumps(sanitized_request_data) if sanitized_request_data else None,
                 severity=severity,
                 resolved="false"
-            )
-            db.add(log)
-            db.commit()
+            ))
         except Exception as e:
-            print(f"Failed to write error log: {e}")
-            db.rollback()
-        finally:
-            if should_close:
-                db.close()
+            print(f"Failed to queue error log: {e}")
     
     @staticmethod
     def log_user_activity(
@@ -144,31 +290,23 @@ class DatabaseLogger:
         db: Optional[Session] = None
     ):
         """Log user activities with sensitive data sanitization"""
-        should_close = False
-        if db is None:
-            db = SessionLocal()
-            should_close = True
+        if not _should_log(LogLevel.INFO):
+            return
         
         try:
             # Sanitize description to remove sensitive information
             sanitized_description = DataSanitizer.sanitize_string(description) if description else None
             
-            log = UserActivityLog(
+            _enqueue_log(UserActivityLog, dict(
                 user_id=user_id,
                 action=action,
                 description=sanitized_description,
                 entity_type=entity_type,
                 entity_id=entity_id,
                 ip_address=ip_address
-            )
-            db.add(log)
-            db.commit()
+            ))
         except Exception as e:
-            print(f"Failed to write user activity log: {e}")
-            db.rollback()
-        finally:
-            if should_close:
-                db.close()
+            print(f"Failed to queue user activity log: {e}")
 
 # Convenience functions
 def log_info(message: str, category: LogCategory = LogCategory.SYSTEM, **kwargs):
@@ -0,0 +1,75 @@
+"""
+Route polyline helpers
+Simplifies OSRM geometries before they are cached and sent to clients
+"""
+from typing import List
+import numpy as np
+
+# Roughly one metre at the equator - below what a phone map can display
+DEFAULT_EPSILON_DEGREES = 1e-5
+
+
+def simplify(points: List[List[float]], epsilon: float = DEFAULT_EPSILON_DEGREES) -> List[List[float]]:
+    """
+    Simplify a polyline with the Douglas-Peucker algorithm.
+    Iterative (explicit stack) so long routes cannot hit the recursion limit;
+    perpendicular distances for each span are computed in one NumPy expression.
+
+    Args:
+        points: List of [lng, lat] coordinates (OSRM geojson order)
+        epsilon: Maximum allowed deviation from the original line, in degrees
+
+    Returns:
+        Simplified list of [lng, lat] coordinates, always keeping both endpoints
+    """
+    if not points or len(points) < 3:
+        return points
+
+    coords = np.asarray(points, dtype=np.float64)
+    n = len(coords)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        seg_start = coords[start]
+        seg = coords[end] - seg_start
+        rel = coords[start + 1:end] - seg_start
+        seg_len = np.hypot(seg[0], seg[1])
+
+        if seg_len == 0.0:
+            dists = np.hypot(rel[:, 0], rel[:, 1])
+        else:
+            dists = np.abs(seg[0] * rel[:, 1] - seg[1] * rel[:, 0]) / seg_len
+
+        idx = int(np.argmax(dists))
+        if dists[idx] > epsilon:
+            split = start + 1 + idx
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    return [points[i] for i in np.flatnonzero(keep)]
+
+
+def is_valid_india_bulk(points: List[List[float]]) -> bool:
+    """
+    Check that every point of a route lies inside the India service area.
+    Vectorized counterpart of is_valid_india_location for whole polylines.
+
+    Args:
+        points: List of [lng, lat] coordinates (OSRM geojson order)
+
+    Returns:
+        True if the polyline is non-empty and all points are within bounds
+    """
+    coords = np.asarray(points, dtype=np.float64)
+    if coords.ndim != 2 or coords.shape[0] == 0 or coords.shape[1] < 2:
+        return False
+    lng = coords[:, 0]
+    lat = coords[:, 1]
+    return bool(((lat >= 6.5) & (lat <= 35.5) & (lng >= 68.0) & (lng <= 97.5)).all())
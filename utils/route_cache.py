@@ -0,0 +1,267 @@
+"""
+Bounded in-memory cache for per-order route data
+Uses a 2Q admission policy so one-off lookups cannot evict hot orders.
+SharedRouteCache adds an optional Redis layer so all workers share one copy.
+"""
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+import asyncio
+import logging
+import secrets
+import threading
+import orjson
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+    aioredis = None
+
+# Delete the lock only if it still holds the caller's token
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class RouteCache:
+    """
+    Thread-safe bounded cache with 2Q eviction.
+
+    New keys enter a small FIFO probation queue. Keys evicted from probation
+    are remembered (key only) in a ghost queue; a key that is hit while in
+    probation, or re-inserted while still remembered as a ghost, is promoted
+    to the main LRU segment. A burst of single-use orders therefore only
+    churns the probation queue and never displaces frequently polled orders.
+    """
+
+    def __init__(self, capacity: int = 4096, probation_ratio: float = 0.25):
+        self.capacity = max(2, capacity)
+        self.probation_capacity = max(1, int(self.capacity * probation_ratio))
+        self.main_capacity = self.capacity - self.probation_capacity
+        self._probation: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._main: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._ghosts: "OrderedDict[Hashable, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Return the cached value for key, or default if absent"""
+        with self._lock:
+            if key in self._main:
+                self._main.move_to_end(key)
+                return self._main[key]
+            if key in self._probation:
+                value = self._probation.pop(key)
+                self._insert_main(key, value)
+                return value
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Insert or replace the value for key"""
+        with self._lock:
+            if key in self._main:
+                self._main[key] = value
+                self._main.move_to_end(key)
+            elif key in self._probation:
+                self._probation[key] = value
+            elif key in self._ghosts:
+                del self._ghosts[key]
+                self._insert_main(key, value)
+            else:
+                self._probation[key] = value
+                if len(self._probation) > self.probation_capacity:
+                    evicted, _ = self._probation.popitem(last=False)
+                    self._ghosts[evicted] = None
+                    if len(self._ghosts) > self.capacity:
+                        self._ghosts.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Remove key from the cache if present"""
+        with self._lock:
+            self._main.pop(key, None)
+            self._probation.pop(key, None)
+            self._ghosts.pop(key, None)
+
+    def _insert_main(self, key: Hashable, value: Any) -> None:
+        self._main[key] = value
+        if len(self._main) > self.main_capacity:
+            self._main.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._main or key in self._probation
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._main) + len(self._probation)
+
+
+class SharedRouteCache:
+    """
+    Cross-worker route cache and OSRM fetch lock stored in Redis.
+
+    Each order is a hash at route:{order_id} holding the driver/customer
+    positions the route was computed for, the coordinates (orjson encoded),
+    when it was cached (wall clock, comparable across workers) and the OSRM
+    distance/ETA. A SET NX lock at route_lock:{order_id} (holding a random
+    token) lets one worker fetch from OSRM while the others wait on
+    route_ready:{order_id}.
+
+    Disabled (every call is a cheap no-op) when no URL is configured or the
+    redis package is not installed; Redis errors are logged and treated as misses.
+    """
+
+    ROUTE_TTL_SECONDS = 30
+    LOCK_TTL_SECONDS = 25
+
+    def __init__(self, url: Optional[str]):
+        self._redis = None
+        if url and REDIS_AVAILABLE:
+            self._redis = aioredis.from_url(url)
+        elif url:
+            logger.warning("REDIS_URL is set but the redis package is not installed - shared route cache disabled")
+
+    @property
+    def enabled(self) -> bool:
+        return self._redis is not None
+
+    async def get(self, order_id: int) -> Optional[Tuple]:
+        """
+        Returns:
+            (driver_lat, driver_lng, cust_lat, cust_lng, coords, cached_at, distance_km, eta_minutes)
+            or None on a miss
+        """
+        if not self.enabled:
+            return None
+        try:
+            data = await self._redis.hgetall(f"route:{order_id}")
+        except Exception as e:
+            logger.warning(f"Shared route cache read failed for order {order_id}: {e}")
+            return None
+        if not data:
+            return None
+        distance = data.get(b"distance_km")
+        eta = data.get(b"eta_minutes")
+        return (
+            float(data[b"dlat"]), float(data[b"dlng"]),
+            float(data[b"clat"]), float(data[b"clng"]),
+            orjson.loads(data[b"coords"]),
+            float(data.get(b"ts") or 0),
+            float(distance) if distance else None,
+            int(eta) if eta else None,
+        )
+
+    async def put(
+        self,
+        order_id: int,
+        route: Tuple,
+        distance_km: Optional[float] = None,
+        eta_minutes: Optional[int] = None
+    ) -> None:
+        """Store (driver_lat, driver_lng, cust_lat, cust_lng, coords, cached_at) with the route TTL"""
+        if not self.enabled:
+            return
+        driver_lat, driver_lng, cust_lat, cust_lng, coords, cached_at = route
+        mapping = {
+            "dlat": driver_lat,
+            "dlng": driver_lng,
+            "clat": cust_lat,
+            "clng": cust_lng,
+            "coords": orjson.dumps(coords),
+            "ts": cached_at,
+            "distance_km": "" if distance_km is None else distance_km,
+            "eta_minutes": "" if eta_minutes is None else eta_minutes,
+        }
+        key = f"route:{order_id}"
+        try:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.delete(key)
+                pipe.hset(key, mapping=mapping)
+                pipe.expire(key, self.ROUTE_TTL_SECONDS)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Shared route cache write failed for order {order_id}: {e}")
+
+    async def invalidate(self, order_id: int) -> None:
+        if not self.enabled:
+            return
+        try:
+            await self._redis.delete(f"route:{order_id}")
+        except Exception as e:
+            logger.warning(f"Shared route cache invalidate failed for order {order_id}: {e}")
+
+    async def acquire_lock(self, order_id: int) -> Optional[str]:
+        """
+        Try to become the worker that fetches this order's route from OSRM.
+
+        Returns:
+            A token to pass to release_lock, or None if another worker holds the lock
+        """
+        token = secrets.token_hex(16)
+        if not self.enabled:
+            return token
+        try:
+            if await self._redis.set(f"route_lock:{order_id}", token, nx=True, ex=self.LOCK_TTL_SECONDS):
+                return token
+            return None
+        except Exception as e:
+            logger.warning(f"Route lock failed for order {order_id}: {e}")
+            return token
+
+    async def release_lock(self, order_id: int, token: str) -> None:
+        """
+        Release the fetch lock and wake workers waiting for this order.
+        The lock is only deleted while it still holds our token, so a holder whose
+        lock expired mid-fetch cannot release the lock of the worker that took over.
+        """
+        if not self.enabled:
+            return
+        try:
+            if await self._redis.eval(_RELEASE_LOCK_SCRIPT, 1, f"route_lock:{order_id}", token):
+                await self._redis.publish(f"route_ready:{order_id}", 1)
+        except Exception as e:
+            logger.warning(f"Route lock release failed for order {order_id}: {e}")
+
+    async def wait_ready(self, order_id: int, timeout: float) -> bool:
+        """
+        Wait for the worker holding the fetch lock to finish.
+
+        Returns:
+            True once the lock has been released, False on timeout or error
+        """
+        if not self.enabled:
+            return False
+        pubsub = self._redis.pubsub()
+        try:
+            await pubsub.subscribe(f"route_ready:{order_id}")
+            # The holder may have finished before we subscribed
+            if not await self._redis.exists(f"route_lock:{order_id}"):
+                return True
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return False
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+                if message is not None:
+                    return True
+        except Exception as e:
+            logger.warning(f"Waiting for route of order {order_id} failed: {e}")
+            return False
+        finally:
+            try:
+                await pubsub.unsubscribe()
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
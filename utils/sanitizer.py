@@ -2,7 +2,7 @@
 Data sanitization utilities for logging sensitive information
 """
 import re
-import json
+import orjson
 from typing import Optional, Dict, Any
 
 class DataSanitizer:
@@ -14,37 +14,58 @@ class DataSanitizer:
         'refresh_token', 'authorization', 'auth', 'jwt', 'bearer',
         'credit_card', 'cvv', 'ssn', 'social_security'
     }
+    # A key is sensitive if it contains any of the field names, in any case
+    _SENSITIVE_KEY_RX = re.compile('|'.join(map(re.escape, sorted(SENSITIVE_FIELDS))), re.IGNORECASE)
     
-    # Patterns to detect and redact sensitive data
-    SENSITIVE_PATTERNS = [
-        (r'Bearer\s+[\w\-\.]+', 'Bearer [REDACTED]'),
-        (r'"password"\s*:\s*"[^"]*"', '"password":"[REDACTED]"'),
-        (r'"token"\s*:\s*"[^"]*"', '"token":"[REDACTED]"'),
-        (r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '[EMAIL_REDACTED]'),
-    ]
+    # Patterns to detect and redact sensitive data: name -> (pattern, replacement)
+    # Every repetition is bounded so the work per match stays linear on hostile input
+    SENSITIVE_PATTERNS = {
+        'bearer': (r'Bearer\s{1,8}[\w\-\.]{1,4096}', 'Bearer [REDACTED]'),
+        'password': (r'"password"\s{0,8}:\s{0,8}"[^"]{0,4096}"', '"password":"[REDACTED]"'),
+        'token': (r'"token"\s{0,8}:\s{0,8}"[^"]{0,4096}"', '"token":"[REDACTED]"'),
+        'email': (r'\b[A-Za-z0-9._%+-]{1,64}@[A-Za-z0-9.-]{1,253}\.[A-Za-z]{2,24}\b', '[EMAIL_REDACTED]'),
+    }
+    
+    # All patterns fused into one case-insensitive alternation so a body is scanned once
+    _SENSITIVE_RX = re.compile(
+        '|'.join(f'(?P<{name}>{pattern})' for name, (pattern, _) in SENSITIVE_PATTERNS.items()),
+        re.IGNORECASE
+    )
+    _REPLACEMENTS = {name: replacement for name, (_, replacement) in SENSITIVE_PATTERNS.items()}
+    # Every pattern needs one of these substrings (lowercase); text with none is left untouched
+    _MARKERS = ('bearer', 'password', 'token')
     
     MAX_BODY_SIZE = 10000  # Max characters for request/response body logging
     
     @staticmethod
     def sanitize_dict(data: Dict[str, Any]) -> Dict[str, Any]:
-        """Recursively sanitize dictionary data"""
+        """Sanitize nested dictionary data (walked with an explicit stack, not recursion)"""
         if not isinstance(data, dict):
             return data
         
+        is_sensitive = DataSanitizer._SENSITIVE_KEY_RX.search
         sanitized = {}
-        for key, value in data.items():
-            # Check if field name is sensitive
-            if any(sensitive in key.lower() for sensitive in DataSanitizer.SENSITIVE_FIELDS):
-                sanitized[key] = "[REDACTED]"
-            elif isinstance(value, dict):
-                sanitized[key] = DataSanitizer.sanitize_dict(value)
-            elif isinstance(value, list):
-                sanitized[key] = [
-                    DataSanitizer.sanitize_dict(item) if isinstance(item, dict) else item
-                    for item in value
-                ]
-            else:
-                sanitized[key] = value
+        # (destination, source) dict pairs still to be copied
+        stack = [(sanitized, data)]
+        while stack:
+            dst, src = stack.pop()
+            for key, value in src.items():
+                # Check if field name is sensitive
+                if is_sensitive(key):
+                    dst[key] = "[REDACTED]"
+                elif isinstance(value, dict):
+                    dst[key] = child = {}
+                    stack.append((child, value))
+                elif isinstance(value, list):
+                    items = dst[key] = []
+                    for item in value:
+                        if isinstance(item, dict):
+                            child = {}
+                            stack.append((child, item))
+                            item = child
+                        items.append(item)
+                else:
+                    dst[key] = value
         
         return sanitized
     
@@ -58,12 +79,15 @@ class DataSanitizer:
         if len(text) > DataSanitizer.MAX_BODY_SIZE:
             text = text[:DataSanitizer.MAX_BODY_SIZE] + "...[TRUNCATED]"
         
-        # Apply pattern replacements
-        sanitized = text
-        for pattern, replacement in DataSanitizer.SENSITIVE_PATTERNS:
-            sanitized = re.sub(pattern, replacement, sanitized, flags=re.IGNORECASE)
+        # Skip the regex entirely when nothing in the text could match
+        if '@' not in text:
+            lowered = text.lower()
+            if not any(marker in lowered for marker in DataSanitizer._MARKERS):
+                return text
         
-        return sanitized
+        # Apply pattern replacements in a single pass
+        replacements = DataSanitizer._REPLACEMENTS
+        return DataSanitizer._SENSITIVE_RX.sub(lambda match: replacements[match.lastgroup], text)
     
     @staticmethod
     def sanitize_json_string(json_str: Optional[str]) -> Optional[str]:
@@ -73,17 +97,23 @@ class DataSanitizer:
         
         try:
             # Parse JSON
-            data = json.loads(json_str)
+            data = orjson.loads(json_str)
             # Sanitize dict
             sanitized = DataSanitizer.sanitize_dict(data)
             # Convert back to JSON string
-            result = json.dumps(sanitized)
+            encoded = orjson.dumps(sanitized)
+            limit = DataSanitizer.MAX_BODY_SIZE
+            
+            # A body within the limit in bytes is within it in characters too
+            if len(encoded) <= limit:
+                return encoded.decode()
             
-            # Limit size
-            if len(result) > DataSanitizer.MAX_BODY_SIZE:
-                result = result[:DataSanitizer.MAX_BODY_SIZE] + "...[TRUNCATED]"
+            # Limit size, decoding only as much as can fall under the limit (UTF-8 is at most 4 bytes a character)
+            result = encoded[:limit * 4 + 4].decode('utf-8', 'ignore')
+            if len(result) > limit:
+                result = result[:limit] + "...[TRUNCATED]"
             
             return result
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             # If not valid JSON, sanitize as string
             return DataSanitizer.sanitize_string(json_str)
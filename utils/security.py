@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta
 from typing import Optional, Tuple
-from jose import JWTError, jwt
+import jwt
+from jwt import InvalidTokenError as JWTError
 from config import settings
 import hashlib
 import os
@@ -8,6 +9,16 @@ import base64
 import re
 import secrets
 
+# Settings used on every hash/token operation, bound once: password_pepper and
+# refresh_secret_key are properties that re-derive a SHA-256 key on each access
+_PEPPER_BYTES = settings.password_pepper.encode('utf-8')
+_SECRET = settings.secret_key
+_REFRESH_SECRET = settings.refresh_secret_key
+_ALGORITHM = settings.algorithm
+_ALGORITHMS = [_ALGORITHM]
+_ACCESS_TOKEN_LIFETIME = timedelta(minutes=settings.access_token_expire_minutes)
+_REFRESH_TOKEN_LIFETIME = timedelta(days=settings.refresh_token_expire_days)
+
 try:
     from argon2 import PasswordHasher
     from argon2.exceptions import VerifyMismatchError, InvalidHash
@@ -23,16 +34,24 @@ except ImportError:
     ARGON2_AVAILABLE = False
     ph = None
 
+# PBKDF2 fallback parameters; hashlib's pbkdf2_hmac runs inside OpenSSL (hardware
+# SHA-256 where the CPU has it), so the loop never touches the interpreter
+PBKDF2_ITERATIONS = 100000
+
+def _pbkdf2_sha256(password: bytes, salt: bytes) -> bytes:
+    return hashlib.pbkdf2_hmac('sha256', password, salt, PBKDF2_ITERATIONS)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash using Argon2 (primary) or PBKDF2 (fallback)"""
     if not plain_password or not hashed_password:
         return False
     
+    password_bytes = plain_password.encode('utf-8')
+    
     # Try Argon2 first (new format starts with $argon2)
     if ARGON2_AVAILABLE and hashed_password.startswith('$argon2'):
-        peppered_password = plain_password + settings.password_pepper
         try:
-            ph.verify(hashed_password, peppered_password)
+            ph.verify(hashed_password, password_bytes + _PEPPER_BYTES)
             return True
         except (VerifyMismatchError, InvalidHash):
             return False
@@ -41,43 +60,47 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     
     # Fallback to PBKDF2 for legacy passwords (created without pepper)
     try:
-        parts = hashed_password.split('$')
-        if len(parts) != 2:
+        salt_b64, sep, hash_b64 = hashed_password.partition('$')
+        if not sep or '$' in hash_b64:
             return False
         
-        salt = base64.b64decode(parts[0])
-        stored_hash = base64.b64decode(parts[1])
+        salt = base64.b64decode(salt_b64)
+        stored_hash = base64.b64decode(hash_b64)
         
         # Verify legacy password without pepper (backward compatible)
-        new_hash = hashlib.pbkdf2_hmac('sha256', plain_password.encode('utf-8'), salt, 100000)
+        new_hash = _pbkdf2_sha256(password_bytes, salt)
         return secrets.compare_digest(new_hash, stored_hash)
     except Exception:
         return False
 
 def get_password_hash(password: str) -> str:
     """Hash a password using Argon2id (recommended) with pepper"""
-    peppered_password = password + settings.password_pepper
+    peppered_password = password.encode('utf-8') + _PEPPER_BYTES
     
     if ARGON2_AVAILABLE:
         return ph.hash(peppered_password)
     
     # Fallback to PBKDF2
     salt = os.urandom(32)
-    pwd_hash = hashlib.pbkdf2_hmac('sha256', peppered_password.encode('utf-8'), salt, 100000)
+    pwd_hash = _pbkdf2_sha256(peppered_password, salt)
     return f"{base64.b64encode(salt).decode('utf-8')}${base64.b64encode(pwd_hash).decode('utf-8')}"
 
+_UPPERCASE = re.compile(r'[A-Z]')
+_LOWERCASE = re.compile(r'[a-z]')
+_DIGIT = re.compile(r'\d')
+
 def validate_password_strength(password: str) -> Tuple[bool, str]:
     """Validate password meets security requirements"""
     if len(password) < settings.min_password_length:
         return False, f"Password must be at least {settings.min_password_length} characters"
     
-    if not re.search(r'[A-Z]', password):
+    if not _UPPERCASE.search(password):
         return False, "Password must contain at least one uppercase letter"
     
-    if not re.search(r'[a-z]', password):
+    if not _LOWERCASE.search(password):
         return False, "Password must contain at least one lowercase letter"
     
-    if not re.search(r'\d', password):
+    if not _DIGIT.search(password):
         return False, "Password must contain at least one number"
     
     return True, "Password is strong"
@@ -85,39 +108,41 @@ def validate_password_strength(password: str) -> Tuple[bool, str]:
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a short-lived access token"""
     to_encode = data.copy()
+    now = datetime.utcnow()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
+        expire = now + _ACCESS_TOKEN_LIFETIME
     
     to_encode.update({
         "exp": expire,
-        "iat": datetime.utcnow(),
+        "iat": now,
         "type": "access",
         "jti": secrets.token_urlsafe(16)
     })
-    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
+    encoded_jwt = jwt.encode(to_encode, _SECRET, algorithm=_ALGORITHM)
     return encoded_jwt
 
 def create_refresh_token(data: dict) -> str:
     """Create a long-lived refresh token"""
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(days=settings.refresh_token_expire_days)
+    now = datetime.utcnow()
+    expire = now + _REFRESH_TOKEN_LIFETIME
     
     to_encode.update({
         "exp": expire,
-        "iat": datetime.utcnow(),
+        "iat": now,
         "type": "refresh",
         "jti": secrets.token_urlsafe(16)
     })
-    encoded_jwt = jwt.encode(to_encode, settings.refresh_secret_key, algorithm=settings.algorithm)
+    encoded_jwt = jwt.encode(to_encode, _REFRESH_SECRET, algorithm=_ALGORITHM)
     return encoded_jwt
 
 def decode_token(token: str, token_type: str = "access") -> Optional[dict]:
     """Decode and validate a token"""
     try:
-        secret = settings.secret_key if token_type == "access" else settings.refresh_secret_key
-        payload = jwt.decode(token, secret, algorithms=[settings.algorithm])
+        secret = _SECRET if token_type == "access" else _REFRESH_SECRET
+        payload = jwt.decode(token, secret, algorithms=_ALGORITHMS)
         
         # Verify token type
         if payload.get("type") != token_type:
@@ -136,8 +161,8 @@ def decode_refresh_token(token: str) -> Optional[dict]:
     return decode_token(token, "refresh")
 
 def generate_otp(length: int = 6) -> str:
-    """Generate a secure OTP"""
-    return ''.join(secrets.choice('0123456789') for _ in range(length))
+    """Generate a secure OTP (one CSPRNG draw, zero-padded)"""
+    return f"{secrets.randbelow(10 ** length):0{length}d}"
 
 def mask_sensitive_data(data: str, visible_chars: int = 4) -> str:
     """Mask sensitive data for logging"""
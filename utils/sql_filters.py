@@ -0,0 +1,21 @@
+"""
+Reusable SQLAlchemy filter expressions
+"""
+from typing import Iterable
+from sqlalchemy import ARRAY, Integer, and_, all_, bindparam
+from sqlalchemy.sql.elements import ColumnElement
+
+# Up to this many ids are excluded with plain "!=" comparisons
+SMALL_EXCLUDE_SET = 3
+
+
+def exclude_ids(column, ids: Iterable[int]) -> ColumnElement:
+    """
+    "column NOT IN ids" whose SQL text does not depend on how many ids there are.
+    A handful of ids become "column != x AND ...". Larger sets are bound as a single
+    array parameter ("column != ALL(:ids)"), so every list size shares one statement.
+    """
+    ids = list(ids)
+    if len(ids) <= SMALL_EXCLUDE_SET:
+        return and_(*(column != value for value in ids))
+    return column != all_(bindparam("exclude_ids", ids, type_=ARRAY(Integer)))
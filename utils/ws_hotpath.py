@@ -0,0 +1,48 @@
+"""
+Per-message numeric checks for the GPS WebSocket ingest path
+Compiled with Numba when it is installed; falls back to plain Python otherwise
+"""
+import math
+import logging
+from utils.jit import njit, NUMBA_AVAILABLE
+from utils.distance_fast import METERS_PER_DEGREE
+
+logger = logging.getLogger(__name__)
+
+# Bit flags returned by prepare()
+FLAG_VALID = 1
+FLAG_MOVED = 2
+
+
+@njit(cache=True)
+def prepare(lat: float, lng: float, last_lat: float, last_lng: float, thresh_m: float) -> int:
+    """
+    Validate a GPS ping and compare it against the last stored position.
+
+    Args:
+        lat, lng: Incoming position (in degrees)
+        last_lat, last_lng: Last stored position, or NaN if nothing stored yet
+        thresh_m: Minimum movement in metres for the ping to count as moved
+
+    Returns:
+        FLAG_VALID if inside the India service area, OR'ed with FLAG_MOVED if the
+        ping is further than thresh_m from the last stored position (always set
+        when there is no previous position)
+    """
+    ok = ((lat - 6.5) * (35.5 - lat) >= 0.0) & ((lng - 68.0) * (97.5 - lng) >= 0.0)
+    if not ok:
+        return 0
+
+    dx = (lng - last_lng) * math.cos(math.radians(last_lat)) * METERS_PER_DEGREE
+    dy = (lat - last_lat) * METERS_PER_DEGREE
+    # Written as "not <=" so a NaN previous position counts as moved
+    if not (dx * dx + dy * dy <= thresh_m * thresh_m):
+        return FLAG_VALID | FLAG_MOVED
+    return FLAG_VALID
+
+
+def warm_up() -> None:
+    """Trigger JIT compilation at startup so the first WebSocket message does not pay for it"""
+    prepare(21.0, 78.0, math.nan, math.nan, 5.0)
+    if NUMBA_AVAILABLE:
+        logger.info("WebSocket hot path compiled with Numba")